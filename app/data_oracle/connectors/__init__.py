@@ -1,4 +1,5 @@
 from .baseconnector import *
+from .asyncsqlalchemyconnector import *
 from .bigqueryconnector import *
 from .connection_class import *
 from .redshiftconnector import *
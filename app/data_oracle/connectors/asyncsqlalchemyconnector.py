@@ -0,0 +1,183 @@
+from contextlib import contextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import inspect, text, AsyncAdaptedQueuePool, Connection
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from .baseconnector import BaseDBConnector
+from .connection_class import ConnectionInfo, ConnectionDetails, FileConnection
+from .sqlalchemyconnector import SqlAlchemyConnector, return_engine_args, async_drivername_mapper
+from .value_converters import sqlalchemy_value_converter
+from ..db_schema import Database
+
+
+def supports_async_engine(connection_data: ConnectionInfo) -> bool:
+    """
+    Returns whether an async driver is available for the given connection data
+    @connection_data: connection args
+    Return: Boolean
+    """
+    if type(connection_data) == FileConnection:
+        return True
+    return type(connection_data) == ConnectionDetails and connection_data.database_type in async_drivername_mapper
+
+
+def create_async_sqlalchemy_engine(connection_data: ConnectionInfo, **engine_kwargs) -> AsyncEngine:
+    """
+    Creates an async sqlalchemy engine for the given connection data
+    @connection_data: ConnectionDetails or FileConnection object
+    @engine_kwargs: additional keyword arguments passed on to create_async_engine, e.g. pool settings
+    Return: async sqlalchemy engine
+    """
+    url_object, connect_args = return_engine_args(connection_data, use_async=True)
+    if type(connection_data) == FileConnection and "pool_size" in engine_kwargs:
+        # aiosqlite defaults to a NullPool which does not accept pool sizing arguments
+        engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+    if connect_args:
+        return create_async_engine(url_object, connect_args=connect_args, **engine_kwargs)
+    return create_async_engine(url_object, **engine_kwargs)
+
+
+class ConnectionBoundConnector(SqlAlchemyConnector):
+    """
+    Sync connector that reflects over one already open connection, e.g. the sync view of an async connection inside
+    AsyncConnection.run_sync
+    """
+    max_reflection_workers = 1  # all catalog calls share the bound connection
+
+    def __init__(self, connection_data: ConnectionInfo, connection: Connection):
+        """
+        @connection_data: holds all necessary args for connection
+        @connection: open connection used for all catalog calls
+        """
+        self.bound_connection = connection
+        super().__init__(connection_data, connection.engine)
+        self.inspection = inspect(connection)
+
+    @contextmanager
+    def reflection_connection(self):
+        yield self.bound_connection
+
+
+class AsyncSqlAlchemyConnector:
+    """
+    Connector for Sql Dbs with an async driver (psycopg, aiomysql, aiosqlite). Reflection and execution are
+    awaited on the event loop instead of blocking a thread per request. Only awaitable methods are offered, reflection
+    runs a ConnectionBoundConnector on the sync view of an async connection so both connectors scan alike
+    """
+    is_async = True
+    value_converter = sqlalchemy_value_converter
+    convert_batch_size = SqlAlchemyConnector.convert_batch_size
+
+    def __init__(self, connection_data: ConnectionInfo, engine: AsyncEngine | None = None):
+        """
+        @connection_data: holds all necessary args for connection
+        @engine: already created async engine to reuse. If None a new engine is created for this connector
+        """
+        self.engine = engine
+        self.connection_data = connection_data
+        self.type = None
+        self.connection = self.connect(connection_data)
+        self.db = Database(connection_data.database_name)
+
+    def connect(self, connection_data: ConnectionInfo) -> AsyncEngine:
+        if type(connection_data) == ConnectionDetails:
+            self.type = connection_data.database_type
+        elif type(connection_data) == FileConnection:
+            self.type = connection_data.type
+        if self.engine is not None:
+            return self.engine
+        return create_async_sqlalchemy_engine(connection_data)
+
+    def return_cached_db(self, cached_layout: str) -> Database:
+        self.db = Database(self.connection_data.database_name)
+        self.db.reload_from_cache(cached_layout)
+        return self.db
+
+    async def ais_available(self) -> bool:
+        """
+        Returns Boolean whether connections is successful
+        """
+        try:
+            async with self.connection.connect() as conn:
+                pass
+            return True
+        except:
+            return False
+
+    def _reflect_sync(self, sync_connection: Connection, reflection, *args) -> Database:
+        """
+        Runs a reflection method of a sync connector bound to the sync view of an async connection
+        """
+        return reflection(ConnectionBoundConnector(self.connection_data, sync_connection), *args)
+
+    async def ascan_db(self, scan_enums: bool = False) -> Database:
+        """
+        Populates db object with information about the schema and returns it
+        :param scan_enums: Param to manually scan entries to find potential enum values
+        :return:
+        """
+        async with self.connection.connect() as conn:
+            self.db = await conn.run_sync(self._reflect_sync, SqlAlchemyConnector.scan_db, scan_enums)
+        return self.db
+
+    async def arefresh_db(self, previous_db: Database, scan_enums: bool = False) -> Database:
+        """
+        Returns the current layout of the database and only reflects tables that changed since previous_db
+        :param previous_db: previously scanned layout
+        :param scan_enums: Param to manually scan entries to find potential enum values
+        :return:
+        """
+        async with self.connection.connect() as conn:
+            self.db = await conn.run_sync(self._reflect_sync, SqlAlchemyConnector.refresh_db, previous_db,
+                                          scan_enums)
+        return self.db
+
+    async def aexecute_sql_statement(self, _sql, _max_rows=None, autocommit=False):
+        """
+        @_sql:str
+        Returns result of sql statement
+        """
+        results = []
+
+        async with self.connection.connect() as conn:
+            sql_res_conn = await conn.execute(text(_sql))
+            # statements without a result set, e.g. inserts, only have to be committed
+            results.append([x for x in sql_res_conn.keys()] if sql_res_conn.returns_rows else [])
+            partitions = sql_res_conn.partitions(self.convert_batch_size) if sql_res_conn.returns_rows else []
+            for partition in BaseDBConnector.limit_partitions(partitions, _max_rows):
+                results.extend(self.value_converter.convert_rows(partition))
+            if autocommit:
+                await conn.commit()
+        return results
+
+    async def astream_sql_statement(self, _sql, _max_rows=None, autocommit=False,
+                                    chunk_size: int = 1000, convert_values: bool = True) -> AsyncIterator[list]:
+        """
+        @_sql:str
+        Yields the column names and then chunks of rows read from a server side cursor. Autocommitted statements are
+        run to completion and committed before anything is yielded, closing the generator early can not roll them back
+        """
+        async with self.connection.connect() as conn:
+            if autocommit:
+                sql_res_conn = await conn.execute(text(_sql))
+                columns = [x for x in sql_res_conn.keys()] if sql_res_conn.returns_rows else []
+                partitions = sql_res_conn.partitions(chunk_size) if sql_res_conn.returns_rows else []
+                partitions = list(BaseDBConnector.limit_partitions(partitions, _max_rows))
+                await conn.commit()
+                yield columns
+                for partition in partitions:
+                    yield self.value_converter.convert_rows(partition) if convert_values else partition
+                return
+
+            sql_res_conn = await conn.stream(text(_sql), execution_options={"yield_per": chunk_size})
+            yield [x for x in sql_res_conn.keys()]
+            remaining = BaseDBConnector.row_limit(_max_rows)
+            async for partition in sql_res_conn.partitions(chunk_size):
+                if remaining is not None:
+                    partition = partition[:remaining]
+                    remaining -= len(partition)
+                yield self.value_converter.convert_rows(partition) if convert_values else partition
+                if remaining == 0:
+                    break
+            await sql_res_conn.close()
@@ -1,4 +1,6 @@
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Sequence
 
 from .connection_class import ConnectionInfo
 from ..db_schema import Database, Table, Schema
@@ -6,6 +8,9 @@ from ..enums import Data_Table_Type
 
 
 class BaseDBConnector(ABC):
+    is_async = False  # async connectors like AsyncSqlAlchemyConnector set this and only offer awaitable methods
+    max_reflection_workers = 1  # number of catalog calls the connection of the connector can serve concurrently
+    supports_change_tracking = False  # connector implements return_table_fingerprints
 
     def __init__(self, connection_data: ConnectionInfo):
         self.connection_data = connection_data
@@ -13,6 +18,19 @@ class BaseDBConnector(ABC):
         self.connection = self.connect(connection_data)
         self.db = self.register_db(connection_data)
         self.ssh_connection = None
+        self.reflection_workers = 1
+        self.reflection_batch_size = 50
+
+    def set_reflection_parallelism(self, workers: int, batch_size: int | None = None) -> None:
+        """
+        Configures how many schemas and table batches are reflected concurrently by scan_db. The number of workers is
+        capped by max_reflection_workers of the connector so the source is not overwhelmed
+        @workers: number of concurrent reflection calls, 1 reflects everything sequentially
+        @batch_size: number of tables reflected by one call
+        """
+        self.reflection_workers = max(1, workers)
+        if batch_size is not None:
+            self.reflection_batch_size = max(1, batch_size)
 
     def connect(self, connection_data: ConnectionInfo):
         """
@@ -56,6 +74,41 @@ class BaseDBConnector(ABC):
         """
         pass
 
+    @staticmethod
+    def row_limit(_max_rows: int | None) -> int | None:
+        """
+        Returns the number of rows a result is cut off at. execute_sql_statement returns one row more than _max_rows,
+        streamed results return the same rows
+        """
+        return None if _max_rows is None else max(_max_rows, 0) + 1
+
+    @classmethod
+    def limit_partitions(cls, partitions: Iterable[Sequence], _max_rows: int | None) -> Iterator[Sequence]:
+        """
+        Cuts off batches of rows, e.g. fetches from a cursor, at the row limit of _max_rows
+        """
+        remaining = cls.row_limit(_max_rows)
+        for partition in partitions:
+            if remaining is not None:
+                partition = partition[:remaining]
+                remaining -= len(partition)
+            yield partition
+            if remaining == 0:
+                break
+
+    def stream_sql_statement(self, _sql, _max_rows=None, autocommit=False,
+                             chunk_size: int = 1000, convert_values: bool = True) -> Iterator[list]:
+        """
+        @_sql:str
+        Yields the column names of the result first and then the rows in chunks of at most chunk_size rows. Connectors
+        override this to read from the cursor so the memory use does not depend on the size of the result. Without
+        convert_values connectors skip convert_value and return the values of the database driver
+        """
+        results = self.execute_sql_statement(_sql, _max_rows, autocommit)
+        yield results[0] if len(results) > 0 else []
+        for i in range(1, len(results), chunk_size):
+            yield results[i:i + chunk_size]
+
     def return_table_column_info(self, schema_name: str, scan_enums: bool) -> list[Table]:
         """
         Returns dictionary containing table_name : [column_name] pairs
@@ -84,14 +137,50 @@ class BaseDBConnector(ABC):
     def return_schema_names(self) -> list[str]:
         pass
 
+    def return_table_batch(self, schema_name: str, batch: list[tuple[str, Data_Table_Type]],
+                           scan_enums: bool) -> list[Table]:
+        """
+        Returns the tables of a batch of table names of one schema
+        """
+        return [self.return_table_columns(schema_name, table, table_type, scan_enums) for table, table_type in batch]
+
+    def release_reflection_resources(self) -> None:
+        """
+        Releases resources that were only needed while reflecting concurrently, e.g. additional connections
+        """
+        pass
+
     def return_schemas(self, scan_enums: bool) -> list[Schema]:
         output_schemas = []
         all_schemas = self.return_schema_names()
-        for schema in all_schemas:
-            all_tables = self.return_table_column_info(schema, scan_enums) + self.return_view_column_info(schema,
-                                                                                                          scan_enums)
-            if len(all_tables) > 0:
-                output_schemas.append(Schema(schema, all_tables))  # we skip empty schemas
+        workers = min(self.reflection_workers, self.max_reflection_workers)
+        if workers <= 1:
+            for schema in all_schemas:
+                all_tables = self.return_table_column_info(schema, scan_enums) + self.return_view_column_info(
+                    schema, scan_enums)
+                if len(all_tables) > 0:
+                    output_schemas.append(Schema(schema, all_tables))  # we skip empty schemas
+            return output_schemas
+
+        def list_schema(schema_name: str) -> list[tuple[str, Data_Table_Type]]:
+            return [(table, Data_Table_Type.TABLE) for table in self.return_table_names(schema_name)] + \
+                [(view, Data_Table_Type.VIEW) for view in self.return_view_names(schema_name)]
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reflection") as executor:
+                schema_contents = list(executor.map(list_schema, all_schemas))
+                # batches are submitted in schema and table order and collected in that order again, so the layout
+                # does not depend on which call finishes first
+                schema_batches = [
+                    [executor.submit(self.return_table_batch, schema, content[i:i + self.reflection_batch_size],
+                                     scan_enums) for i in range(0, len(content), self.reflection_batch_size)]
+                    for schema, content in zip(all_schemas, schema_contents)]
+                for schema, batches in zip(all_schemas, schema_batches):
+                    all_tables = [table for batch in batches for table in batch.result()]
+                    if len(all_tables) > 0:
+                        output_schemas.append(Schema(schema, all_tables))  # we skip empty schemas
+        finally:
+            self.release_reflection_resources()
         return output_schemas
 
     def scan_db(self, scan_enums: bool = False) -> Database:
@@ -100,7 +189,114 @@ class BaseDBConnector(ABC):
         :param scan_enums: Param to manually scan entries to find potential enum values
         :return:
         """
-        self.db.register_schemas(self.return_schemas(scan_enums))
+        if not self.supports_change_tracking:
+            self.db.register_schemas(self.return_schemas(scan_enums))
+            return self.return_db_layout()
+        # fingerprints are read before reflecting so changes made during the scan are detected by the next refresh
+        self.db.fingerprint = self.return_database_fingerprint()
+        fingerprints = {schema: self.return_table_fingerprints(schema) for schema in self.return_schema_names()}
+        schemas = self.return_schemas(scan_enums)
+        for schema in schemas:
+            schema_fingerprints = fingerprints.get(schema.name) or {}
+            for table in schema.tables:
+                table.fingerprint = schema_fingerprints.get(table.name, (None, None))[1]
+        self.db.register_schemas(schemas)
+        return self.return_db_layout()
+
+    def return_database_fingerprint(self) -> str | None:
+        """
+        Returns a value which changes whenever any table of the database changes, None if the connector can not
+        detect this with a single cheap call
+        """
+        return None
+
+    def return_table_fingerprints(self, schema_name: str) -> dict[str, tuple[Data_Table_Type, str | None]] | None:
+        """
+        Returns all tables and views of a schema in reflection order together with a fingerprint that changes
+        whenever the definition of the table changes. A fingerprint of None means the table is always reflected again
+        @schema_name: name of the schema
+        Return: dict of table name to tuple of table type and fingerprint or None if changes can not be tracked
+        """
+        return None
+
+    def prepare_table_reflection(self, schema_name: str, table_names: list[str]) -> None:
+        """
+        Called before the given tables of a schema are reflected again by refresh_db, connectors reflecting in bulk
+        can restrict their catalog queries to these tables
+        """
+        pass
+
+    def refresh_schema(self, schema_name: str, previous_schema: Schema | None, scan_enums: bool) -> Schema | None:
+        """
+        Returns the current layout of a schema. Only tables whose fingerprint changed are reflected again, all other
+        tables are taken over from the previous layout together with their filters and embeddings
+        @schema_name: name of the schema
+        @previous_schema: previous layout of the schema, None if the schema is new
+        @scan_enums: Param to manually scan entries to find potential enum values
+        Return: current layout or None if the schema is empty
+        """
+        fingerprints = self.return_table_fingerprints(schema_name)
+        previous_tables = {} if previous_schema is None else {table.name: table for table in previous_schema.tables}
+        if fingerprints is None:
+            changed = None
+            reflected = self.return_table_column_info(schema_name, scan_enums) + self.return_view_column_info(
+                schema_name, scan_enums)
+            fingerprints = {table.name: (table.type, None) for table in reflected}
+        else:
+            changed = [(name, table_type) for name, (table_type, fingerprint) in fingerprints.items()
+                       if fingerprint is None or name not in previous_tables or
+                       getattr(previous_tables[name], "fingerprint", None) != fingerprint]
+            if len(changed) > 0:
+                self.prepare_table_reflection(schema_name, [name for name, _ in changed])
+            reflected = self.return_table_batch(schema_name, changed, scan_enums)
+        reflected = {table.name: table for table in reflected}
+
+        tables = []
+        for name, (_, fingerprint) in fingerprints.items():
+            if name in reflected:
+                table = reflected[name]
+                table.fingerprint = fingerprint
+                if name in previous_tables:
+                    table.carry_over(previous_tables[name])
+            else:
+                table = previous_tables[name]
+            tables.append(table)
+        if len(tables) == 0:
+            return None  # we skip empty schemas
+        if previous_schema is None:
+            return Schema(schema_name, tables)
+        if changed is not None and len(changed) == 0 and len(tables) == len(previous_schema.tables):
+            return previous_schema
+        schema = Schema(schema_name, tables)
+        schema.embedding = previous_schema.embedding
+        schema.carry_over_filters(previous_schema, tables)
+        return schema
+
+    def refresh_db(self, previous_db: Database, scan_enums: bool = False) -> Database:
+        """
+        Returns the current layout of the database reusing everything of the previous layout that did not change.
+        The previous layout is returned as is if the database fingerprint did not change
+        @previous_db: previously scanned layout
+        @scan_enums: Param to manually scan entries to find potential enum values
+        Return: current layout
+        """
+        database_fingerprint = self.return_database_fingerprint()
+        if database_fingerprint is not None and database_fingerprint == getattr(previous_db, "fingerprint", None):
+            return previous_db
+        previous_schemas = {schema.name: schema for schema in previous_db.schemas}
+        schemas = []
+        for schema_name in self.return_schema_names():
+            schema = self.refresh_schema(schema_name, previous_schemas.get(schema_name), scan_enums)
+            if schema is not None:
+                schemas.append(schema)
+
+        if [id(schema) for schema in schemas] == [id(schema) for schema in previous_db.schemas]:
+            previous_db.fingerprint = database_fingerprint
+            return previous_db
+        self.db = self.register_db(self.connection_data)
+        self.db.fingerprint = database_fingerprint
+        self.db.register_schemas(schemas)
+        self.db.carry_over_filters(previous_db, schemas)
         return self.return_db_layout()
 
     def return_cached_db(self, cached_layout: str) -> Database:
@@ -1,5 +1,4 @@
-import datetime
-import decimal
+from typing import Iterator
 
 from google.cloud import bigquery
 from google.oauth2 import service_account
@@ -7,11 +6,18 @@ from overrides import override
 
 from .baseconnector import BaseDBConnector
 from .connection_class import ConnectionInfo, BigQueryConnection
-from ..db_schema import Column, Table, Foreign_Key_Relation
+from .value_converters import bigquery_value_converter
+from ..db_schema import Column, Table, Foreign_Key_Relation, Database
 from ..enums import Data_Table_Type
 
 
 class BigQueryConnector(BaseDBConnector):
+    max_reflection_workers = 8  # the client is thread safe and reflection only issues independent api calls
+    supports_change_tracking = True
+    table_types = {1: Data_Table_Type.TABLE, 2: Data_Table_Type.VIEW}  # type codes of the __TABLES__ meta table
+    value_converter = bigquery_value_converter
+    result_page_size = 10000  # rows requested per page of a query result
+
     def __init__(self, big_query_connection_data: ConnectionInfo):
         super().__init__(big_query_connection_data)
         self.db_id = f"{big_query_connection_data.project_id}"  # .{big_query_connection_data.database_id}"
@@ -21,8 +27,8 @@ class BigQueryConnector(BaseDBConnector):
         self.pk_constraints = {}
         self.fk_constraints = {}
 
-        query_col_constraint = f"SELECT * FROM {self.connection_data.database_id}.INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE;"
-        query_col_usage = f"SELECT * FROM {self.connection_data.database_id}.INFORMATION_SCHEMA.KEY_COLUMN_USAGE;"
+        query_col_constraint = f"SELECT * FROM {self.connection_data.dataset_id}.INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE;"
+        query_col_usage = f"SELECT * FROM {self.connection_data.dataset_id}.INFORMATION_SCHEMA.KEY_COLUMN_USAGE;"
 
         for usage_row in self.connection.query_and_wait(query_col_usage):
 
@@ -125,25 +131,46 @@ class BigQueryConnector(BaseDBConnector):
         :param _input:
         :return: _input
         """
-        if isinstance(_input, decimal.Decimal):
-            return float(_input)
-        elif isinstance(_input, datetime.datetime):
-            try:
-                return _input.strftime("%d/%m/%Y %H:%M")
-            except Exception as e:
-                return str(_input)
-        elif isinstance(_input, datetime.date):
-            try:
-                return _input.strftime("%d/%m/%Y")
-            except Exception as e:
-                return str(_input)
-        else:
-            return _input
+        return self.value_converter.convert_value(_input)
+
+    @override
+    def return_table_fingerprints(self, schema_name: str) -> dict[str, tuple[Data_Table_Type, str | None]]:
+        """
+        Returns the last modification time of all tables and views of a dataset, read from the free __TABLES__ meta
+        table with a single query
+        """
+        fingerprints = {}
+        for row in self.connection.query_and_wait(
+                f"SELECT table_id, type, last_modified_time FROM `{self.db_id}.{schema_name}.__TABLES__`"):
+            if row.type in self.table_types:
+                fingerprints[row.table_id] = (self.table_types[row.type], str(row.last_modified_time))
+        return dict(sorted(fingerprints.items(), key=lambda item: (item[1][0] == Data_Table_Type.VIEW, item[0])))
+
+    @override
+    def refresh_db(self, previous_db: Database, scan_enums: bool = False) -> Database:
+        self.detect_column_constraints()
+        return super().refresh_db(previous_db, scan_enums)
 
     @override
     def return_schema_names(self) -> list[str]:
         return [x.dataset_id for x in self.connection.list_datasets()]
 
+    def result_pages(self, _sql, _max_rows=None, page_size: int | None = None) -> Iterator[list]:
+        """
+        @_sql:str
+        Runs a query and yields the column names followed by the rows of the result page by page. The row limit of
+        _max_rows and the page size are passed to the api and a page is only requested once the previous one was
+        consumed, so large results are never held completely
+        """
+        limit = self.row_limit(_max_rows)
+        page_size = page_size or self.result_page_size
+        if limit is not None:
+            page_size = min(page_size, limit)
+        row_iterator = self.connection.query_and_wait(_sql, page_size=page_size, max_results=limit)
+        yield [field.name for field in row_iterator.schema]
+        for page in row_iterator.pages:
+            yield [usage_row.values() for usage_row in page]
+
     @override
     def execute_sql_statement(self, _sql, _max_rows=None, autocommit=True):
         """
@@ -152,13 +179,23 @@ class BigQueryConnector(BaseDBConnector):
         """
         if not autocommit:
             raise Warning(f"BigQuery always autocommits, the behavious can not be disabled")
+        pages = self.result_pages(_sql, _max_rows)
+        header = next(pages)
         results = []
-        counter = 0
-        for usage_row in self.connection.query_and_wait(_sql):
-            if counter == 0:
-                results.append([x for x in usage_row.keys()])
-            counter += 1
-            results.append([self.convert_value(x) for x in list(usage_row.values())])
-            if counter > _max_rows:
-                break
-        return results
+        for rows in pages:
+            results.extend(self.value_converter.convert_rows(rows))
+        return [header] + results if results else results
+
+    @override
+    def stream_sql_statement(self, _sql, _max_rows=None, autocommit=True,
+                             chunk_size: int = 1000, convert_values: bool = True) -> Iterator[list]:
+        """
+        @_sql:str
+        Yields the column names and then the rows page by page as they are fetched from the api
+        """
+        if not autocommit:
+            raise Warning(f"BigQuery always autocommits, the behavious can not be disabled")
+        pages = self.result_pages(_sql, _max_rows, chunk_size)
+        yield next(pages)
+        for rows in pages:
+            yield self.value_converter.convert_rows(rows) if convert_values else rows
@@ -1,18 +1,59 @@
+import threading
+import uuid
+from typing import Iterator
+
 import redshift_connector
 from overrides import override
 
 from .baseconnector import BaseDBConnector
 from .connection_class import ConnectionInfo, RedshiftConnection, RedshiftConnectionSSO
-from ..db_schema import Column, Table, Foreign_Key_Relation, parse_db_layout
+from ..db_schema import Column, Table, Schema, Foreign_Key_Relation, parse_db_layout, is_read_query
 
 
 class RedshiftConnector(BaseDBConnector):
     """
     Connector available for all redshift data warehouses
     """
+    max_reflection_workers = 4  # each reflection thread opens its own connection to the cluster
+    max_cursor_fetch_size = 1000  # redshift returns at most 1000 rows per FETCH on single node clusters
 
     def __init__(self, redshift_connection_data: ConnectionInfo):
         super().__init__(redshift_connection_data)
+        self._parallel_reflection = False
+        self._thread_connections = {}
+        self._thread_connections_lock = threading.Lock()
+
+    def thread_connection(self):
+        """
+        Returns the connection of the current thread. Redshift connections can not be used by multiple threads at
+        once, so threads reflecting concurrently get an additional connection that is closed after the scan
+        """
+        if not self._parallel_reflection:
+            return self.connection
+        thread_id = threading.get_ident()
+        with self._thread_connections_lock:
+            if thread_id not in self._thread_connections:
+                self._thread_connections[thread_id] = self.connect(self.connection_data)
+            return self._thread_connections[thread_id]
+
+    @override
+    def return_schemas(self, scan_enums: bool) -> list[Schema]:
+        self._parallel_reflection = min(self.reflection_workers, self.max_reflection_workers) > 1
+        try:
+            return super().return_schemas(scan_enums)
+        finally:
+            self._parallel_reflection = False
+
+    @override
+    def release_reflection_resources(self) -> None:
+        with self._thread_connections_lock:
+            connections = list(self._thread_connections.values())
+            self._thread_connections = {}
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
 
     def connect(self, redshift_connection_data):
         if isinstance(redshift_connection_data, RedshiftConnection):
@@ -87,6 +128,63 @@ class RedshiftConnector(BaseDBConnector):
         cached_fk_relations = [Foreign_Key_Relation(**x) for x in db_str_struct[schema_name][table]["fk_relations"]]
         return Table(table, pk_name, all_cached_cols, _table_type, cached_fk_relations)
 
+    @staticmethod
+    def _fetchmany(cursor, batch_size: int) -> Iterator[list]:
+        while rows := cursor.fetchmany(batch_size):
+            yield list(rows)
+
+    def fetch_batches(self, connection, _sql, _max_rows=None, batch_size: int = 1000) -> Iterator[list]:
+        """
+        Executes a sql statement and yields the column names followed by batches of at most batch_size rows, stopping
+        at the row limit of _max_rows. The driver reads the complete result of a statement into memory, so single
+        select statements are read through a server side cursor and only the fetched rows are transferred.
+        @connection: connection the statement is executed on
+        @_sql: sql statement
+        @batch_size: maximum number of rows per batch
+        Return: generator of the column names and batches of rows
+        """
+        with connection.cursor() as cursor:
+            if connection.autocommit or not is_read_query(_sql, "Redshift"):
+                cursor.execute(_sql)
+                if cursor.description is None:
+                    # statement without a result set
+                    yield []
+                    return
+                yield [x[0] for x in cursor.description]
+                yield from self.limit_partitions(self._fetchmany(cursor, batch_size), _max_rows)
+                return
+
+            cursor_name = f"turbular_{uuid.uuid4().hex}"
+            cursor.execute(f"DECLARE {cursor_name} CURSOR FOR {_sql.strip().rstrip(';')}")
+            completed = False
+            try:
+                remaining = self.row_limit(_max_rows)
+                header = None
+                while remaining is None or remaining > 0:
+                    fetch_size = min(batch_size, self.max_cursor_fetch_size)
+                    if remaining is not None:
+                        fetch_size = min(fetch_size, remaining)
+                    cursor.execute(f"FETCH FORWARD {fetch_size} FROM {cursor_name}")
+                    rows = cursor.fetchall()
+                    if header is None:
+                        header = [x[0] for x in cursor.description]
+                        yield header
+                    if not rows:
+                        break
+                    if remaining is not None:
+                        remaining -= len(rows)
+                    yield list(rows)
+                if header is None:
+                    yield []
+                completed = True
+            finally:
+                try:
+                    cursor.execute(f"CLOSE {cursor_name}")
+                except Exception:
+                    # the transaction is aborted if reading failed, the original error is raised instead
+                    if completed:
+                        raise
+
     @override
     def execute_sql_statement(self, _sql, _max_rows=None, autocommit=False):
 
@@ -94,19 +192,28 @@ class RedshiftConnector(BaseDBConnector):
         @_sql:str
         Returns result of sql statement
         """
-        returned_rows = []
-        with self.connection.cursor() as cursor:
-            cursor.execute(_sql)
-            result: tuple = cursor.fetchall()
-            returned_rows.append([x[0] for x in cursor.description])
-            counter = 0
-            for row in result:
-                returned_rows.append(row)
-                counter += 1
-                if _max_rows is not None and _max_rows < counter:
-                    break
-
-            if autocommit:
-                self.connection.commit()  # TODO check whether this applies to all previous sql executes
+        connection = self.thread_connection()
+        batches = self.fetch_batches(connection, _sql, _max_rows)
+        returned_rows = [next(batches)]
+        for rows in batches:
+            returned_rows.extend(rows)
+
+        if autocommit:
+            connection.commit()  # TODO check whether this applies to all previous sql executes
 
         return returned_rows
+
+    @override
+    def stream_sql_statement(self, _sql, _max_rows=None, autocommit=False,
+                             chunk_size: int = 1000, convert_values: bool = True) -> Iterator[list]:
+        """
+        @_sql:str
+        Yields the column names and then chunks of rows fetched from the cursor. With autocommit all batches are fetched
+        and committed first, as a client that disconnects early would otherwise leave the statement uncommitted
+        """
+        connection = self.thread_connection()
+        batches = self.fetch_batches(connection, _sql, _max_rows, chunk_size)
+        if autocommit:
+            batches = list(batches)
+            connection.commit()
+        yield from batches
@@ -0,0 +1,394 @@
+import logging
+import re
+from typing import NamedTuple
+
+import hashlib
+
+from sqlalchemy import text, bindparam, Connection, Inspector
+from sqlalchemy.engine.default import DefaultDialect
+from sqlalchemy.engine.reflection import ObjectKind
+from sqlalchemy.sql import sqltypes
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaReflection(NamedTuple):
+    """
+    Catalog information of all tables and views of a schema. Columns, primary keys and foreign keys are keyed by
+    table name and use the same dict layout as the single table methods of the sqlalchemy Inspector
+    """
+    tables: list[str]
+    views: list[str]
+    columns: dict[str, list[dict]]
+    pk_constraints: dict[str, dict]
+    foreign_keys: dict[str, list[dict]]
+
+    def pk_constraint(self, table_name: str) -> dict:
+        return self.pk_constraints.get(table_name, {"constrained_columns": [], "name": None})
+
+
+def supports_multi_reflection(dialect) -> bool:
+    """
+    Returns whether the dialect reflects many tables with a single catalog query. The default implementation of
+    sqlalchemy only loops over the single table methods
+    @dialect: sqlalchemy dialect
+    Return: Boolean
+    """
+    return type(dialect).get_multi_columns is not DefaultDialect.get_multi_columns
+
+
+def reflect_schema(inspection: Inspector, connection: Connection, schema_name: str | None,
+                   table_names: list[str] | None = None) -> SchemaReflection:
+    """
+    Reflects all tables and views of a schema with a constant number of catalog queries. Dialects with native
+    multi reflection (e.g. PostgreSQL, Oracle) use the get_multi_* methods of the Inspector, SQLite, MySQL and MsSql
+    use hand written bulk catalog queries
+    @inspection: inspector of the database
+    @connection: connection used for the bulk catalog queries
+    @schema_name: name of the schema
+    @table_names: only reflect columns and constraints of these tables, all tables if None
+    Return: reflection of the schema
+    """
+    tables = inspection.get_table_names(schema_name)
+    views = inspection.get_view_names(schema_name)
+    dialect = inspection.dialect
+    if not supports_multi_reflection(dialect) and supports_bulk_reflection(dialect):
+        try:
+            columns, pk_constraints, foreign_keys = bulk_reflectors[dialect.name](connection, dialect, schema_name,
+                                                                                table_names)
+            return SchemaReflection(tables, views, columns, pk_constraints, foreign_keys)
+        except (AttributeError, TypeError, ImportError) as e:
+            # the dialect internals used by the bulk reflector changed, the Inspector is slower but always works
+            logger.warning(f"Bulk reflection is not supported by this sqlalchemy version, falling back to the "
+                           f"Inspector: {e!r}")
+    columns, pk_constraints, foreign_keys = _reflect_multi(inspection, schema_name, table_names)
+    return SchemaReflection(tables, views, columns, pk_constraints, foreign_keys)
+
+
+def _reflect_multi(inspection: Inspector, schema_name: str | None, table_names: list[str] | None):
+    kw = {"schema": schema_name, "kind": ObjectKind.TABLE | ObjectKind.VIEW, "filter_names": table_names}
+
+    def by_table_name(reflected: dict) -> dict:
+        return {table_name: value for (_, table_name), value in reflected.items()}
+
+    return (by_table_name(inspection.get_multi_columns(**kw)),
+            by_table_name(inspection.get_multi_pk_constraint(**kw)),
+            by_table_name(inspection.get_multi_foreign_keys(**kw)))
+
+
+def _names_filter(column: str, table_names: list[str] | None) -> str:
+    """
+    Returns the condition restricting a bulk catalog query to the given tables, bound to the expanding names param
+    """
+    return "" if table_names is None else f" AND {column} IN :names"
+
+
+def _catalog_query(statement: str, table_names: list[str] | None):
+    query = text(statement)
+    return query if table_names is None else query.bindparams(bindparam("names", expanding=True))
+
+
+def _reflect_sqlite(connection: Connection, dialect, schema_name: str | None, table_names: list[str] | None):
+    """
+    Reflects a sqlite schema with the table valued pragma functions, joined against sqlite_master so every table of
+    the schema is covered by one statement
+    """
+    schema_expr = f"{dialect.identifier_preparer.quote_identifier(schema_name)}." if schema_name else ""
+    params = {"schema": schema_name or "main", "names": table_names}
+    objects = (f"FROM {schema_expr}sqlite_master AS m JOIN {{pragma}}(m.name, :schema) AS p "
+               f"WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite~_%' ESCAPE '~'"
+               f"{_names_filter('m.name', table_names)}")
+
+    table_sql = {name: sql for name, sql in connection.execute(text(
+        f"SELECT name, sql FROM {schema_expr}sqlite_master WHERE type IN ('table', 'view')"))}
+
+    # computed columns are hidden in table_info, table_xinfo is available from sqlite 3.31 on
+    if dialect.server_version_info >= (3, 31):
+        column_rows = connection.execute(_catalog_query(
+            f"SELECT m.name, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk, p.hidden "
+            f"{objects.format(pragma='pragma_table_xinfo')} ORDER BY m.name, p.cid", table_names), params)
+    else:
+        column_rows = connection.execute(_catalog_query(
+            f"SELECT m.name, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk, 0 "
+            f"{objects.format(pragma='pragma_table_info')} ORDER BY m.name, p.cid", table_names), params)
+
+    columns = {}
+    pk_columns = {}
+    for table_name, name, type_, notnull, default, primary_key, hidden in column_rows:
+        if hidden == 1:
+            continue
+        columns.setdefault(table_name, []).append(dialect._get_column_info(
+            name, type_.upper(), not notnull, default, primary_key, bool(hidden), hidden == 3,
+            table_sql.get(table_name)))
+        if primary_key > 0:
+            pk_columns.setdefault(table_name, []).append((primary_key, name))
+
+    pk_constraints = {}
+    for table_name, pk_cols in pk_columns.items():
+        constraint_name = re.search(r"CONSTRAINT (\w+) PRIMARY KEY", table_sql.get(table_name) or "", re.I)
+        pk_constraints[table_name] = {"constrained_columns": [name for _, name in sorted(pk_cols)],
+                                      "name": constraint_name.group(1) if constraint_name else None}
+
+    foreign_keys = {}
+    fk_rows = connection.execute(_catalog_query(
+        f"SELECT m.name, p.id, p.\"table\", p.\"from\", p.\"to\" "
+        f"{objects.format(pragma='pragma_foreign_key_list')} ORDER BY m.name, p.id, p.seq", table_names), params)
+    for table_name, fk_id, referred_table, constrained_column, referred_column in fk_rows:
+        if dialect._broken_fk_pragma_quotes:
+            referred_table = re.sub(r"^[\"\[`\']|[\"\]`\']$", "", referred_table)
+        table_fks = foreign_keys.setdefault(table_name, {})
+        if fk_id not in table_fks:
+            table_fks[fk_id] = {"name": None, "constrained_columns": [], "referred_schema": schema_name,
+                                "referred_table": referred_table, "referred_columns": [], "options": {}}
+        table_fks[fk_id]["constrained_columns"].append(constrained_column)
+        if referred_column:
+            table_fks[fk_id]["referred_columns"].append(referred_column)
+
+    for table_fks in foreign_keys.values():
+        for fk in table_fks.values():
+            if not fk["referred_columns"]:
+                # the referred columns were not named in the ddl, the constraint points to the primary key
+                if fk["referred_table"] in pk_constraints:
+                    referred_pk = pk_constraints[fk["referred_table"]]
+                elif fk["referred_table"] in table_sql and table_names is not None:
+                    # the referred table is not part of the reflected subset
+                    referred_pk = dialect.get_pk_constraint(connection, fk["referred_table"], schema_name)
+                else:
+                    referred_pk = {"constrained_columns": []}
+                fk["referred_columns"] = list(referred_pk["constrained_columns"])
+    return columns, pk_constraints, {name: list(table_fks.values()) for name, table_fks in foreign_keys.items()}
+
+
+def _reflect_mysql(connection: Connection, dialect, schema_name: str | None, table_names: list[str] | None):
+    """
+    Reflects a MySQL schema from information_schema. Column types are parsed by the column parser of the dialect
+    which is also used for SHOW CREATE TABLE, so they match the single table reflection
+    """
+    from sqlalchemy.dialects.mysql.reflection import ReflectedState
+
+    params = {"schema": schema_name, "names": table_names}
+    schema_filter = f"TABLE_SCHEMA = COALESCE(:schema, DATABASE()){_names_filter('TABLE_NAME', table_names)}"
+    parser = dialect._tabledef_parser
+    quote = dialect.identifier_preparer.quote_identifier
+
+    columns = {}
+    for table_name, name, column_type, is_nullable, extra in connection.execute(_catalog_query(
+            f"SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, EXTRA FROM information_schema.COLUMNS "
+            f"WHERE {schema_filter} ORDER BY TABLE_NAME, ORDINAL_POSITION", table_names), params):
+        state = ReflectedState()
+        line = f"  {quote(name)} {column_type}{' NOT NULL' if is_nullable == 'NO' else ''}"
+        if "auto_increment" in (extra or "").lower():
+            line += " AUTO_INCREMENT"
+        parser._parse_column(line, state)
+        columns.setdefault(table_name, []).extend(state.columns)
+
+    pk_constraints = {}
+    for table_name, name in connection.execute(_catalog_query(
+            f"SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+            f"WHERE {schema_filter} AND CONSTRAINT_NAME = 'PRIMARY' ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            table_names), params):
+        pk_constraints.setdefault(table_name, {"constrained_columns": [], "name": None})[
+            "constrained_columns"].append(name)
+
+    foreign_keys = {}
+    for table_name, constraint_name, name, referred_schema, referred_table, referred_column in connection.execute(
+            _catalog_query(
+                f"SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_SCHEMA, REFERENCED_TABLE_NAME, "
+                f"REFERENCED_COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                f"WHERE {schema_filter} AND REFERENCED_TABLE_NAME IS NOT NULL "
+                f"ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION", table_names), params):
+        table_fks = foreign_keys.setdefault(table_name, {})
+        if constraint_name not in table_fks:
+            table_fks[constraint_name] = {"name": constraint_name, "constrained_columns": [],
+                                          "referred_schema": referred_schema, "referred_table": referred_table,
+                                          "referred_columns": [], "options": {}}
+        table_fks[constraint_name]["constrained_columns"].append(name)
+        table_fks[constraint_name]["referred_columns"].append(referred_column)
+    return columns, pk_constraints, {name: list(table_fks.values()) for name, table_fks in foreign_keys.items()}
+
+
+def _reflect_mssql(connection: Connection, dialect, schema_name: str | None, table_names: list[str] | None):
+    """
+    Reflects a MsSql schema from INFORMATION_SCHEMA, column types are built the same way as in the mssql dialect
+    """
+    from sqlalchemy.dialects.mssql.base import MSString, MSChar, MSNVarchar, MSNChar, MSText, MSNText, MSBinary, \
+        MSVarBinary
+
+    params = {"schema": schema_name, "names": table_names}
+    sized_types = (MSString, MSChar, MSNVarchar, MSNChar, MSText, MSNText, MSBinary, MSVarBinary,
+                   sqltypes.LargeBinary)
+
+    columns = {}
+    for table_name, name, data_type, is_nullable, char_length, numeric_precision, numeric_scale, collation \
+            in connection.execute(_catalog_query(
+                "SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, "
+                "NUMERIC_SCALE, COLLATION_NAME FROM INFORMATION_SCHEMA.COLUMNS "
+                f"WHERE TABLE_SCHEMA = COALESCE(:schema, SCHEMA_NAME()){_names_filter('TABLE_NAME', table_names)} "
+                "ORDER BY TABLE_NAME, ORDINAL_POSITION", table_names), params):
+        coltype = dialect.ischema_names.get(data_type)
+        kwargs = {}
+        if coltype is None:
+            coltype = sqltypes.NULLTYPE
+        else:
+            if coltype in sized_types:
+                kwargs["length"] = None if char_length == -1 else char_length
+                if collation:
+                    kwargs["collation"] = collation
+            if issubclass(coltype, sqltypes.Numeric):
+                kwargs["precision"] = numeric_precision
+                if not issubclass(coltype, sqltypes.Float):
+                    kwargs["scale"] = numeric_scale
+            coltype = coltype(**kwargs)
+        columns.setdefault(table_name, []).append({"name": name, "type": coltype, "nullable": is_nullable == "YES"})
+
+    pk_constraints = {}
+    for table_name, constraint_name, name in connection.execute(_catalog_query(
+            "SELECT c.TABLE_NAME, c.CONSTRAINT_NAME, k.COLUMN_NAME FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS c "
+            "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS k "
+            "ON k.CONSTRAINT_SCHEMA = c.CONSTRAINT_SCHEMA AND k.CONSTRAINT_NAME = c.CONSTRAINT_NAME "
+            "WHERE c.TABLE_SCHEMA = COALESCE(:schema, SCHEMA_NAME()) AND c.CONSTRAINT_TYPE = 'PRIMARY KEY'"
+            f"{_names_filter('c.TABLE_NAME', table_names)} ORDER BY c.TABLE_NAME, k.ORDINAL_POSITION",
+            table_names), params):
+        pk_constraints.setdefault(table_name, {"constrained_columns": [], "name": constraint_name})[
+            "constrained_columns"].append(name)
+
+    foreign_keys = {}
+    for table_name, constraint_name, name, referred_schema, referred_table, referred_column in connection.execute(
+            _catalog_query(
+                "SELECT k.TABLE_NAME, r.CONSTRAINT_NAME, k.COLUMN_NAME, rk.TABLE_SCHEMA, rk.TABLE_NAME, rk.COLUMN_NAME "
+                "FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS AS r "
+                "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS k "
+                "ON k.CONSTRAINT_SCHEMA = r.CONSTRAINT_SCHEMA AND k.CONSTRAINT_NAME = r.CONSTRAINT_NAME "
+                "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS rk "
+                "ON rk.CONSTRAINT_SCHEMA = r.UNIQUE_CONSTRAINT_SCHEMA AND rk.CONSTRAINT_NAME = r.UNIQUE_CONSTRAINT_NAME "
+                "AND rk.ORDINAL_POSITION = k.ORDINAL_POSITION "
+                "WHERE k.TABLE_SCHEMA = COALESCE(:schema, SCHEMA_NAME())"
+                f"{_names_filter('k.TABLE_NAME', table_names)} "
+                "ORDER BY k.TABLE_NAME, r.CONSTRAINT_NAME, k.ORDINAL_POSITION", table_names), params):
+        table_fks = foreign_keys.setdefault(table_name, {})
+        if constraint_name not in table_fks:
+            table_fks[constraint_name] = {
+                "name": constraint_name, "constrained_columns": [],
+                "referred_schema": referred_schema if schema_name is not None else None,
+                "referred_table": referred_table, "referred_columns": [], "options": {}}
+        table_fks[constraint_name]["constrained_columns"].append(name)
+        table_fks[constraint_name]["referred_columns"].append(referred_column)
+    return columns, pk_constraints, {name: list(table_fks.values()) for name, table_fks in foreign_keys.items()}
+
+
+bulk_reflectors = {
+    "sqlite": _reflect_sqlite,
+    "mysql": _reflect_mysql,
+    "mariadb": _reflect_mysql,
+    "mssql": _reflect_mssql,
+}
+
+# private members of the dialects used by the bulk reflectors, written against SQLAlchemy 2.0.21. They are no public
+# api and may change with any release, reflect_schema falls back to the Inspector if they are missing or fail
+private_dialect_members = {
+    "sqlite": ("_get_column_info", "_broken_fk_pragma_quotes"),
+    "mysql": ("_tabledef_parser._parse_column",),
+    "mariadb": ("_tabledef_parser._parse_column",),
+}
+
+
+def supports_bulk_reflection(dialect) -> bool:
+    """
+    Returns whether a bulk reflector exists for the dialect and all private dialect members it uses are available
+    @dialect: sqlalchemy dialect
+    Return: Boolean
+    """
+    if dialect.name not in bulk_reflectors:
+        return False
+    for member in private_dialect_members.get(dialect.name, ()):
+        value = dialect
+        for name in member.split("."):
+            value = getattr(value, name, None)
+            if value is None:
+                return False
+    return True
+
+
+def _hash_rows(rows) -> dict[str, tuple[bool, str]]:
+    return {name: (is_view, hashlib.md5(str(state).encode()).hexdigest()) for name, is_view, state in rows}
+
+
+def _sqlite_fingerprints(connection: Connection, dialect, schema_name: str | None) -> dict[str, tuple[bool, str]]:
+    # the stored ddl of a table changes with every alter table
+    schema_expr = f"{dialect.identifier_preparer.quote_identifier(schema_name)}." if schema_name else ""
+    return _hash_rows(connection.execute(text(
+        f"SELECT name, type = 'view', sql FROM {schema_expr}sqlite_master "
+        f"WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite~_%' ESCAPE '~'")))
+
+
+def _postgresql_fingerprints(connection: Connection, dialect, schema_name: str | None) -> dict[str, tuple[bool, str]]:
+    # every ddl statement rewrites the catalog rows of the relation, its columns or its constraints and with them
+    # their xmin
+    return _hash_rows(connection.execute(text(
+        "SELECT c.relname, c.relkind = 'v', c.xmin::text || ':' || "
+        "COALESCE((SELECT string_agg(a.xmin::text, ',' ORDER BY a.attnum) FROM pg_catalog.pg_attribute AS a "
+        "WHERE a.attrelid = c.oid AND a.attnum > 0), '') || ':' || "
+        "COALESCE((SELECT string_agg(o.xmin::text, ',' ORDER BY o.oid) FROM pg_catalog.pg_constraint AS o "
+        "WHERE o.conrelid = c.oid), '') "
+        "FROM pg_catalog.pg_class AS c JOIN pg_catalog.pg_namespace AS n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = COALESCE(:schema, current_schema()) AND c.relkind IN ('r', 'p', 'v')"),
+        {"schema": schema_name}))
+
+
+def _mysql_fingerprints(connection: Connection, dialect, schema_name: str | None) \
+        -> dict[str, tuple[bool, str | None]]:
+    # views have no create time and are always reflected again
+    return {name: (table_type != "BASE TABLE", None if created is None else str(created))
+            for name, table_type, created in connection.execute(text(
+                "SELECT TABLE_NAME, TABLE_TYPE, CREATE_TIME FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())"), {"schema": schema_name})}
+
+
+def _mssql_fingerprints(connection: Connection, dialect, schema_name: str | None) -> dict[str, tuple[bool, str]]:
+    return {name: (object_type.strip() == "V", str(modified)) for name, object_type, modified in connection.execute(
+        text("SELECT o.name, o.type, o.modify_date FROM sys.objects AS o "
+             "JOIN sys.schemas AS s ON s.schema_id = o.schema_id "
+             "WHERE s.name = COALESCE(:schema, SCHEMA_NAME()) AND o.type IN ('U', 'V')"), {"schema": schema_name})}
+
+
+fingerprint_queries = {
+    "sqlite": _sqlite_fingerprints,
+    "postgresql": _postgresql_fingerprints,
+    "mysql": _mysql_fingerprints,
+    "mariadb": _mysql_fingerprints,
+    "mssql": _mssql_fingerprints,
+}
+
+
+def table_fingerprints(connection: Connection, dialect, schema_name: str | None) \
+        -> dict[str, tuple[bool, str | None]] | None:
+    """
+    Returns a value per table and view of a schema which changes whenever the definition of the table changes,
+    read with a single catalog query. Tables come first and views second, each sorted by name
+    @connection: connection used for the catalog query
+    @dialect: sqlalchemy dialect
+    @schema_name: name of the schema
+    Return: dict of table name to tuple of whether it is a view and its fingerprint, a fingerprint of None means
+    unknown. None if the dialect has no change tracking
+    """
+    if dialect.name not in fingerprint_queries:
+        return None
+    fingerprints = fingerprint_queries[dialect.name](connection, dialect, schema_name)
+    return dict(sorted(fingerprints.items(), key=lambda item: (bool(item[1][0]), item[0])))
+
+
+def database_fingerprint(connection: Connection, dialect, schema_names: list[str]) -> str | None:
+    """
+    Returns a value which changes whenever any definition in the given schemas changes. Only sqlite tracks this
+    cheaply with its schema cookie, None for all other dialects
+    @connection: connection used for the catalog query
+    @dialect: sqlalchemy dialect
+    @schema_names: names of the schemas
+    Return: fingerprint or None
+    """
+    if dialect.name != "sqlite":
+        return None
+    quote = dialect.identifier_preparer.quote_identifier
+    versions = [f"{schema}:{connection.exec_driver_sql(f'PRAGMA {quote(schema)}.schema_version').scalar()}"
+                for schema in schema_names]
+    return "|".join(versions)
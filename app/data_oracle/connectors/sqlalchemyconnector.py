@@ -1,61 +1,130 @@
-import datetime
-import decimal
+import ssl
+from contextlib import contextmanager
+from typing import Iterator
 from overrides import override
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, inspect, text, Engine, URL, QueuePool
 
 from .baseconnector import BaseDBConnector
 from .connection_class import ConnectionInfo, ConnectionDetails, FileConnection
-from ..db_schema import Column, Table, Foreign_Key_Relation
+from .value_converters import sqlalchemy_value_converter
+from .sqlalchemy_reflection import SchemaReflection, reflect_schema, table_fingerprints, database_fingerprint
+from ..db_schema import Column, Table, Foreign_Key_Relation, Database
 from ..enums import Data_Table_Type
 
 
+drivername_mapper = {
+    'MySQL': 'mysql+pymysql',
+    'PostgreSQL': 'postgresql+psycopg',
+    'Oracle': 'oracle+oracledb',
+    'MsSql': 'mssql+pyodbc',
+    'SQLite': 'sqlite'
+}
+
+async_drivername_mapper = {
+    'MySQL': 'mysql+aiomysql',
+    'PostgreSQL': 'postgresql+psycopg',  # psycopg 3 selects its async dialect when used with create_async_engine
+    'SQLite': 'sqlite+aiosqlite'
+}
+
+
+def return_engine_args(connection_data: ConnectionInfo, use_async: bool = False) -> tuple[URL | str, dict]:
+    """
+    Returns the url and connect args needed to create an engine for the given connection data
+    @connection_data: ConnectionDetails or FileConnection object
+    @use_async: whether to use the async driver of the database
+    Return: tuple of url and connect args
+    """
+    mapper = async_drivername_mapper if use_async else drivername_mapper
+    # Snowflake https://stackoverflow.com/questions/70228997/how-to-connect-sqlalchemy-to-snowflake-database-using-oauth2
+    if type(connection_data) == ConnectionDetails:
+        if connection_data.database_type not in mapper:
+            raise ValueError(f"No {'async ' if use_async else ''}driver available for "
+                             f"{connection_data.database_type}")
+        suffix = {}
+        if connection_data.database_type == "MsSql":
+            suffix = {"driver": "ODBC Driver 17 for SQL Server", "TrustServerCertificate": "yes"}
+        driver = mapper[connection_data.database_type]
+        url_object = connection_data.return_url_string(driver, suffix=suffix)
+
+        ssl_args = {}
+        if connection_data.ssl:
+            if connection_data.database_type == 'MySQL':
+                if use_async:
+                    # aiomysql expects a ssl context instead of a dict
+                    ssl_args = {"ssl": ssl.create_default_context(cafile=connection_data.ssl_credentials)}
+                else:
+                    ssl_args = {"ssl": {
+                        # or change to verify-ca or verify-full based on your requirement
+                        'ca': connection_data.ssl_credentials,  # path to your .crt file
+                    }}
+            elif connection_data.database_type == 'PostgreSQL':
+                ssl_args = {
+                    'sslmode': 'prefer',
+                    'sslrootcert': connection_data.ssl_credentials
+                }
+        return url_object, ssl_args
+    elif type(connection_data) == FileConnection:
+        return f"{mapper['SQLite']}:///{connection_data.path}", {}
+    raise ValueError(f'Unknown connection data object of type {type(connection_data)}')
+
+
+def create_sqlalchemy_engine(connection_data: ConnectionInfo, **engine_kwargs) -> Engine:
+    """
+    Creates a sqlalchemy engine for the given connection data
+    @connection_data: ConnectionDetails or FileConnection object
+    @engine_kwargs: additional keyword arguments passed on to create_engine, e.g. pool settings
+    Return: sqlalchemy engine
+    """
+    url_object, connect_args = return_engine_args(connection_data)
+    if connect_args:
+        return create_engine(url_object, connect_args=connect_args, **engine_kwargs)
+    return create_engine(url_object, **engine_kwargs)
+
+
 class SqlAlchemyConnector(BaseDBConnector):
     """
     Connector available for all Sql Dbs that can be accessed with Sqlalchemy
     """
+    supports_change_tracking = True
+    value_converter = sqlalchemy_value_converter
+    convert_batch_size = 1000  # rows fetched and converted at once by execute_sql_statement
 
-    def __init__(self, connection_data: ConnectionInfo):
+    def __init__(self, connection_data: ConnectionInfo, engine: Engine | None = None):
+        """
+        @connection_data: holds all necessary args for connection
+        @engine: already created engine to reuse, e.g. one handed out by a pool registry. If None a new engine
+        is created for this connector
+        """
+        self.engine = engine
         super().__init__(connection_data)
         self.inspection = inspect(self.connection)
-        self.fk_relations = {}
-        self.pk = {}
+        self.reflected_schemas: dict[str, SchemaReflection] = {}
 
     @override
     def connect(self, connection_data):
-        drivername_mapper = {
-            'MySQL': 'mysql+pymysql',
-            'PostgreSQL': 'postgresql+psycopg',
-            'Oracle': 'oracle+oracledb',
-            'MsSql': 'mssql+pyodbc',
-            'SQLite': 'sqlite'
-        }
-        # Snowflake https://stackoverflow.com/questions/70228997/how-to-connect-sqlalchemy-to-snowflake-database-using-oauth2
         if type(connection_data) == ConnectionDetails:
-            suffix = {}
-            if connection_data.database_type == "MsSql":
-                suffix = {"driver": "ODBC Driver 17 for SQL Server", "TrustServerCertificate": "yes"}
-            driver = drivername_mapper[connection_data.database_type]
             self.type = connection_data.database_type
-            url_object = connection_data.return_url_string(driver, suffix=suffix)
+        elif type(connection_data) == FileConnection:
+            self.type = connection_data.type
+        if self.engine is not None:
+            return self.engine
+        return create_sqlalchemy_engine(connection_data)
 
-            if connection_data.ssl:
-                if connection_data.database_type == 'MySQL':
-                    ssl_args = {"ssl": {
-                        # or change to verify-ca or verify-full based on your requirement
-                        'ca': connection_data.ssl_credentials,  # path to your .crt file
-                    }}
-                elif connection_data.database_type == 'PostgreSQL':
-                    ssl_args = {
-                        'sslmode': 'prefer',
-                        'sslrootcert': connection_data.ssl_credentials
-                    }
-                else:
-                    ssl_args = {}
-                return create_engine(url_object, connect_args=ssl_args)
+    @property
+    def max_reflection_workers(self) -> int:
+        """
+        Concurrent reflection is limited by the connections the pool of the engine keeps open
+        """
+        pool = self.connection.pool
+        return pool.size() if isinstance(pool, QueuePool) else 1
 
-            return create_engine(url_object)
-        elif type(connection_data) == FileConnection:
-            return create_engine("sqlite:///" + connection_data.path)
+    @contextmanager
+    def reflection_connection(self):
+        """
+        Yields the connection used for statements issued while scanning the db
+        """
+        with self.connection.connect() as conn:
+            yield conn
 
     @override
     def is_available(self):
@@ -70,44 +139,74 @@ class SqlAlchemyConnector(BaseDBConnector):
         except:
             return False
 
+    def reflect_schema(self, schema_name: str) -> SchemaReflection:
+        """
+        Returns the catalog information of all tables and views of a schema. The schema is reflected in bulk on first
+        access so the number of catalog queries does not grow with the number of tables
+        """
+        if schema_name not in self.reflected_schemas:
+            self.register_reflection(schema_name)
+        return self.reflected_schemas[schema_name]
+
+    def register_reflection(self, schema_name: str, table_names: list[str] | None = None) -> None:
+        """
+        Reflects a schema in bulk, pk and fk columns are read from the reflection of their own schema since tables of
+        different schemas may share a name
+        @schema_name: name of the schema
+        @table_names: only reflect columns and constraints of these tables, all tables if None
+        """
+        with self.reflection_connection() as conn:
+            reflection = reflect_schema(self.inspection, conn, schema_name, table_names)
+        self.reflected_schemas[schema_name] = reflection
+
+    @override
+    def prepare_table_reflection(self, schema_name: str, table_names: list[str]) -> None:
+        self.register_reflection(schema_name, table_names)
+
+    @override
+    def return_database_fingerprint(self) -> str | None:
+        with self.reflection_connection() as conn:
+            return database_fingerprint(conn, self.inspection.dialect, self.return_schema_names())
+
+    @override
+    def return_table_fingerprints(self, schema_name: str) -> dict[str, tuple[Data_Table_Type, str | None]] | None:
+        with self.reflection_connection() as conn:
+            fingerprints = table_fingerprints(conn, self.inspection.dialect, schema_name)
+        if fingerprints is None:
+            return None
+        return {name: (Data_Table_Type.VIEW if is_view else Data_Table_Type.TABLE, fingerprint)
+                for name, (is_view, fingerprint) in fingerprints.items()}
+
+    @override
+    def refresh_db(self, previous_db: Database, scan_enums: bool = False) -> Database:
+        self.reflected_schemas = {}
+        self.inspection.clear_cache()
+        return super().refresh_db(previous_db, scan_enums)
+
+    @override
+    def scan_db(self, scan_enums: bool = False) -> Database:
+        self.reflected_schemas = {}
+        self.inspection.clear_cache()
+        return super().scan_db(scan_enums)
+
     @override
     def return_table_names(self, schema_name: str) -> list[str]:
         """
         Returns list of table names and detects fk and pk columns
         """
-        table_names = self.inspection.get_table_names(schema_name)
-        for _table in table_names:
-            self.pk[_table] = {x: x for x in
-                               self.inspection.get_pk_constraint(_table, schema_name)["constrained_columns"]}
-            self.fk_relations[_table] = {}
-            fk_relations = self.inspection.get_foreign_keys(_table, schema_name)
-            for fk_relation in fk_relations:
-                for _col in fk_relation["constrained_columns"]:
-                    self.fk_relations[_table][_col] = fk_relation["referred_table"]
-
-        return table_names
+        return self.reflect_schema(schema_name).tables
 
     @override
     def return_view_names(self, schema_name: str) -> list[str]:
         """
         Returns list of view names
         """
-        view_names = self.inspection.get_view_names(schema_name)
-        for _table in view_names:
-            self.pk[_table] = {x: x for x in
-                               self.inspection.get_pk_constraint(_table, schema_name)["constrained_columns"]}
-            self.fk_relations[_table] = {}
-            fk_relations = self.inspection.get_foreign_keys(_table, schema_name)
-            for fk_relation in fk_relations:
-                for _col in fk_relation["constrained_columns"]:
-                    self.fk_relations[_table][_col] = fk_relation["referred_table"]
-
-        return view_names
+        return self.reflect_schema(schema_name).views
 
     @override
     def return_schema_names(self) -> list[str]:
         blacklist = {'information_schema', 'INFORMATION_SCHEMA'}
-        if self.connection_data.database_type == "MsSql":
+        if self.type == "MsSql":
             blacklist = blacklist | {'db_accessadmin', 'db_backupoperator', 'db_datareader', 'db_datawriter',
                                      'db_ddladmin', 'db_denydatareader',
                                      'db_denydatawriter', 'db_owner', 'db_securityadmin', 'guest', 'sys'}
@@ -121,7 +220,7 @@ class SqlAlchemyConnector(BaseDBConnector):
             return [row[i] for row_i, row in enumerate(matrix, 1) if row_i < max_row]
 
         statement = f"SELECT * FROM {schema_name}.{table_name} LIMIT {max_row_select}"
-        with self.connection.connect() as conn:
+        with self.reflection_connection() as conn:
             sql_res_conn = conn.execute(text(statement))
             valid_data_types = ["string", "text"]
             sql_res = list(sql_res_conn)
@@ -148,17 +247,15 @@ class SqlAlchemyConnector(BaseDBConnector):
 
     def return_all_table_column_info(self, schema_name: str, table_name: str) -> list[Column]:
         out = []
-        all_cols = self.inspection.get_columns(table_name, schema_name)
-        for _col in all_cols:
+        reflection = self.reflect_schema(schema_name)
+        pk_columns = set(reflection.pk_constraint(table_name)["constrained_columns"])
+        fk_columns = {_col for fk_relation in reflection.foreign_keys.get(table_name, [])
+                      for _col in fk_relation["constrained_columns"]}
+        for _col in reflection.columns.get(table_name, []):
             col_type = str(_col["type"])
             _name = _col["name"]
-            _is_pk = False
-            _is_fk = False
-            _fk_to = None
-            if _name in self.fk_relations[table_name]:
-                _is_fk = True
-            if _name in self.pk[table_name]:
-                _is_pk = True
+            _is_pk = _name in pk_columns
+            _is_fk = _name in fk_columns
 
             new_col = Column(_name, str(col_type), _is_pk, _is_fk)
             out.append(new_col)
@@ -176,13 +273,14 @@ class SqlAlchemyConnector(BaseDBConnector):
         if scan_enums:
             all_info = self.scan_columns_enum(schema_name, all_info, table_name)
 
-        _pk_name = self.inspection.get_pk_constraint(table_name, schema_name)['name']
+        reflection = self.reflect_schema(schema_name)
+        _pk_name = reflection.pk_constraint(table_name)['name']
         fk_relations = [Foreign_Key_Relation(
             x["constrained_columns"],
             x["referred_table"],
             x["referred_schema"],
             x["referred_columns"])
-            for x in self.inspection.get_foreign_keys(table_name, schema_name)]
+            for x in reflection.foreign_keys.get(table_name, [])]
         return Table(table_name, _pk_name, all_info, _table_type, fk_relations)
 
     def convert_value(self, _input):
@@ -191,17 +289,7 @@ class SqlAlchemyConnector(BaseDBConnector):
         :param _input:
         :return: _input
         """
-        if isinstance(_input, decimal.Decimal):
-            return float(_input)
-        elif isinstance(_input, datetime.datetime):
-            try:
-                return _input.strftime("%d/%m/%Y %H:%M")
-            except Exception as e:
-                return str(_input)
-        elif isinstance(_input, datetime.date):
-            return str(_input)
-        else:
-            return _input
+        return self.value_converter.convert_value(_input)
 
     @override
     def execute_sql_statement(self, _sql, _max_rows=None, autocommit=False):
@@ -214,19 +302,36 @@ class SqlAlchemyConnector(BaseDBConnector):
 
         with self.connection.connect() as conn:
             sql_res_conn = conn.execute(text(_sql))
-            results.append([x for x in sql_res_conn.keys()])
-            counter = 0
-            for _row in sql_res_conn:
-
-                _row = [self.convert_value(x) for x in _row]
-                # do i need to account for datetime.datetime,datetime.date,datetime.time, datetime.timedelta too ?
-                results.append(_row)
-                counter += 1
-                if _max_rows is not None and _max_rows < counter:
-                    break
+            # statements without a result set, e.g. inserts, only have to be committed
+            results.append([x for x in sql_res_conn.keys()] if sql_res_conn.returns_rows else [])
+            partitions = sql_res_conn.partitions(self.convert_batch_size) if sql_res_conn.returns_rows else []
+            for partition in self.limit_partitions(partitions, _max_rows):
+                results.extend(self.value_converter.convert_rows(partition))
             if autocommit:
                 conn.commit()
         return results
 
+    @override
+    def stream_sql_statement(self, _sql, _max_rows=None, autocommit=False,
+                             chunk_size: int = 1000, convert_values: bool = True) -> Iterator[list]:
+        """
+        @_sql:str
+        Yields the column names and then chunks of rows read from a server side cursor. With autocommit the result is
+        read and committed before the first yield, so the commit does not depend on the client reading the whole stream
+        """
+        with self.connection.connect() as conn:
+            options = {} if autocommit else {"stream_results": True, "yield_per": chunk_size}
+            sql_res_conn = conn.execution_options(**options).execute(text(_sql))
+            # statements without a result set, e.g. inserts, only have to be committed
+            columns = [x for x in sql_res_conn.keys()] if sql_res_conn.returns_rows else []
+            partitions = self.limit_partitions(sql_res_conn.partitions(chunk_size) if sql_res_conn.returns_rows else [],
+                                               _max_rows)
+            if autocommit:
+                partitions = list(partitions)
+                conn.commit()
+            yield columns
+            for partition in partitions:
+                yield self.value_converter.convert_rows(partition) if convert_values else partition
+
 #    def __del__(self):
 #       self.connection.dispose()
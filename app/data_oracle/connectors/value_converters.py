@@ -0,0 +1,92 @@
+import datetime
+import decimal
+from itertools import chain
+from typing import Callable, Sequence
+
+
+class ValueConverter:
+    """
+    Converts the values of query results to primitive types. The conversion of a value only depends on its type, so
+    the converter of a type is looked up once and results are converted column by column in batches. Columns whose
+    values need no conversion are passed through untouched.
+    """
+
+    def __init__(self, converters: list[tuple[type, Callable]]):
+        """
+        @converters: pairs of type and conversion function, the first pair matching a value like isinstance is used
+        """
+        self.converters = converters
+        self._type_converters: dict[type, Callable | None] = {type(None): None}
+
+    def converter_for(self, value_type: type) -> Callable | None:
+        """
+        Returns the conversion function for values of a type or None if they are returned unchanged
+        """
+        try:
+            return self._type_converters[value_type]
+        except KeyError:
+            converter = next((fn for _type, fn in self.converters if issubclass(value_type, _type)), None)
+            self._type_converters[value_type] = converter
+            return converter
+
+    def convert_value(self, _input):
+        converter = self.converter_for(type(_input))
+        return _input if converter is None else converter(_input)
+
+    def convert_column(self, values: Sequence) -> Sequence:
+        """
+        Converts the values of a column, returns the values unchanged if none of them needs a conversion
+        """
+        converters = {value_type: self.converter_for(value_type) for value_type in set(map(type, values))}
+        active = {value_type: fn for value_type, fn in converters.items() if fn is not None}
+        if not active:
+            return values
+        if len(converters) == 1:
+            return list(map(next(iter(active.values())), values))
+        if len(converters) == 2 and len(active) == 1 and type(None) in converters:
+            converter = next(iter(active.values()))
+            return [None if value is None else converter(value) for value in values]
+        return list(map(self.convert_value, values))
+
+    def convert_rows(self, rows: Sequence[Sequence]) -> list[list]:
+        """
+        Converts a batch of rows, e.g. one fetch from a cursor
+        @rows: rows as sequences of values
+        Return: rows as lists of converted values
+        """
+        if not any(map(self.converter_for, set(map(type, chain.from_iterable(rows))))):
+            return list(map(list, rows))
+        converted_rows = list(map(list, rows))
+        for index, values in enumerate(zip(*rows)):
+            converted = self.convert_column(values)
+            if converted is not values:
+                for row, value in zip(converted_rows, converted):
+                    row[index] = value
+        return converted_rows
+
+
+def format_datetime(_input: datetime.datetime) -> str:
+    try:
+        return _input.strftime("%d/%m/%Y %H:%M")
+    except Exception:
+        return str(_input)
+
+
+def format_date(_input: datetime.date) -> str:
+    try:
+        return _input.strftime("%d/%m/%Y")
+    except Exception:
+        return str(_input)
+
+
+sqlalchemy_value_converter = ValueConverter([
+    (decimal.Decimal, float),
+    (datetime.datetime, format_datetime),
+    (datetime.date, str),
+])
+
+bigquery_value_converter = ValueConverter([
+    (decimal.Decimal, float),
+    (datetime.datetime, format_datetime),
+    (datetime.date, format_date),
+])
@@ -1,3 +1,6 @@
 from .database_schema import Column, Table, Schema, Database
 from .foreign_key_schema import Foreign_Key_Relation
 from .utils import *
+from .translation_cache import TranslationCache, translation_cache, translations_version
+from .translation_index import TranslationIndex
+from .embedding_matrix import EmbeddingMatrix
@@ -1,6 +1,29 @@
+from .utils import get_proper_naming, intern_name
+
+
 class BaseDbObject:
+    __slots__ = ()
+
+    def _attributes(self) -> dict:
+        return {name: getattr(self, name) for cls in type(self).__mro__ for name in getattr(cls, "__slots__", ())
+                if hasattr(self, name)}
+
     def __str__(self):
-        return str(vars(self))
+        return str(self._attributes())
 
     def __repr__(self):
-        return str(vars(self))
+        return str(self._attributes())
+
+
+class NamedDbObject(BaseDbObject):
+    """
+    Base of schema objects with a name. Subclasses declare the name and _proper_name slots, the proper name is only
+    computed when it is used
+    """
+    __slots__ = ()
+
+    @property
+    def proper_name(self) -> str:
+        if self._proper_name is None:
+            self._proper_name = intern_name(get_proper_naming(self.name))
+        return self._proper_name
@@ -1,19 +1,25 @@
+import json
+import operator
 import re
 from typing import Dict
 
-from .base_db_class import BaseDbObject
+from .base_db_class import NamedDbObject
+from .embedding_matrix import EmbeddingMatrix
 from .filterobject import FilterObject, EmbeddingContainer
 from .foreign_key_schema import Foreign_Key_Relation
-from .utils import parse_db_layout, get_proper_naming
+from .translation_index import TranslationIndex
+from .utils import parse_db_layout, intern_name
 from ..enums import Filter_Type, Data_Table_Type
 
 
 class FilterClass:
+    __slots__ = ("filter_active", "filter_list", "filtered_content", "embedding_filter")
 
     def __init__(self):
+        # unfiltered objects share empty tuples, lists are only created when a filter is applied
         self.filter_active: bool = False
-        self.filter_list: list[FilterObject] = []
-        self.filtered_content: list[Schema | Table | Column] = []
+        self.filter_list: list[FilterObject] | tuple = ()
+        self.filtered_content: list[Schema | Table | Column] | tuple = ()
         self.embedding_filter: EmbeddingContainer | None = None
 
     def release_filters(self) -> None:
@@ -22,19 +28,26 @@ class FilterClass:
         @return: None
         """
         self.filter_active = False
-        self.filter_list = []
-        self.filtered_content = []
+        self.filter_list = ()
+        self.filtered_content = ()
         self.embedding_filter = None
 
-    def determine_filtered_elements(self, content) -> None:
+    def determine_filtered_elements(self, content, embedding_mask=None) -> None:
         """
         Determines which elements are not filtered
         @param content: list of tables or columns
+        @param embedding_mask: which elements are kept by the embedding filter, computed from the embeddings of the
+        content if None
         @return: None
         """
         filter_name_hashmap = {}
         regex_filters = []
+        filtered_content = list(self.filtered_content)
         is_column = isinstance(content[0], Column)
+        if self.embedding_filter is not None and embedding_mask is None:
+            # a filter holds a single question, its embedding may be a row vector
+            embedding_mask = EmbeddingMatrix(content).within_distance(self.embedding_filter.embedding,
+                                                                      self.embedding_filter.threshold).reshape(-1)
 
         for _filter in self.filter_list:
             if _filter.classification == Filter_Type.NAME:
@@ -43,30 +56,45 @@ class FilterClass:
             elif _filter.classification == Filter_Type.REGEX:
                 regex_filters.append(re.compile(_filter.value))
 
-        for _item in content:
+        for index, _item in enumerate(content):
             matched_regex = False
             if is_column:
                 if _item.is_pk or _item.is_fk:
-                    self.filtered_content.append(_item)  # always include fk pk cols
+                    filtered_content.append(_item)  # always include fk pk cols
                     continue
             for reg_patter in regex_filters:
                 if reg_patter.match(_item.name):
                     matched_regex = True
             if _item.name not in filter_name_hashmap and not matched_regex:
-                if self.embedding_filter is not None:
-                    if self.embedding_filter.embedding @ _item.embedding.T <= self.embedding_filter.threshold:
-                        self.filtered_content.append(_item)
-                else:
-                    self.filtered_content.append(_item)
+                if embedding_mask is None or embedding_mask[index]:
+                    filtered_content.append(_item)
+        self.filtered_content = filtered_content
+
+    def carry_over_filters(self, previous: "FilterClass", content) -> None:
+        """
+        Takes over the filters of the object this one replaces, e.g. after a table was reflected again, and evaluates
+        them against the new content
+        @param previous: replaced object
+        @param content: list of schemas, tables or columns of this object
+        @return: None
+        """
+        self.filter_list = list(previous.filter_list)
+        self.filter_active = previous.filter_active
+        self.embedding_filter = previous.embedding_filter
+        self.filtered_content = []
+        if self.filter_active and len(content) > 0:
+            self.determine_filtered_elements(content)
 
     def apply_filter(self,
                      target,
                      content_names: list[str] = None,
                      regex_filter: str = None,
-                     embedding_filter: FilterObject = None) -> None:
+                     embedding_filter: FilterObject = None,
+                     embedding_mask=None) -> None:
         """
         Function which applies an active function to the object
         @param embedding_filter: Fdy
+        @param embedding_mask: precomputed result of the embedding filter for the target, see EmbeddingMatrix
         @param target: list of columns or tables
         @param content_names: list of object names
         @param regex_filter: regex pattern
@@ -77,22 +105,24 @@ class FilterClass:
             raise ValueError(f"The function needs to be called with a valid argument")
         if content_names is not None:
             new_filter = FilterObject(value=content_names, _type=Filter_Type.NAME)
-            self.filter_list.append(new_filter)
+            self.filter_list = [*self.filter_list, new_filter]
         elif regex_filter is not None:
             new_filter = FilterObject(value=regex_filter, _type=Filter_Type.REGEX)
-            self.filter_list.append(new_filter)
+            self.filter_list = [*self.filter_list, new_filter]
         else:
             self.embedding_filter = embedding_filter.value
         self.filter_active = True
 
-        self.determine_filtered_elements(target)
+        self.determine_filtered_elements(target, embedding_mask)
 
 
-class Column(BaseDbObject):
+class Column(NamedDbObject):
+    __slots__ = ("name", "_proper_name", "type", "is_pk", "is_fk", "enums", "embedding")
+
     def __init__(self, _name: str, _type, _is_pk=False, _is_fk: bool = False, _enums: list[str] = None):
-        self.name = _name
-        self.proper_name = get_proper_naming(_name)
-        self.type = _type
+        self.name = intern_name(_name)
+        self._proper_name = None
+        self.type = intern_name(_type)
         self.is_pk = _is_pk
         self.is_fk = _is_fk
         self.enums = _enums
@@ -101,18 +131,28 @@ class Column(BaseDbObject):
     def return_data(self) -> dict:
         """
         Returns dict representation of object
-        @return: Dict containing all self variables
+        @return: Dict containing all column attributes
         """
-        return vars(self)
+        return {"name": self.name, "proper_name": self.proper_name, "type": self.type, "is_pk": self.is_pk,
+                "is_fk": self.is_fk, "enums": self.enums, "embedding": self.embedding}
 
     def return_sql_definition(self, use_normalized: bool) -> str:
         """
         Returns column sql def
         @return: str sql representation
         """
+        return self.return_sql_definitions()[1 if use_normalized else 0]
+
+    def return_sql_definitions(self) -> tuple[str, str]:
+        """
+        Returns column sql def with the raw and with the normalized name
+        @return: tuple of raw and normalized sql representation
+        """
         if self.enums is not None:
-            return f"""{self.proper_name if use_normalized else self.name} ENUM({",".join(['"' + str(x) + '"' for x in self.enums])})"""
-        return f'{self.proper_name if use_normalized else self.name} {self.type}'
+            column_type = f"""ENUM({",".join(['"' + str(x) + '"' for x in self.enums])})"""
+        else:
+            column_type = self.type
+        return f'{self.name} {column_type}', f'{self.proper_name} {column_type}'
 
     @property
     def json_repr(self) -> {}:
@@ -127,7 +167,9 @@ class Column(BaseDbObject):
         return json_obj
 
 
-class Table(BaseDbObject, FilterClass):
+class Table(NamedDbObject, FilterClass):
+    __slots__ = ("name", "_proper_name", "columns", "type", "pk", "pk_name", "fk_relations", "embedding",
+                 "fingerprint", "_ddl")
 
     def __init__(self,
                  _name: str,
@@ -137,14 +179,30 @@ class Table(BaseDbObject, FilterClass):
                  _fk_relations: list[Foreign_Key_Relation]
                  ):
         super().__init__()
-        self.name = _name
-        self.proper_name = get_proper_naming(_name)
+        self.name = intern_name(_name)
+        self._proper_name = None
         self.columns = _columns
         self.type = _type
-        self.pk = [x for x in _columns if x.is_pk]  # pk can be composed of multiple columns
-        self.pk_name = _pk_name
+        self.pk = tuple(x for x in _columns if x.is_pk)  # pk can be composed of multiple columns
+        self.pk_name = intern_name(_pk_name)
         self.fk_relations = _fk_relations
         self.embedding = None
+        self.fingerprint: str | None = None  # catalog fingerprint of the table when it was reflected
+        self._ddl: tuple | None = None  # qualifiers, filter state and the last rendered statements
+
+    def carry_over(self, previous: "Table") -> None:
+        """
+        Takes over embeddings and filters of the previous version of this table. Embeddings are kept for all
+        columns whose name did not change
+        @param previous: previous version of the table
+        @return: None
+        """
+        self.embedding = previous.embedding
+        previous_columns = {column.name: column for column in previous.columns}
+        for column in self.columns:
+            if column.name in previous_columns:
+                column.embedding = previous_columns[column.name].embedding
+        self.carry_over_filters(previous, self.columns)
 
     def get_cols(self) -> list[Column]:
         """
@@ -192,29 +250,51 @@ class Table(BaseDbObject, FilterClass):
             return []
 
     def code_representation_str(self, schema_name: str | None, use_normalized: bool = False) -> str:
-        _str_repr = ""
-        if schema_name is None:
-            table_name = self.proper_name if use_normalized else self.name
-        else:
-            table_name = f"{schema_name}.{self.proper_name}" if use_normalized else f"{schema_name}.{self.name}"
-        _str_repr += f"CREATE TABLE {table_name}(\n"
-        _str_repr += ",\n".join([x.return_sql_definition(use_normalized) for x in self.get_cols()])
+        return self.render_ddl(schema_name, schema_name)[1 if use_normalized else 0]
+
+    def render_ddl(self, schema_name: str | None, schema_proper_name: str | None) -> tuple[str, str]:
+        """
+        Renders the create table statement in its raw and normalized form in one pass over the columns. The result
+        is kept until the qualifiers or the column filters of the table change, columns are not expected to change
+        after the table was created
+        @param schema_name: schema name qualifying the raw statement, None for an unqualified table name
+        @param schema_proper_name: schema name qualifying the normalized statement
+        @return: tuple of raw and normalized statement
+        """
+        # filters always assign a new list, so the list identifies the filter state
+        filter_state = self.filtered_content if self.filter_active else None
+        cached = self._ddl
+        if cached is not None and cached[0] == schema_name and cached[1] == schema_proper_name \
+                and cached[2] is filter_state:
+            return cached[3]
+
+        raw_name = self.name if schema_name is None else f"{schema_name}.{self.name}"
+        normalized_name = self.proper_name if schema_proper_name is None else f"{schema_proper_name}.{self.proper_name}"
+        raw_parts, normalized_parts = [], []
+        for column in self.get_cols():
+            raw_definition, normalized_definition = column.return_sql_definitions()
+            raw_parts.append(raw_definition)
+            normalized_parts.append(normalized_definition)
+        raw_str = f"CREATE TABLE {raw_name}(\n" + ",\n".join(raw_parts)
+        normalized_str = f"CREATE TABLE {normalized_name}(\n" + ",\n".join(normalized_parts)
 
         if self.has_pk():
-            _str_repr += ",\n"
             if self.pk_name == None:
-                _str_repr += f"PRIMARY KEY ({self.pk[0].proper_name if use_normalized else self.pk[0].name})"
+                raw_str += f",\nPRIMARY KEY ({self.pk[0].name})"
+                normalized_str += f",\nPRIMARY KEY ({self.pk[0].proper_name})"
             else:
-                _str_repr += f"CONSTRAINT {self.pk_name} PRIMARY KEY ({','.join([x.proper_name if use_normalized else x.name for x in self.pk])})"
+                raw_str += f",\nCONSTRAINT {self.pk_name} PRIMARY KEY ({','.join([x.name for x in self.pk])})"
+                normalized_str += f",\nCONSTRAINT {self.pk_name} PRIMARY KEY " \
+                                  f"({','.join([x.proper_name for x in self.pk])})"
         if len(self.fk_relations) > 0:
-            _str_repr += ",\n"
-            _str_repr += ",\n".join([x.return_sql_definition(use_normalized) for x in self.fk_relations])
-        _str_repr += "\n)"
+            raw_str += ",\n" + ",\n".join([x.return_sql_definition(False) for x in self.fk_relations])
+            normalized_str += ",\n" + ",\n".join([x.return_sql_definition(True) for x in self.fk_relations])
+        rendered = (raw_str + "\n)", normalized_str + "\n)")
+        self._ddl = (schema_name, schema_proper_name, filter_state, rendered)
+        return rendered
 
-        return _str_repr
-
-    def apply_embedding_filter(self, embed_filter: FilterObject):
-        self.apply_filter(self.columns, embedding_filter=embed_filter)
+    def apply_embedding_filter(self, embed_filter: FilterObject, embedding_mask=None):
+        self.apply_filter(self.columns, embedding_filter=embed_filter, embedding_mask=embedding_mask)
 
     @property
     def translations_map(self) -> {}:
@@ -240,14 +320,17 @@ class Table(BaseDbObject, FilterClass):
         return json_obj
 
 
-class Schema(BaseDbObject, FilterClass):
+class Schema(NamedDbObject, FilterClass):
+    __slots__ = ("name", "_proper_name", "tables", "embedding", "cached_layout", "_ddl")
+
     def __init__(self, _name: str, tables: list[Table]):
         super().__init__()
-        self.name: str = _name
-        self.proper_name = get_proper_naming(_name)
+        self.name: str = intern_name(_name)
+        self._proper_name = None
         self.tables: list[Table] = tables
         self.embedding = None
         self.cached_layout: str | None = None
+        self._ddl: tuple | None = None  # rendered tables and texts of the last render_ddl call
 
     def apply_table_name_filter(self, _table_names: list[str]) -> None:
         """
@@ -303,10 +386,32 @@ class Schema(BaseDbObject, FilterClass):
                                     nl_question=nl_question,
                                     threshold=threshold
                                     )
+        embedding_mask = EmbeddingMatrix(self.embedding_elements()).within_distance(embedding, threshold).reshape(-1)
+        self.apply_embedding_mask(embed_filter, applicable_table, embedding_mask)
+
+    def embedding_elements(self) -> list:
+        """
+        Returns the tables of the schema followed by the columns of every table, the order of the rows of the
+        embedding matrix of the schema
+        @return: list of Table and Column objects
+        """
+        return [*self.tables, *(column for table in self.tables for column in table.columns)]
+
+    def apply_embedding_mask(self, embed_filter: FilterObject, applicable_table: bool, embedding_mask) -> None:
+        """
+        Applies an embedding filter whose result was computed for all elements at once
+        @param embed_filter: embedding filter
+        @param applicable_table: whether tables are filtered as well
+        @param embedding_mask: which elements are kept, ordered like embedding_elements
+        @return: None
+        """
         if applicable_table:
-            self.apply_filter(self.tables, embedding_filter=embed_filter)
+            self.apply_filter(self.tables, embedding_filter=embed_filter,
+                              embedding_mask=embedding_mask[:len(self.tables)])
+        offset = len(self.tables)
         for _table in self.tables:
-            _table.apply_embedding_filter(embed_filter)
+            _table.apply_embedding_filter(embed_filter, embedding_mask[offset:offset + len(_table.columns)])
+            offset += len(_table.columns)
 
     def release_column_filters(self) -> None:
         """
@@ -354,6 +459,38 @@ class Schema(BaseDbObject, FilterClass):
         """
         return f"CREATE SCHEMA {self.proper_name if use_normalized else self.name};"
 
+    def render_table_ddl(self, include_schema: bool, exclude_views=False) -> list[tuple[str, str]]:
+        """
+        Renders the CREATE Table commands of all unfiltered tables in their raw and normalized form. Tables keep
+        their rendered commands, so only tables whose filters changed are rendered again
+        :param include_schema: Whether to include schema name in create table command
+        :param exclude_views: Boolean to exclude Views from the list
+        :return: list of tuples of raw and normalized CREATE Table command
+        """
+        _all_tables = self.get_tables()
+        if exclude_views:
+            _all_tables = [x for x in _all_tables if x.type != Data_Table_Type.VIEW]
+        if include_schema:
+            return [x.render_ddl(self.name, self.proper_name) for x in _all_tables]
+        return [x.render_ddl(None, None) for x in _all_tables]
+
+    def render_ddl(self, exclude_views=False) -> tuple[str, str]:
+        """
+        Renders the schema qualified CREATE Table commands of the schema joined into a raw and a normalized text.
+        The texts are kept until a table is rendered differently or the table filters change
+        :param exclude_views: Boolean to exclude Views from the text
+        :return: tuple of raw and normalized text, empty if all tables are filtered
+        """
+        rendered_tables = self.render_table_ddl(True, exclude_views)
+        cached = self._ddl
+        if cached is not None and cached[0] == exclude_views and len(cached[1]) == len(rendered_tables) \
+                and all(map(operator.is_, cached[1], rendered_tables)):
+            return cached[2]
+        rendered = ("\n\n".join([raw for raw, _ in rendered_tables]),
+                    "\n\n".join([normalized for _, normalized in rendered_tables]))
+        self._ddl = (exclude_views, rendered_tables, rendered)
+        return rendered
+
     def return_code_repr_schema(self, include_schema: bool, exclude_views=False) -> list[str]:
         """
         Displays a schemas as a list of  CREATE Table commands wrapped in a create
@@ -362,16 +499,7 @@ class Schema(BaseDbObject, FilterClass):
         :param exclude_views: Boolean to exclude Views from the list
         :return: list of  CREATE Table commands
         """
-
-        _all_tables = self.get_tables()
-
-        if exclude_views:
-            view_filter = lambda x: True if x.type != Data_Table_Type.VIEW else False
-            _all_tables = filter(view_filter, _all_tables)
-        if include_schema:
-            return [x.code_representation_str(self.name, False) for x in _all_tables]
-        else:
-            return [x.code_representation_str(None, False) for x in _all_tables]
+        return [raw for raw, _ in self.render_table_ddl(include_schema, exclude_views)]
 
     def return_code_repr_schema_normalized(self, include_schema: bool, exclude_views=False) -> list[str]:
         """
@@ -380,15 +508,7 @@ class Schema(BaseDbObject, FilterClass):
         :param exclude_views: Boolean to exclude Views from the list
         :return: list of  CREATE Table commands
         """
-
-        _all_tables = self.get_tables()
-        if exclude_views:
-            view_filter = lambda x: True if x.type != Data_Table_Type.VIEW else False
-            _all_tables = filter(view_filter, _all_tables)
-        if include_schema:
-            return [x.code_representation_str(self.proper_name, True) for x in _all_tables]
-        else:
-            return [x.code_representation_str(None, True) for x in _all_tables]
+        return [normalized for _, normalized in self.render_table_ddl(include_schema, exclude_views)]
 
     @property
     def translations_map(self) -> {}:
@@ -409,12 +529,32 @@ class Schema(BaseDbObject, FilterClass):
         return json_obj
 
 
-class Database(BaseDbObject, FilterClass):
+class Database(NamedDbObject, FilterClass):
+    __slots__ = ("name", "_proper_name", "schemas", "fingerprint", "_translation_index", "_embedding_matrix")
+
     def __init__(self, name: str):
         super().__init__()
         self.name: str = name
-        self.proper_name = get_proper_naming(name)
+        self._proper_name = None
         self.schemas: list[Schema] = []
+        self.fingerprint: str | None = None  # catalog fingerprint of the whole database when it was reflected
+        self._translation_index: TranslationIndex | None = None
+        self._embedding_matrix: EmbeddingMatrix | None = None
+
+    def __getstate__(self) -> dict:
+        # the translation index and embedding matrix are rebuilt on first use instead of being pickled
+        state = self._attributes()
+        state["_translation_index"] = None
+        state["_embedding_matrix"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        state.setdefault("_translation_index", None)
+        state.setdefault("_embedding_matrix", None)
+        state.setdefault("_proper_name", None)
+        state.pop("proper_name", None)
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def register_schema(self, schema: Schema) -> None:
         """
@@ -423,6 +563,8 @@ class Database(BaseDbObject, FilterClass):
         @return: None
         """
         self.schemas.append(schema)
+        self._translation_index = None
+        self._embedding_matrix = None
 
     def register_schemas(self, schemas: list[Schema]) -> None:
         """
@@ -480,6 +622,7 @@ class Database(BaseDbObject, FilterClass):
         for schema in self.schemas:
             if schema.name in filter_list:
                 schema.apply_column_name_filter(filter_list[schema.name])
+                self.update_translations(schema, filter_list[schema.name])
 
     def apply_column_regex_filter(self, filter_list: Dict[str, Dict[str, str]]) -> None:
         """
@@ -490,6 +633,7 @@ class Database(BaseDbObject, FilterClass):
         for schema in self.schemas:
             if schema.name in filter_list:
                 schema.apply_column_regex_filter(filter_list[schema.name])
+                self.update_translations(schema, filter_list[schema.name])
 
     def apply_embedding_filter(self,
                                nl_question: str,
@@ -504,16 +648,22 @@ class Database(BaseDbObject, FilterClass):
         @param applicable_table:
         @return:
         """
-        # todo fix this mess
         embed_filter = FilterObject(value=embedding,
                                     _type=Filter_Type.EMBEDDING,
                                     nl_question=nl_question,
                                     threshold=threshold
                                     )
+        # a single matrix product scores the question against every schema, table and column
+        embedding_mask = self.embedding_matrix.within_distance(embedding, threshold).reshape(-1)
         if applicable_table:
-            self.apply_filter(self.schemas, embedding_filter=embed_filter)
+            self.apply_filter(self.schemas, embedding_filter=embed_filter,
+                              embedding_mask=embedding_mask[:len(self.schemas)])
+        offset = len(self.schemas)
         for schema in self.schemas:
-            schema.apply_embedding_filter(embed_filter)  ##
+            size = len(schema.tables) + sum(len(table.columns) for table in schema.tables)
+            schema.apply_embedding_mask(embed_filter, applicable_table, embedding_mask[offset:offset + size])
+            offset += size
+        self._translation_index = None
 
     def release_table_filters(self) -> None:
         """
@@ -533,6 +683,7 @@ class Database(BaseDbObject, FilterClass):
             schema.release_filters()
             for table in schema.tables:
                 table.release_filters()
+        self._translation_index = None
 
     def get_filtered_schemas(self) -> list[str]:
         """
@@ -565,23 +716,51 @@ class Database(BaseDbObject, FilterClass):
                 table.embedding = embedding_callback(table.name)
                 for column in table.columns:
                     column.embedding = embedding_callback(column.name)
+        self._embedding_matrix = None
+
+    def apply_batch_embedding_model(self, batch_callback, batch_size: int = 256) -> None:
+        """
+        Fills the embeddings of all schemas, tables and columns, every distinct name is embedded once
+        @param batch_callback: callback which calculates the embeddings of a list of names and returns one embedding
+        per name, e.g. a CachedEmbedder
+        @param batch_size: maximal number of names per call of the callback
+        @return: None
+        """
+        elements = self.embedding_matrix_elements()
+        names = list(dict.fromkeys(element.name for element in elements))
+        embeddings = {}
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            embeddings.update(zip(batch, batch_callback(batch)))
+        for element in elements:
+            element.embedding = embeddings[element.name]
+        self._embedding_matrix = None
 
     ## Need to change approach first list of create schema statements
     # then list of create table statements. each table name is represented as
     # schema.tablenames
+    def render_ddl(self) -> tuple[str, str]:
+        """
+        Renders the database as a set of Create Schema calls followed by all Create Table calls, in its raw and
+        normalized form from a single traversal. Tables and schemas keep their rendered text until their filters
+        change, so rendering an unchanged database only joins the kept texts
+        :return: tuple of raw and normalized text
+        """
+        all_schemas = self.get_schemas()
+        rendered_schemas = [schema.render_ddl() for schema in all_schemas]
+        raw_str = "\n".join(schema.code_representation_str(False) for schema in all_schemas) + "\n\n" + \
+            "\n\n".join([raw for raw, _ in rendered_schemas if raw])
+        normalized_str = "\n".join(schema.code_representation_str(True) for schema in all_schemas) + "\n\n" + \
+            "\n\n".join([normalized for _, normalized in rendered_schemas if normalized])
+        return raw_str, normalized_str
+
     def return_code_repr_schema(self, exclude_views=False) -> str:
         """
         Represents a database as a set of Create Schema calls.
         :param exclude_views:
         :return:
         """
-        all_schemas = self.get_schemas()
-
-        create_schemas = "\n".join(schema.code_representation_str(False) for schema in all_schemas)
-
-        return create_schemas + "\n\n" + "\n\n".join(
-            [table_schema for schema in all_schemas for table_schema in
-             schema.return_code_repr_schema(include_schema=True)])
+        return self.render_ddl()[0]
 
     def return_code_repr_schema_normalized(self, exclude_views=False) -> str:
         """
@@ -589,14 +768,24 @@ class Database(BaseDbObject, FilterClass):
         :param exclude_views:
         :return:
         """
-        all_schemas = self.get_schemas()
-        create_schemas = "\n".join(schema.code_representation_str(True) for schema in all_schemas)
-        return create_schemas + "\n\n" + "\n\n".join(
-            [table_schema for schema in all_schemas for table_schema in
-             schema.return_code_repr_schema_normalized(include_schema=True)])
+        return self.render_ddl()[1]
 
     def reload_from_cache(self, cached_layout: str):
+        """
+        Restores the layout from a cached layout, either a json snapshot (see snapshot.dumps_json) or the ddl of
+        return_code_repr_schema. Snapshots keep the whole layout, ddl loses views and details of enums and keys
+        :param cached_layout: json snapshot or ddl
+        :return: None
+        """
+        from .snapshot import is_json_snapshot, schemas_from_snapshot_dict
         self.schemas = []
+        self._translation_index = None
+        self._embedding_matrix = None
+        if is_json_snapshot(cached_layout):
+            snapshot = json.loads(cached_layout)
+            self.register_schemas(schemas_from_snapshot_dict(snapshot))
+            self.fingerprint = snapshot["fingerprint"]
+            return
         db_str_struct = parse_db_layout(cached_layout)
         for schema_name in db_str_struct:
             tables_in_schema = []
@@ -614,12 +803,66 @@ class Database(BaseDbObject, FilterClass):
                 tables_in_schema.append(cached_table)
             self.register_schema(Schema(schema_name, tables_in_schema))
 
+    @property
+    def translation_index(self) -> TranslationIndex:
+        """
+        Returns the index between proper and raw names, it is built on first use after the layout was scanned or
+        loaded and kept up to date when filters are applied through the database
+        :return: TranslationIndex
+        """
+        if self._translation_index is None:
+            self._translation_index = TranslationIndex(self.schemas)
+        return self._translation_index
+
+    def update_translations(self, schema: Schema, table_names) -> None:
+        """
+        Updates the translation index after the column filters of tables changed
+        :param schema: schema of the tables
+        :param table_names: names of the changed tables
+        :return: None
+        """
+        if self._translation_index is None:
+            return
+        for table in schema.tables:
+            if table.name in table_names:
+                self._translation_index.update_columns(schema, table)
+
+    def invalidate_translations(self) -> None:
+        """
+        Drops the translation index, call it after changing filters on schemas or tables directly
+        :return: None
+        """
+        self._translation_index = None
+
     @property
     def translations_map(self) -> {}:
-        translation_map = {}
-        for schema in self.schemas:
-            translation_map[schema.proper_name] = schema.translations_map
-        return translation_map
+        return self.translation_index.translations_map
+
+    @property
+    def embedding_matrix(self) -> EmbeddingMatrix:
+        """
+        Returns the embeddings of all schemas followed by the embedding elements of every schema as one normalized
+        matrix. It is built on first use and dropped when schemas are registered or embeddings are computed
+        :return: EmbeddingMatrix
+        """
+        if self._embedding_matrix is None:
+            self._embedding_matrix = EmbeddingMatrix(self.embedding_matrix_elements())
+        return self._embedding_matrix
+
+    def embedding_matrix_elements(self) -> list:
+        """
+        Returns all schemas followed by the embedding elements of every schema, the order of the rows of the
+        embedding matrix
+        :return: list of Schema, Table and Column objects
+        """
+        return [*self.schemas, *(element for schema in self.schemas for element in schema.embedding_elements())]
+
+    def invalidate_embeddings(self) -> None:
+        """
+        Drops the embedding matrix, call it after setting embeddings of schemas, tables or columns directly
+        :return: None
+        """
+        self._embedding_matrix = None
 
     @property
     def json_repr(self) -> {}:
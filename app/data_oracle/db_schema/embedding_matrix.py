@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scales every row of a matrix to unit length, rows of zeros stay zero
+    :param matrix: 2d array
+    :return: contiguous float32 array
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class EmbeddingMatrix:
+    """
+    Embeddings of schema elements stacked into one contiguous float32 matrix with unit rows, so questions are scored
+    against all elements with a single matrix product. Row i belongs to elements[i], elements without an embedding
+    get a row of zeros and are marked as missing
+    """
+
+    def __init__(self, elements: list):
+        """
+        :param elements: schemas, tables or columns, their embedding is either None or a vector of the same size
+        """
+        self.elements = elements
+        self.present = np.fromiter((element.embedding is not None for element in elements), dtype=bool,
+                                   count=len(elements))
+        vectors = [np.asarray(element.embedding, dtype=np.float32).reshape(-1) for element in elements
+                   if element.embedding is not None]
+        self.matrix = np.zeros((len(elements), vectors[0].size if vectors else 0), dtype=np.float32)
+        if vectors:
+            self.matrix[self.present] = np.stack(vectors)
+            self.matrix = normalize_rows(self.matrix)
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def similarities(self, questions) -> np.ndarray:
+        """
+        Returns the cosine similarity between questions and all elements, elements without an embedding score 0
+        :param questions: embedding of one question or a 2d batch of question embeddings
+        :return: array of shape (elements,) for one question, (questions, elements) for a batch
+        """
+        questions = np.asarray(questions, dtype=np.float32)
+        batch = normalize_rows(questions.reshape(-1, questions.shape[-1]) if questions.ndim > 1
+                               else questions.reshape(1, -1))
+        if not self.present.any():
+            scores = np.zeros((batch.shape[0], len(self.elements)), dtype=np.float32)
+        else:
+            scores = batch @ self.matrix.T
+        return scores[0] if questions.ndim == 1 else scores
+
+    def within_distance(self, questions, threshold: float) -> np.ndarray:
+        """
+        Returns which elements are within a cosine distance (1 - cosine similarity) of the questions. Elements
+        without an embedding always match
+        :param questions: see similarities
+        :param threshold: maximal cosine distance
+        :return: boolean mask with the shape of similarities
+        """
+        return (1 - self.similarities(questions) <= threshold) | ~self.present
+
+    def top_k(self, questions, k: int) -> np.ndarray:
+        """
+        Returns the indices of the elements most similar to the questions, elements without an embedding are never
+        returned
+        :param questions: see similarities
+        :param k: maximal number of elements per question
+        :return: indices ordered by descending similarity, shape (k,) for one question, (questions, k) for a batch
+        """
+        scores = np.where(self.present, self.similarities(questions), -np.inf)
+        k = min(k, int(self.present.sum()))
+        if k <= 0:
+            return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=-1)
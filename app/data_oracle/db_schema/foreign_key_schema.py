@@ -1,12 +1,14 @@
 from .base_db_class import BaseDbObject
-from .utils import get_proper_naming
+from .utils import get_proper_naming, intern_name
 
 
 class Foreign_Key_Relation(BaseDbObject):
+    __slots__ = ("constrained_columns", "referred_table", "referred_schema", "referred_columns")
+
     def __init__(self, _cols: list[str] | set, ref_table: str, ref_schema: str, ref_cols: list[str]):
         self.constrained_columns = _cols
-        self.referred_table = ref_table
-        self.referred_schema = ref_schema
+        self.referred_table = intern_name(ref_table)
+        self.referred_schema = intern_name(ref_schema)
         self.referred_columns = ref_cols
 
     def return_sql_definition(self, use_normalized: bool) -> str:
@@ -0,0 +1,351 @@
+import json
+import mmap
+import struct
+
+from .database_schema import Column, Table, Schema, Database
+from .foreign_key_schema import Foreign_Key_Relation
+from ..enums import Data_Table_Type
+
+SNAPSHOT_FORMAT = "turbular-schema-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b"TSNP"
+# magic, format version and offset of the directory
+SNAPSHOT_HEADER = struct.Struct(">4sHQ")
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def _table_type(value: str) -> Data_Table_Type | str:
+    try:
+        return Data_Table_Type(value)
+    except ValueError:
+        return value
+
+
+def table_record(table: Table) -> list:
+    """
+    Returns the compact representation of a table shared by the json and the binary snapshot
+    :param table: Table object
+    :return: list of name, type, pk name, fingerprint, columns and foreign keys
+    """
+    return [
+        table.name,
+        str(table.type),
+        table.pk_name,
+        table.fingerprint,
+        [[column.name, column.type, column.is_pk, column.is_fk, column.enums] for column in table.columns],
+        [[list(fk.constrained_columns), fk.referred_table, fk.referred_schema, list(fk.referred_columns)]
+         for fk in table.fk_relations],
+    ]
+
+
+def table_from_record(record: list) -> Table:
+    """
+    Builds a table from its compact representation
+    :param record: see table_record
+    :return: Table object
+    """
+    name, table_type, pk_name, fingerprint, columns, fk_relations = record
+    table = Table(name, pk_name, [Column(*column) for column in columns], _table_type(table_type),
+                  [Foreign_Key_Relation(*fk_relation) for fk_relation in fk_relations])
+    table.fingerprint = fingerprint
+    return table
+
+
+def snapshot_dict(db: Database) -> dict:
+    """
+    Returns the layout of a database as a json serializable snapshot. Filters and embeddings are not part of it
+    :param db: Database object
+    :return: snapshot dict with format name and version
+    """
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "name": db.name,
+        "fingerprint": db.fingerprint,
+        "schemas": [[schema.name, [table_record(table) for table in schema.tables]] for schema in db.schemas],
+    }
+
+
+def _check_version(snapshot_format: str | bytes, version: int) -> None:
+    if snapshot_format not in (SNAPSHOT_FORMAT, SNAPSHOT_MAGIC):
+        raise SnapshotFormatError("Not a schema snapshot")
+    if version > SNAPSHOT_VERSION:
+        raise SnapshotFormatError(f"Snapshot version {version} is newer than the supported version "
+                                  f"{SNAPSHOT_VERSION}")
+
+
+def schemas_from_snapshot_dict(snapshot: dict) -> list[Schema]:
+    """
+    Builds the schemas of a snapshot dict
+    :param snapshot: see snapshot_dict
+    :return: list of Schema objects
+    :raises SnapshotFormatError: if the dict is no snapshot or has an unsupported version
+    """
+    _check_version(snapshot.get("format"), snapshot.get("version", 0))
+    return [Schema(name, [table_from_record(record) for record in tables]) for name, tables in snapshot["schemas"]]
+
+
+def database_from_snapshot_dict(snapshot: dict) -> Database:
+    """
+    Builds a database from a snapshot dict
+    :param snapshot: see snapshot_dict
+    :return: Database object
+    """
+    db = Database(snapshot["name"])
+    db.register_schemas(schemas_from_snapshot_dict(snapshot))
+    db.fingerprint = snapshot["fingerprint"]
+    return db
+
+
+def dumps_json(db: Database) -> str:
+    return json.dumps(snapshot_dict(db), separators=(",", ":"), default=str)
+
+
+def loads_json(data: str | bytes) -> Database:
+    return database_from_snapshot_dict(json.loads(data))
+
+
+def is_json_snapshot(data: str) -> bool:
+    """
+    Returns whether a cached layout is a json snapshot instead of ddl
+    """
+    return data.lstrip().startswith("{") and f'"{SNAPSHOT_FORMAT}"' in data[:200]
+
+
+def _pack(value, out: bytearray) -> None:
+    """
+    Appends the msgpack encoding of None, bool, int, float, str, list and dict values, other values are stored as
+    their string representation
+    """
+    if value is None:
+        out.append(0xc0)
+    elif value is True:
+        out.append(0xc3)
+    elif value is False:
+        out.append(0xc2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -0x20 <= value < 0:
+            out.append(value & 0xff)
+        else:
+            out += b"\xd3" + struct.pack(">q", value)
+    elif isinstance(value, float):
+        out += b"\xcb" + struct.pack(">d", value)
+    elif isinstance(value, str):
+        data = value.encode()
+        size = len(data)
+        if size < 0x20:
+            out.append(0xa0 | size)
+        elif size < 0x100:
+            out += bytes((0xd9, size))
+        elif size < 0x10000:
+            out += b"\xda" + struct.pack(">H", size)
+        else:
+            out += b"\xdb" + struct.pack(">I", size)
+        out += data
+    elif isinstance(value, (list, tuple, set)):
+        size = len(value)
+        if size < 0x10:
+            out.append(0x90 | size)
+        elif size < 0x10000:
+            out += b"\xdc" + struct.pack(">H", size)
+        else:
+            out += b"\xdd" + struct.pack(">I", size)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        size = len(value)
+        if size < 0x10:
+            out.append(0x80 | size)
+        elif size < 0x10000:
+            out += b"\xde" + struct.pack(">H", size)
+        else:
+            out += b"\xdf" + struct.pack(">I", size)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    else:
+        _pack(str(value), out)
+
+
+_SIZES = {0xd9: struct.Struct(">B"), 0xda: struct.Struct(">H"), 0xdb: struct.Struct(">I"),
+          0xdc: struct.Struct(">H"), 0xdd: struct.Struct(">I"), 0xde: struct.Struct(">H"), 0xdf: struct.Struct(">I")}
+_INT64 = struct.Struct(">q")
+_FLOAT64 = struct.Struct(">d")
+
+
+def _unpack(buffer, offset: int) -> tuple:
+    """
+    Decodes the value at an offset of a buffer written by _pack
+    :return: tuple of value and offset of the next value
+    """
+    code = buffer[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if 0xa0 <= code <= 0xbf or code in (0xd9, 0xda, 0xdb):
+        if code <= 0xbf:
+            size = code & 0x1f
+        else:
+            size_struct = _SIZES[code]
+            size = size_struct.unpack_from(buffer, offset)[0]
+            offset += size_struct.size
+        return str(buffer[offset:offset + size], "utf-8"), offset + size
+    if 0x90 <= code <= 0x9f or code in (0xdc, 0xdd):
+        if code <= 0x9f:
+            size = code & 0x0f
+        else:
+            size = _SIZES[code].unpack_from(buffer, offset)[0]
+            offset += _SIZES[code].size
+        items = []
+        for _ in range(size):
+            item, offset = _unpack(buffer, offset)
+            items.append(item)
+        return items, offset
+    if 0x80 <= code <= 0x8f or code in (0xde, 0xdf):
+        if code <= 0x8f:
+            size = code & 0x0f
+        else:
+            size = _SIZES[code].unpack_from(buffer, offset)[0]
+            offset += _SIZES[code].size
+        items = {}
+        for _ in range(size):
+            key, offset = _unpack(buffer, offset)
+            items[key], offset = _unpack(buffer, offset)
+        return items, offset
+    if code == 0xc0:
+        return None, offset
+    if code == 0xc2:
+        return False, offset
+    if code == 0xc3:
+        return True, offset
+    if code == 0xd3:
+        return _INT64.unpack_from(buffer, offset)[0], offset + 8
+    if code == 0xcb:
+        return _FLOAT64.unpack_from(buffer, offset)[0], offset + 8
+    raise SnapshotFormatError(f"Unsupported type code {code:#x} at offset {offset - 1}")
+
+
+def dumps_binary(db: Database) -> bytes:
+    """
+    Encodes the layout of a database as binary snapshot. Every table is stored as msgpack encoded record followed by
+    a directory of the offsets of all tables, so single tables can be decoded without reading the whole snapshot
+    :param db: Database object
+    :return: snapshot bytes
+    """
+    out = bytearray(SNAPSHOT_HEADER.size)
+    directory = []
+    for schema in db.schemas:
+        tables = []
+        for table in schema.tables:
+            offset = len(out)
+            _pack(table_record(table), out)
+            tables.append([table.name, offset, len(out) - offset])
+        directory.append([schema.name, tables])
+    directory_offset = len(out)
+    _pack([db.name, db.fingerprint, directory], out)
+    SNAPSHOT_HEADER.pack_into(out, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, directory_offset)
+    return bytes(out)
+
+
+class SnapshotReader:
+    """
+    Reads a binary snapshot from bytes or a memory mapped file. Only the directory is decoded up front, tables are
+    decoded when they are accessed
+    """
+
+    def __init__(self, buffer, _mmap: mmap.mmap | None = None):
+        """
+        :param buffer: bytes like object holding the snapshot
+        :raises SnapshotFormatError: if the buffer is no snapshot or has an unsupported version
+        """
+        if len(buffer) < SNAPSHOT_HEADER.size:
+            raise SnapshotFormatError("Not a schema snapshot")
+        magic, version, directory_offset = SNAPSHOT_HEADER.unpack_from(buffer, 0)
+        _check_version(magic, version)
+        self.buffer = buffer
+        self._mmap = _mmap
+        (self.name, self.fingerprint, directory), _ = _unpack(buffer, directory_offset)
+        self.directory: dict[str, dict[str, tuple[int, int]]] = {
+            schema_name: {table_name: (offset, length) for table_name, offset, length in tables}
+            for schema_name, tables in directory
+        }
+
+    @property
+    def schema_names(self) -> list[str]:
+        return list(self.directory)
+
+    def table_names(self, schema_name: str) -> list[str]:
+        return list(self.directory[schema_name])
+
+    def table(self, schema_name: str, table_name: str) -> Table:
+        """
+        Decodes a single table
+        :raises KeyError: if the schema or table is not part of the snapshot
+        """
+        offset, _ = self.directory[schema_name][table_name]
+        return table_from_record(_unpack(self.buffer, offset)[0])
+
+    def schema(self, schema_name: str, table_names: list[str] | None = None) -> Schema:
+        """
+        Decodes a schema with all or a subset of its tables
+        :param schema_name: name of the schema
+        :param table_names: names of the tables to decode, all tables if None
+        :return: Schema object
+        """
+        table_names = self.table_names(schema_name) if table_names is None else table_names
+        return Schema(schema_name, [self.table(schema_name, table_name) for table_name in table_names])
+
+    def database(self, schema_names: list[str] | None = None) -> Database:
+        """
+        Decodes the database with all or a subset of its schemas
+        :param schema_names: names of the schemas to decode, all schemas if None
+        :return: Database object
+        """
+        db = Database(self.name)
+        db.register_schemas([self.schema(name) for name in (self.schema_names if schema_names is None
+                                                            else schema_names)])
+        db.fingerprint = self.fingerprint
+        return db
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self.buffer = b""
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def loads_binary(data: bytes) -> Database:
+    return SnapshotReader(data).database()
+
+
+def write_snapshot(db: Database, path: str) -> None:
+    with open(path, "wb") as f:
+        f.write(dumps_binary(db))
+
+
+def open_snapshot(path: str) -> SnapshotReader:
+    """
+    Memory maps a binary snapshot file, tables are only read from disk when they are decoded
+    :param path: path of a file written by write_snapshot
+    :return: SnapshotReader, close it to release the file
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return SnapshotReader(mapped, mapped)
+    except Exception:
+        mapped.close()
+        raise
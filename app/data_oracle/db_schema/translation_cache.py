@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from .utils import translate_sql_args
+
+
+def translations_version(translations: dict) -> str:
+    """
+    Returns a hash identifying the content of a translations map
+    :param translations: translations map of a database, see Database.translations_map
+    :return: hex digest that changes whenever a name or the set of filtered elements changes
+    """
+    return hashlib.sha256(json.dumps(translations, sort_keys=True).encode()).hexdigest()
+
+
+class TranslationCache:
+    """
+    Bounded LRU cache of translated queries. Entries are keyed by the query text, the dialect and the version of the
+    translations map, so changing the filters of a database never returns a stale translation. Failed translations
+    are not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        :param max_entries: number of translated queries that are kept, the least recently used one is evicted first
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str, str, bool], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def translate(self, query: str, translations: dict, db_type: str, version: str | None = None,
+                  optimize_query: bool = True) -> str:
+        """
+        Translates a query like translate_sql_args and caches the result
+        :param query: sql query using the normalized names
+        :param translations: translations map of the database
+        :param db_type: type of the database, e.g. PostgreSQL
+        :param version: version of the translations map, computed from the map if not given
+        :param optimize_query: run the sqlglot optimizer before translating, see translate_sql_args
+        :return: sql query using the names of the database
+        """
+        key = (query.strip(), db_type, version or translations_version(translations), optimize_query)
+        with self._lock:
+            translated = self._entries.get(key)
+            if translated is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return translated
+            self.misses += 1
+        translated = translate_sql_args(query, translations, db_type, optimize_query)
+        with self._lock:
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return translated
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def metrics(self) -> dict:
+        """
+        Returns the size and hit rate counters of the cache
+        :return: dict with entries, max_entries, hits, misses and hit_rate
+        """
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self) -> int:
+        """
+        Removes all cached translations, the counters are kept
+        :return: number of removed entries
+        """
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+translation_cache = TranslationCache()
@@ -0,0 +1,122 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationIndex:
+    """
+    Bidirectional index between the normalized (proper) and the raw names of the schemas, tables and unfiltered
+    columns of a database. Names are keyed by qualified tuples, e.g. ("public", "usermodel", "createdat"), so every
+    lookup is a single dict access. The nested translations map used to translate queries is kept alongside and
+    both are updated per table when column filters change. Raw names that normalize to the same proper name are
+    recorded as collisions when they are added, the last raw name wins like in the translations map.
+    """
+
+    def __init__(self, schemas: list):
+        """
+        :param schemas: schemas of the database
+        """
+        self.to_raw: dict[tuple[str, ...], str] = {}
+        self.to_proper: dict[tuple[str, ...], str] = {}
+        self.translations_map: dict = {}
+        self.collisions: dict[tuple[str, ...], tuple[str, ...]] = {}
+        self._columns: dict[tuple[str, str], list[tuple[str, str]]] = {}
+        self._digest = 0
+        for schema in schemas:
+            self.add_schema(schema)
+
+    @property
+    def version(self) -> str:
+        """
+        Returns a version that changes whenever a name is added, removed or renamed, it is updated per entry and
+        only valid within the running process
+        :return: version string
+        """
+        return f"{self._digest & 0xFFFFFFFFFFFFFFFF:016x}"
+
+    def raw_name(self, *proper_names: str) -> str | None:
+        """
+        Returns the raw name of a schema, table or column
+        :param proper_names: proper names of the schema, table and column, e.g. ("public", "usermodel")
+        :return: raw name or None if the element is unknown
+        """
+        return self.to_raw.get(proper_names)
+
+    def proper_name(self, *raw_names: str) -> str | None:
+        """
+        Returns the proper name of a schema, table or column
+        :param raw_names: raw names of the schema, table and column, e.g. ("public", "UserModel")
+        :return: proper name or None if the element is unknown
+        """
+        return self.to_proper.get(raw_names)
+
+    def resolve(self, qualified_name: str) -> str | None:
+        """
+        Returns the raw name of a dot separated proper name, proper names never contain dots
+        :param qualified_name: e.g. public.usermodel.createdat
+        :return: raw name or None if the element is unknown
+        """
+        return self.to_raw.get(tuple(qualified_name.split(".")))
+
+    def add_schema(self, schema) -> None:
+        """
+        Adds a schema with all its tables and unfiltered columns
+        :param schema: Schema object
+        :return: None
+        """
+        self._add((schema.proper_name,), (schema.name,))
+        self.translations_map[schema.proper_name] = {"name": schema.name, "Tables": {}}
+        for table in schema.tables:
+            self._add((schema.proper_name, table.proper_name), (schema.name, table.name))
+            self.update_columns(schema, table)
+
+    def update_columns(self, schema, table) -> None:
+        """
+        Replaces the columns of a table with its currently unfiltered columns, call it after the column filters of
+        the table changed
+        :param schema: Schema object the table belongs to
+        :param table: Table object
+        :return: None
+        """
+        table_key = (schema.proper_name, table.proper_name)
+        for proper_name, raw_name in self._columns.pop(table_key, []):
+            self._remove((*table_key, proper_name), (schema.name, table.name, raw_name))
+        columns = [(column.proper_name, column.name) for column in table.get_cols()]
+        for proper_name, raw_name in columns:
+            self._add((*table_key, proper_name), (schema.name, table.name, raw_name))
+        self._columns[table_key] = columns
+        if self.to_raw.get(table_key[:1]) == schema.name and self.to_raw.get(table_key) == table.name:
+            self.translations_map[schema.proper_name]["Tables"][table.proper_name] = {
+                "name": table.name,
+                "Columns": {proper_name: raw_name for proper_name, raw_name in columns}
+            }
+
+    def _add(self, proper_key: tuple[str, ...], raw_key: tuple[str, ...]) -> None:
+        raw_name = raw_key[-1]
+        previous = self.to_raw.get(proper_key)
+        if previous is not None:
+            self._digest ^= hash((proper_key, previous))
+            if previous != raw_name:
+                self.collisions[proper_key] = (*self.collisions.get(proper_key, (previous,)), raw_name)
+                logger.warning(f"Names {self.collisions[proper_key]} are all normalized to "
+                               f"{'.'.join(proper_key)}, only {raw_name} can be translated")
+        self.to_raw[proper_key] = raw_name
+        self.to_proper[raw_key] = proper_key[-1]
+        self._digest ^= hash((proper_key, raw_name))
+
+    def _remove(self, proper_key: tuple[str, ...], raw_key: tuple[str, ...]) -> None:
+        self.to_proper.pop(raw_key, None)
+        raw_name = self.to_raw.get(proper_key)
+        if raw_name is None:
+            return
+        self._digest ^= hash((proper_key, raw_name))
+        collision = self.collisions.pop(proper_key, None)
+        remaining = tuple(name for name in collision or () if name != raw_key[-1])
+        if remaining:
+            # another raw name with the same proper name is still present
+            self.to_raw[proper_key] = remaining[-1]
+            self._digest ^= hash((proper_key, remaining[-1]))
+            if len(remaining) > 1:
+                self.collisions[proper_key] = remaining
+        else:
+            del self.to_raw[proper_key]
@@ -1,7 +1,14 @@
 import re
+import sys
 
-from sqlglot import parse_one, exp
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from sqlglot import parse, exp
+from sqlglot.errors import ParseError
 from sqlglot.optimizer import optimize
+from sqlglot.optimizer.scope import Scope, traverse_scope
 
 
 def parse_db_layout(db_layout: str, default_schema: str | None = None) -> {}:
@@ -87,89 +94,6 @@ def parse_db_layout(db_layout: str, default_schema: str | None = None) -> {}:
     return dbinfo
 
 
-def extract_mapped_tables(sql_query: str, db_type: str):
-    """
-    Extract mapped tables from SQL query
-    :param sql_query: query to be parsed
-    :param db_type: database type
-    :return:
-    """
-    final_mapping_info = {
-        "Schemas": {},
-        "Tables": {},
-        "Columns": [],
-        "Dependencies": {}
-    }
-    dependencies = {}
-    opt_query = sql_query
-    ast = parse_one(opt_query, dialect=DatabaseType_mapper[db_type])
-    for cte in ast.find_all(exp.CTE):
-        dependencies[cte.alias_or_name] = {
-            "SchemaTables": {},
-            "Tables": set(),
-            "ColumnsAlias": set(),
-            "Columns": {}
-        }
-
-        # get subquery in cte "with name as (...)"
-
-        query = cte.this.sql(DatabaseType_mapper[db_type])
-        parsed_query = parse_one(query, dialect=DatabaseType_mapper[db_type])
-        for table in parsed_query.find_all(exp.Table):
-            dependencies[cte.alias_or_name]["Tables"].add(table.name if table.db == "" else table.db + "." + table.name)
-
-        for column in parsed_query.find_all(exp.Column):
-            if not str(column).startswith('"'):  # for cases where col1 == "Martha"
-                if column.table in dependencies[cte.alias_or_name]["Columns"]:
-                    dependencies[cte.alias_or_name]["Columns"][column.table].add(column.name)
-                else:
-                    dependencies[cte.alias_or_name]["Columns"][column.table] = {column.name}
-        for alias in parsed_query.find_all(exp.Alias):
-            dependencies[cte.alias_or_name]["ColumnsAlias"].add(alias.alias)
-
-    for column in ast.find_all(exp.Column):
-        # if not str(column).startswith('"'):
-        final_mapping_info["Columns"].append(str(column))
-    for table in ast.find_all(exp.Table):
-        table_name = table.name if table.db == "" else table.db + "." + table.name
-        final_mapping_info["Tables"][table.alias] = table_name
-    final_mapping_info["Dependencies"] = dependencies
-    return final_mapping_info
-
-
-def find_column_recursive(table_name: str, column_name: str, translations: dict, table_map: dict, db_type: str,
-                          column_map={}):
-    """
-    Searches recursively through translations using the table_map.
-    :param table_name: table name to search for
-    :param column_name: column name to search for
-    :param translations: translation object containing normalized to unnormalied names
-    :param table_map: table mapping info for sql query
-    :param column_map: cte column mapping from table map used for recursion
-    :return:
-    """
-    splitted_table = table_name.split(".")
-    if len(splitted_table) == 1 and splitted_table[0] in table_map["Dependencies"]:  # cte table so
-        ## could be juust extracted from only public schema what to do then ???
-        search_table = splitted_table[0]
-        #
-        ## find dependent tables in cte creation
-        for new_table in table_map["Dependencies"][search_table]["Tables"]:
-            # research with new tables
-            return find_column_recursive(new_table, column_name, translations, table_map, db_type,
-                                         table_map["Dependencies"][search_table]["Columns"])
-    else:
-        if len(splitted_table) == 1:
-            search_table = splitted_table[0]
-            search_schema = get_default_schema(translations, db_type)
-        else:
-            search_schema, search_table = splitted_table
-        if column_name in translations[search_schema]['Tables'][search_table]["Columns"]:
-            return translations[search_schema]['Tables'][search_table]["Columns"][column_name]
-        else:
-            return None  # nochmal checken ??
-
-
 DatabaseType_mapper = {
     "MySQL": "mysql",
     "PostgreSQL": "postgres",
@@ -216,78 +140,270 @@ def get_default_schema(translations: dict, db_type: str):
         return default_schemas[db_type]
 
 
-def translate_sql_args(query: str, translations: dict, db_type: str) -> str:
+_parsed_statements: OrderedDict[tuple[str, str], tuple[exp.Expression, ...]] = OrderedDict()
+_parsed_statements_lock = threading.Lock()
+PARSED_STATEMENTS_MAX_ENTRIES = 256
+
+
+def _remember_statements(query: str, db_type: str, statements: tuple[exp.Expression, ...]) -> None:
+    with _parsed_statements_lock:
+        _parsed_statements[(query, db_type)] = statements
+        _parsed_statements.move_to_end((query, db_type))
+        while len(_parsed_statements) > PARSED_STATEMENTS_MAX_ENTRIES:
+            _parsed_statements.popitem(last=False)
+
+
+def parse_statements(query: str, db_type: str) -> tuple[exp.Expression, ...]:
     """
-    Takes in an sql query that uses normalized names and mappes them to
-    their unnormalized counterpart
-    :param query: sql query to be translated
-    :param translations: translation map containing normalized to unnormalized names
+    Parses the statements of a query, recently parsed and translated queries are returned from memory, so
+    translating, validating and canonicalizing the same query only parses it once. The returned statements are
+    shared and must be copied before they are modified
+    :param query: sql query
     :param db_type: type of database
-    :return:
+    :return: parsed statements
+    :raises ParseError: if the query can not be parsed
     """
-    identifier_start = '"' if db_type != "MsSql" else '['
-    identifier_end = '"' if db_type != "MsSql" else ']'
-    default_schema_name = get_default_schema(translations, db_type)
-
-    query = optimize(query, dialect=DatabaseType_mapper[db_type]).sql(DatabaseType_mapper[db_type])
-    mapped_table = extract_mapped_tables(query, db_type)
-    for column in mapped_table["Columns"]:
-        column = column.replace('"', '')
-        split_col = column.split(".")
-        if len(split_col) == 1:
-            continue
-        table_alias, column_name = split_col  ## table alias dank libary
-        table_schema_split = mapped_table["Tables"][table_alias].split(".")  ## get real table name
-        # table is schema.table or just table in case of cte
-        new_col_name = column_name
-        if len(table_schema_split) == 2:
-
-            schema, table = table_schema_split
-            if column_name in translations[schema]['Tables'][table]["Columns"]:
-                new_col_name = translations[schema]['Tables'][table]["Columns"][column_name]
-        else:
-            ## if table name in cte it is a cte table if not assume default public schema and query only uses public
-            table = table_schema_split[0]
-            if table not in mapped_table["Dependencies"]:
-                schema = default_schema_name
+    key = (query, db_type)
+    with _parsed_statements_lock:
+        statements = _parsed_statements.get(key)
+        if statements is not None:
+            _parsed_statements.move_to_end(key)
+            return statements
+    statements = tuple(x for x in parse(query, read=DatabaseType_mapper[db_type]) if x is not None)
+    _remember_statements(query, db_type, statements)
+    return statements
+
+
+def parse_read_query(query: str, db_type: str) -> exp.Query | None:
+    """
+    Parses a query that is a single statement which only reads data, e.g. a select, a union or a cte
+    :param query: sql query
+    :param db_type: type of database
+    :return: parsed query or None if the query writes, locks rows, consists of multiple statements or can not be
+    parsed. The query is shared, copy it before modifying it
+    """
+    try:
+        statements = parse_statements(query, db_type)
+    except ParseError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query) or statements[0].args.get("into"):
+        return None
+    # a select can still write in a data modifying cte or lock rows with for update
+    if statements[0].find(exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Lock):
+        return None
+    return statements[0]
+
+
+def is_read_query(query: str, db_type: str) -> bool:
+    """
+    Returns whether a query is a single statement that only reads data, e.g. a select, a union or a cte
+    :param query: sql query
+    :param db_type: type of database
+    :return: Boolean, False if the query can not be parsed
+    """
+    return parse_read_query(query, db_type) is not None
 
-                if column_name in translations[schema]['Tables'][table]["Columns"]:
-                    new_col_name = translations[schema]['Tables'][table]["Columns"][column_name]
-            else:
 
-                if column_name not in mapped_table["Dependencies"][table]["ColumnsAlias"]:
-                    search_result = find_column_recursive(table, column_name, translations, mapped_table, db_type, {})
-                    if search_result is None:
-                        pass
-                    else:
-                        new_col_name = search_result
-        query = query.replace(
-            f'{identifier_start}{table_alias}{identifier_end}.{identifier_start}{column_name}{identifier_end}',
-            f'{identifier_start}{table_alias}{identifier_end}.{identifier_start}{new_col_name}{identifier_end}')
+def canonicalize_read_query(query: str, db_type: str) -> str | None:
+    """
+    Returns a canonical form of a read query, queries that only differ in whitespace, comments, keyword casing,
+    optional AS keywords or the names of table aliases share the same canonical form
+    :param query: sql query
+    :param db_type: type of database
+    :return: canonical sql or None if the query is not a single read statement
+    """
+    parsed = parse_read_query(query, db_type)
+    if parsed is None:
+        return None
+    parsed = parsed.copy()
+    tables = list(parsed.find_all(exp.Table))
+    aliases = [table.alias for table in tables if table.alias]
+    names = {table.name for table in tables} | {column.name for column in parsed.find_all(exp.Column)}
+    # aliases are only renamed if every alias is unique and no table or column shares the name of an alias
+    if len(set(aliases)) == len(aliases) and not names & set(aliases):
+        renamed = {alias: f"_t{i}" for i, alias in enumerate(aliases)}
+        for table in tables:
+            if table.alias:
+                table.set("alias", exp.TableAlias(this=exp.to_identifier(renamed[table.alias])))
+        for column in parsed.find_all(exp.Column):
+            if column.table in renamed:
+                column.set("table", exp.to_identifier(renamed[column.table]))
+    return parsed.sql(dialect=DatabaseType_mapper[db_type], comments=False)
+
+
+def _table_translation(table: exp.Table, translations: dict, default_schema: str | None) -> tuple[str, dict] | None:
+    """
+    Looks up the translations of a table that is referenced with normalized names
+    :param table: table node as written in the query
+    :param translations: translation map containing normalized to unnormalized names
+    :param default_schema: schema of tables that are referenced without one
+    :return: tuple of normalized schema name and table translations or None if the table is unknown
+    """
+    schema = table.db or default_schema
+    if schema not in translations and not table.db and len(translations) == 1:
+        schema = next(iter(translations))
+    table_translation = translations.get(schema, {}).get("Tables", {}).get(table.name)
+    return None if table_translation is None else (schema, table_translation)
 
-    for table_alias in mapped_table["Tables"]:
-        split_table_name = mapped_table["Tables"][table_alias].split(".")
 
-        if len(split_table_name) == 2 or split_table_name[0] not in mapped_table["Dependencies"]:
-            if len(split_table_name) == 2:
-                schema, table_name = split_table_name
-            else:
-                schema = default_schema_name
-                table_name = split_table_name[0]
-            if table_name in translations[schema]['Tables']:
-                true_name_table = translations[schema]['Tables'][table_name]["name"]
+def _source_column(source, column_name: str, translations: dict, default_schema: str | None) -> str | None:
+    """
+    Returns the unnormalized name of a column a source of a scope exposes under a normalized name, ctes and derived
+    tables only expose unnormalized names through stars
+    :param source: table node or scope of a cte or derived table
+    :param column_name: normalized column name
+    :param translations: translation map containing normalized to unnormalized names
+    :param default_schema: schema of tables that are referenced without one
+    :return: unnormalized column name or None if the source does not expose the column
+    """
+    if isinstance(source, exp.Table):
+        table_translation = _table_translation(source, translations, default_schema)
+        return None if table_translation is None else table_translation[1]["Columns"].get(column_name)
+    if not isinstance(source, Scope) or not isinstance(source.expression, exp.Query):
+        return None
+    for projection in source.expression.selects:
+        if projection.is_star:
+            star_table = projection.table if isinstance(projection, exp.Column) else ""
+            sources = [source.sources[star_table]] if star_table in source.sources else source.sources.values()
+            for inner_source in sources:
+                translated = _source_column(inner_source, column_name, translations, default_schema)
+                if translated is not None:
+                    return translated
+        elif projection.alias_or_name == column_name:
+            # translated projections keep their normalized name as alias
+            return None
+    return None
+
+
+def _resolve_column(column: exp.Column, scope: Scope | None, translations: dict,
+                    default_schema: str | None) -> str | None:
+    """
+    Resolves a column to the unnormalized name of the column it references, qualified columns are looked up in the
+    source of their qualifier, unqualified columns in every source of their scope
+    :param column: column node as written in the query
+    :param scope: scope the column appears in, outer scopes are searched for correlated columns
+    :param translations: translation map containing normalized to unnormalized names
+    :param default_schema: schema of tables that are referenced without one
+    :return: unnormalized column name or None if the column can not be resolved
+    """
+    while scope is not None:
+        if column.table:
+            if column.table in scope.sources:
+                return _source_column(scope.sources[column.table], column.name, translations, default_schema)
+        else:
+            matches = {_source_column(source, column.name, translations, default_schema)
+                       for source in scope.sources.values()} - {None}
+            if len(matches) == 1:
+                return matches.pop()
+        scope = scope.parent
+    return None
 
-                # query = query.replace(f'"{table_alias}"', f'"{true_name_table}"')
-                query = query.replace(f'{identifier_start}{table_name}{identifier_end}',
-                                      f'{identifier_start}{true_name_table}{identifier_end}')
 
-    return query
+def _statement_columns(statement: exp.Expression, cte_names: set[str]) -> list[tuple[Scope, list[exp.Column]]]:
+    """
+    Returns the scopes of a statement together with the columns of each scope, statements that are not queries,
+    e.g. updates, get one scope holding all tables and columns of the statement
+    """
+    scopes = traverse_scope(statement)
+    if scopes:
+        return [(scope, scope.columns) for scope in scopes]
+    tables = {table.alias_or_name: table for table in statement.find_all(exp.Table)
+              if table.db or table.name not in cte_names}
+    return [(Scope(statement, sources=tables), list(statement.find_all(exp.Column)))]
 
 
+def translate_sql_ast(statement: exp.Expression, translations: dict, db_type: str) -> exp.Expression:
+    """
+    Rewrites the normalized names of tables, schemas and columns in a parsed statement to their unnormalized
+    counterparts. The identifiers are resolved through the scopes of the statement and replaced on the nodes
+    :param statement: parsed statement, it is modified in place
+    :param translations: translation map containing normalized to unnormalized names
+    :param db_type: type of database
+    :return: the translated statement
+    """
+    default_schema = get_default_schema(translations, db_type)
+    cte_names = {cte.alias_or_name for cte in statement.find_all(exp.CTE)}
+    renames: list[tuple[exp.Expression, str, str]] = []
+    projections: list[tuple[exp.Column, exp.Identifier]] = []
+    for scope, columns in _statement_columns(statement, cte_names):
+        selects = {id(projection) for projection in scope.expression.expressions} \
+            if isinstance(scope.expression, exp.Select) else set()
+        for column in columns:
+            translated = _resolve_column(column, scope, translations, default_schema)
+            if translated is not None and translated != column.name:
+                renames.append((column, "this", translated))
+                if id(column) in selects:
+                    projections.append((column, exp.to_identifier(column.name, quoted=column.this.quoted)))
+
+    qualifiers = {}
+    for table in statement.find_all(exp.Table):
+        if not table.db and table.name in cte_names:
+            continue
+        table_translation = _table_translation(table, translations, default_schema)
+        if table_translation is None:
+            continue
+        schema, table_translation = table_translation
+        if table.db and translations[schema]["name"] != table.db:
+            renames.append((table, "db", translations[schema]["name"]))
+        if table_translation["name"] != table.name:
+            renames.append((table, "this", table_translation["name"]))
+            if table.alias == table.name:
+                renames.append((table.args["alias"], "this", table_translation["name"]))
+            if table.alias in ("", table.name):
+                qualifiers[table.name] = table_translation["name"]
+    for column in statement.find_all(exp.Column):
+        if column.table in qualifiers:
+            renames.append((column, "table", qualifiers[column.table]))
+
+    for node, arg, name in renames:
+        node.set(arg, exp.to_identifier(name, quoted=True))
+    # renamed columns in the select list are aliased with their normalized name, so the result and references to
+    # the output of ctes and subqueries keep their names
+    for column, normalized_name in projections:
+        alias = exp.Alias(alias=normalized_name)
+        column.replace(alias)
+        alias.set("this", column)
+    return statement
+
+
+def translate_sql_args(query: str, translations: dict, db_type: str, optimize_query: bool = True) -> str:
+    """
+    Takes in an sql query that uses normalized names and mappes them to
+    their unnormalized counterpart. The query is parsed once, the parsed translation is kept, so validating the
+    translated query does not parse it again
+    :param query: sql query to be translated
+    :param translations: translation map containing normalized to unnormalized names
+    :param db_type: type of database
+    :param optimize_query: run the sqlglot optimizer before translating, it qualifies every column but rewrites
+    the structure of the query, e.g. turns subqueries into ctes. Without it columns are resolved through the scopes
+    of the query and the query keeps its structure
+    :return: translated sql query
+    """
+    dialect = DatabaseType_mapper[db_type]
+    statements = []
+    for statement in parse_statements(query, db_type):
+        statement = optimize(statement, dialect=dialect) if optimize_query else statement.copy()
+        statements.append(translate_sql_ast(statement, translations, db_type))
+    translated = "; ".join(statement.sql(dialect) for statement in statements)
+    _remember_statements(translated, db_type, tuple(statements))
+    return translated
+
+
+@lru_cache(maxsize=65536)
 def get_proper_naming(_input: str) -> str:
     """
-    Transforms a db, schema, table and column name into a proper naming
+    Transforms a db, schema, table and column name into a proper naming, names repeat across tables so results are
+    memoized
     :param _input: input name
     :return: normalized name
     """
     return _input.lower().replace(" ", "_").replace("-", "_").replace(".", "_")
+
+
+def intern_name(value):
+    """
+    Interns names and type strings, equal names of many tables then share a single string
+    :param value: name or type, values that are no plain strings are returned unchanged
+    :return: interned string
+    """
+    return sys.intern(value) if type(value) is str else value
@@ -0,0 +1,3 @@
+from .embedding_cache import EmbeddingCache, CachedEmbedder
+from .ann_index import QuantizedIVFIndex
+from .schema_index import SchemaIndex
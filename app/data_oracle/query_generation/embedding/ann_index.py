@@ -0,0 +1,110 @@
+import numpy as np
+
+from ...db_schema.embedding_matrix import normalize_rows
+
+# rows scored per matrix product while the index is built, bounds the memory of the score matrix
+ASSIGNMENT_CHUNK_SIZE = 16384
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantizes vectors to int8 with one scale per vector
+    :param vectors: 2d float array
+    :return: tuple of int8 codes and float32 scales, vectors ~= codes * scales[:, None]
+    """
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignment = np.empty(len(vectors), dtype=np.intp)
+    for start in range(0, len(vectors), ASSIGNMENT_CHUNK_SIZE):
+        chunk = vectors[start:start + ASSIGNMENT_CHUNK_SIZE]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Clusters unit vectors by cosine similarity
+    :return: unit centroids of shape (n_clusters, dimensions)
+    """
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)]
+    for _ in range(n_iter):
+        assignment = nearest_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~np.any(sums, axis=1)
+        # clusters that lost all vectors are restarted at random vectors
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class QuantizedIVFIndex:
+    """
+    Approximate nearest neighbour index by cosine similarity. Vectors are clustered into inverted lists by spherical
+    k-means and stored as int8 codes grouped by list, a search only scores the lists whose centroids are closest to
+    the query. Codes take a quarter of the memory of float32 vectors
+    """
+
+    def __init__(self,
+                 vectors: np.ndarray,
+                 n_lists: int | None = None,
+                 n_iter: int = 8,
+                 training_size_per_list: int = 64,
+                 seed: int = 0):
+        """
+        :param vectors: 2d array of vectors, they are normalized
+        :param n_lists: number of inverted lists, square root of the number of vectors if None
+        :param n_iter: k-means iterations
+        :param training_size_per_list: centroids are trained on a sample of this many vectors per list
+        :param seed: seed of the sampling, equal seeds build equal indexes
+        """
+        vectors = normalize_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        rng = np.random.default_rng(seed)
+        n_lists = min(len(vectors), n_lists or max(1, int(np.sqrt(len(vectors)))))
+        if n_lists == 0:
+            self.centroids = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            assignment = np.zeros(0, dtype=np.intp)
+        else:
+            training = vectors
+            if len(vectors) > n_lists * training_size_per_list:
+                training = vectors[rng.choice(len(vectors), n_lists * training_size_per_list, replace=False)]
+            self.centroids = spherical_kmeans(training, n_lists, n_iter, rng)
+            assignment = nearest_centroids(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        self.ids = order.astype(np.int32)
+        self.offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        self.codes, self.scales = quantize(vectors[order])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes + self.ids.nbytes + self.centroids.nbytes
+
+    def search(self, query, k: int, n_probe: int = 8) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the approximately most similar vectors
+        :param query: query vector
+        :param k: maximal number of results
+        :param n_probe: number of inverted lists that are scanned, more lists find more of the exact neighbours
+        :return: tuple of ids and cosine similarities, ordered by descending similarity
+        """
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        n_probe = min(n_probe, len(self.centroids))
+        if n_probe == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        lists = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        scores = (self.codes[rows].astype(np.float32) @ query) * self.scales[rows]
+        k = min(k, len(rows))
+        if k == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return self.ids[rows[best]], scores[best]
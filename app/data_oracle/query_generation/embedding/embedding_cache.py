@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+# sqlite limits the number of parameters of a statement
+LOOKUP_CHUNK_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Persistent store of embeddings keyed by model id and text in a local sqlite file. Vectors are stored as float32
+    blobs, so the cache survives rescans and restarts and is shared by all processes on the host
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        :param path: path of the sqlite file, parent directories are created
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (model_id TEXT NOT NULL, text TEXT NOT NULL, "
+                         "vector BLOB NOT NULL, PRIMARY KEY (model_id, text)) WITHOUT ROWID")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.append(conn)
+                self._local.generation = self._generation
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model_id: str, texts: Sequence[str]) -> dict[str, np.ndarray]:
+        """
+        Looks up the embeddings of texts
+        :param model_id: id of the model that computed the embeddings
+        :param texts: distinct texts
+        :return: dict of text to embedding for all texts found in the cache
+        """
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(texts), LOOKUP_CHUNK_SIZE):
+            chunk = texts[start:start + LOOKUP_CHUNK_SIZE]
+            rows = conn.execute(f"SELECT text, vector FROM embeddings WHERE model_id = ? AND text IN "
+                                f"({','.join('?' * len(chunk))})", (model_id, *chunk))
+            for text, vector in rows:
+                found[text] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def set_many(self, model_id: str, embeddings: dict[str, np.ndarray]) -> None:
+        """
+        Stores embeddings, existing entries are replaced
+        :param model_id: id of the model that computed the embeddings
+        :param embeddings: dict of text to embedding
+        :return: None
+        """
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (model_id, text, vector) VALUES (?, ?, ?)",
+                             [(model_id, text, np.asarray(vector, dtype=np.float32).tobytes())
+                              for text, vector in embeddings.items()])
+
+    def clear(self, model_id: str | None = None) -> int:
+        """
+        Removes the embeddings of one model or of all models
+        :param model_id: model whose embeddings are removed, all if None
+        :return: number of removed embeddings
+        """
+        with self._connection() as conn:
+            if model_id is None:
+                return conn.execute("DELETE FROM embeddings").rowcount
+            return conn.execute("DELETE FROM embeddings WHERE model_id = ?", (model_id,)).rowcount
+
+    def close(self) -> None:
+        """
+        Closes the connections of all threads, the cache opens new ones when it is used again
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+class CachedEmbedder:
+    """
+    Wraps a batch embedding model. Texts are deduplicated and looked up in the cache first, only texts that were
+    never embedded by the model are passed to it. Instances are batch callbacks for
+    Database.apply_batch_embedding_model
+    """
+
+    def __init__(self,
+                 batch_callback: Callable[[list[str]], Sequence],
+                 model_id: str,
+                 cache: EmbeddingCache | None = None):
+        """
+        :param batch_callback: computes the embeddings of a list of texts, returns one vector per text
+        :param model_id: id of the model, part of the cache key so different models never share embeddings
+        :param cache: persistent cache, embeddings are only kept for the lifetime of this object if None
+        """
+        self.batch_callback = batch_callback
+        self.model_id = model_id
+        self.cache = cache
+        self._memory: dict[str, np.ndarray] = {}
+        self.computed = 0
+        self.cache_hits = 0
+
+    def __call__(self, texts: Sequence[str]) -> list[np.ndarray]:
+        """
+        Returns the embeddings of texts as one dimensional float32 vectors
+        :param texts: texts, duplicates are only embedded once
+        :return: list of vectors in the order of texts
+        """
+        distinct = list(dict.fromkeys(texts))
+        embeddings = {text: self._memory[text] for text in distinct if text in self._memory}
+        missing = [text for text in distinct if text not in embeddings]
+        if missing and self.cache is not None:
+            cached = self.cache.get_many(self.model_id, missing)
+            embeddings.update(cached)
+            missing = [text for text in missing if text not in cached]
+        self.cache_hits += len(distinct) - len(missing)
+        if missing:
+            vectors = self.batch_callback(missing)
+            if len(vectors) != len(missing):
+                raise ValueError(f"The embedding model returned {len(vectors)} embeddings for {len(missing)} texts")
+            computed = {text: np.asarray(vector, dtype=np.float32).reshape(-1) for text, vector in
+                        zip(missing, vectors)}
+            self.computed += len(computed)
+            if self.cache is not None:
+                self.cache.set_many(self.model_id, computed)
+            embeddings.update(computed)
+        self._memory.update(embeddings)
+        return [embeddings[text] for text in texts]
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Returns the embedding of a single text, usable as callback of Database.apply_embedding_model
+        """
+        return self([text])[0]
@@ -0,0 +1,90 @@
+import numpy as np
+
+from .ann_index import QuantizedIVFIndex
+from ...db_schema import Database, Schema, Table
+
+
+class SchemaIndex:
+    """
+    Retrieves the tables most relevant to a question. The embeddings of all tables and columns of a database are kept
+    in an approximate nearest neighbour index, a table is as relevant as its most similar element. Elements sharing
+    an embedding object, e.g. equal column names embedded by a CachedEmbedder, are indexed once
+    """
+
+    def __init__(self, db: Database, n_lists: int | None = None, seed: int = 0):
+        """
+        :param db: database whose schemas, tables and columns are embedded
+        :param n_lists: number of inverted lists of the index, see QuantizedIVFIndex
+        :param seed: seed of the index
+        """
+        self.embedding_matrix = db.embedding_matrix
+        self.tables: list[tuple[Schema, Table]] = []
+        # owner table of every row of the embedding matrix, schemas have no owner
+        owners = [-1] * len(db.schemas)
+        for schema in db.schemas:
+            first_table = len(self.tables)
+            self.tables.extend((schema, table) for table in schema.tables)
+            owners.extend(range(first_table, len(self.tables)))
+            for table_index, table in enumerate(schema.tables, first_table):
+                owners.extend([table_index] * len(table.columns))
+
+        vector_ids = {}
+        rows, postings = [], []
+        for row, (element, owner) in enumerate(zip(self.embedding_matrix.elements, owners)):
+            if owner < 0 or element.embedding is None:
+                continue
+            vector_id = vector_ids.setdefault(id(element.embedding), len(vector_ids))
+            if vector_id == len(rows):
+                rows.append(row)
+            postings.append((vector_id, owner))
+        postings.sort()
+        # tables of vector i are posting_tables[posting_offsets[i]:posting_offsets[i + 1]]
+        self.posting_tables = np.asarray([owner for _, owner in postings], dtype=np.int32)
+        self.posting_offsets = np.searchsorted(np.asarray([vector_id for vector_id, _ in postings], dtype=np.int32),
+                                               np.arange(len(rows) + 1))
+        self.vector_rows = np.asarray(rows, dtype=np.intp)  # row of every distinct vector in the embedding matrix
+        self.index = QuantizedIVFIndex(self.embedding_matrix.matrix[self.vector_rows], n_lists=n_lists, seed=seed)
+
+    def is_current(self, db: Database) -> bool:
+        """
+        Returns whether the index was built from the current embeddings of a database
+        """
+        return db.embedding_matrix is self.embedding_matrix
+
+    def table_scores(self, question_embedding) -> np.ndarray:
+        """
+        Scores every table exactly, without the approximation of the index
+        :param question_embedding: embedding of the question
+        :return: similarity of every table in the order of self.tables, -1 for tables without embeddings
+        """
+        scores = np.full(len(self.tables), -1.0, dtype=np.float32)
+        similarities = self.embedding_matrix.similarities(question_embedding)[self.vector_rows]
+        np.maximum.at(scores, self.posting_tables, np.repeat(similarities, np.diff(self.posting_offsets)))
+        return scores
+
+    def search(self, question_embedding, k: int, n_probe: int = 8, candidates_per_table: int = 4,
+               allowed=None) -> list[tuple[Schema, Table, float]]:
+        """
+        Returns the tables most similar to a question
+        :param question_embedding: embedding of the question
+        :param k: maximal number of tables
+        :param n_probe: inverted lists scanned by the index
+        :param candidates_per_table: embeddings retrieved per requested table, several of them may belong to the
+        same table
+        :param allowed: ids of the tables that may be returned, all tables if None
+        :return: list of schema, table and similarity ordered by descending similarity
+        """
+        vector_ids, scores = self.index.search(question_embedding, k * candidates_per_table, n_probe)
+        found = {}
+        for vector_id, score in zip(vector_ids.tolist(), scores.tolist()):
+            start, end = self.posting_offsets[vector_id], self.posting_offsets[vector_id + 1]
+            for owner in self.posting_tables[start:end].tolist():
+                if owner in found:
+                    continue
+                schema, table = self.tables[owner]
+                if allowed is not None and id(table) not in allowed:
+                    continue
+                found[owner] = (schema, table, score)
+                if len(found) == k:
+                    return list(found.values())
+        return list(found.values())
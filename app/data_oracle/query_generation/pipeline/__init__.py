@@ -1 +1,2 @@
-from .basepipeline import *
\ No newline at end of file
+from .basepipeline import *
+from .prompt_budget import TableSelection, estimate_tokens, select_tables
@@ -1,8 +1,11 @@
+import asyncio
 from typing import NamedTuple, Dict
 
+from .prompt_budget import TableSelection, estimate_tokens, lexical_table_scores, select_tables
 from .prompts import Intro_Prompt
-from ...connectors import BaseDBConnector
-from ...db_schema import Table, Database, translate_sql_args
+from ..embedding import SchemaIndex
+from ...connectors import BaseDBConnector, AsyncSqlAlchemyConnector
+from ...db_schema import Table, Database, translation_cache
 from ...enums import Prompt_Type
 
 
@@ -14,24 +17,115 @@ class Example(NamedTuple):
 
 class PipelineSqlGen:
 
-    def __init__(self, _connection: BaseDBConnector, scan_enums: bool = False, cached_schema: str | None = None):
+    def __init__(self,
+                 _connection: BaseDBConnector | AsyncSqlAlchemyConnector,
+                 scan_enums: bool = False,
+                 cached_schema: str | None = None,
+                 lazy: bool = False):
+        """
+        @param _connection: connector to the database, blocking calls are not available with an async connector
+        @param scan_enums: Param to manually scan entries to find potential enum values
+        @param cached_schema: cached layout of the database, if provided the database is not scanned
+        @param lazy: if true the database layout is only loaded on first access of self.db, which allows to
+        execute plain sql statements without reflecting the whole database
+        """
         self.connection = _connection
-        if cached_schema == None:
-            self.db = _connection.scan_db(scan_enums)
-        else:
-            self.db = self.connection.return_cached_db(cached_schema)
+        self.scan_enums = scan_enums
+        self.cached_schema = cached_schema
+        self._db: Database | None = None
+        self._db_loaded = False
+        if not lazy:
+            self.load_database()
         self.custom_prompt = None
+        self.embedding_model = None
+        self.dynamic_table_count = 10
+        self._schema_index: SchemaIndex | None = None
 
-    def reload_database(self) -> None:
+    def load_database(self) -> Database:
+        """
+        Loads the database layout either from the cached schema or by scanning the database
+        @return: loaded database layout
+        """
+        if self.cached_schema is None:
+            self.db = self._sync_connection("aload_database").scan_db(self.scan_enums)
+        else:
+            self.db = self.connection.return_cached_db(self.cached_schema)
+        return self._db
+
+    async def aload_database(self) -> Database:
+        """
+        Loads the database layout without blocking the event loop. Async connectors are awaited directly, all other
+        connectors are scanned in a worker thread
+        @return: loaded database layout
+        """
+        if self.cached_schema is None and self.connection.is_async:
+            self.db = await self.connection.ascan_db(self.scan_enums)
+            return self._db
+        return await asyncio.to_thread(self.load_database)
+
+    @property
+    def db(self) -> Database:
+        if not self._db_loaded:
+            self.load_database()
+        return self._db
+
+    @db.setter
+    def db(self, _db: Database) -> None:
+        self._db = _db
+        self._db_loaded = True
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Returns whether the database layout has already been loaded
+        @return: Boolean
+        """
+        return self._db_loaded
+
+    def _sync_connection(self, async_variant: str) -> BaseDBConnector:
+        """
+        Returns the connector for blocking calls, async connectors only offer awaitable methods
+        @param async_variant: method of the pipeline to use instead with an async connector
+        @return: connector
+        """
+        if getattr(self.connection, "is_async", False):
+            raise TypeError(f"The connector of this pipeline is async, use {async_variant}() instead")
+        return self.connection
+
+    def reload_database(self, incremental: bool = True) -> None:
         """
         Reloads database layout and copies over all relevant filters
+        @param incremental: only reflect tables whose catalog fingerprint changed, all other tables are kept together
+        with their filters and embeddings. If false the whole database is scanned again
+        @return: None
+        """
+        connection = self._sync_connection("areload_database")
+        if incremental:
+            self.db = connection.refresh_db(self.db, self.scan_enums)
+            return
+        self._replace_database(connection.scan_db())
+
+    async def areload_database(self, incremental: bool = True) -> None:
+        """
+        Reloads the database layout without blocking the event loop, see reload_database
+        @param incremental: only reflect tables whose catalog fingerprint changed
         @return: None
         """
+        if not self.connection.is_async:
+            await asyncio.to_thread(self.reload_database, incremental)
+            return
+        if not self._db_loaded:
+            await self.aload_database()
+        if incremental:
+            self.db = await self.connection.arefresh_db(self._db, self.scan_enums)
+            return
+        self._replace_database(await self.connection.ascan_db())
+
+    def _replace_database(self, new_db: Database) -> None:
         filter_list = self.db.filter_list
         filter_active = self.db.filter_active
         ### TODO get all filters from table columns and apply them on reload
 
-        new_db = self.connection.scan_db()
         new_db.filter_list = filter_list
         new_db.filter_active = filter_active
         for schema in new_db.schemas:
@@ -129,14 +223,92 @@ class PipelineSqlGen:
         """
         return self.db.return_code_repr_schema_normalized() if normalized_names else self.db.return_code_repr_schema()
 
-    def normalize_query(self, sql_command: str) -> str:
+    def apply_embedding_model(self, batch_callback, batch_size: int = 256) -> None:
+        """
+        Embeds all schemas, tables and columns and keeps the model to embed questions for Prompt_Type.DYNAMIC
+        :param batch_callback: callback which calculates the embeddings of a list of texts, e.g. a CachedEmbedder
+        :param batch_size: maximal number of names per call of the callback
+        :return: None
+        """
+        self.db.apply_batch_embedding_model(batch_callback, batch_size)
+        self.embedding_model = batch_callback
+
+    @property
+    def schema_index(self) -> SchemaIndex:
+        """
+        Returns the nearest neighbour index over the table and column embeddings, it is rebuilt when the database or
+        its embeddings changed
+        """
+        if self._schema_index is None or not self._schema_index.is_current(self.db):
+            self._schema_index = SchemaIndex(self.db)
+        return self._schema_index
+
+    def return_dynamic_db_prompt(self, question: str, table_count: int | None = None,
+                                 normalized_names: bool = True) -> str:
+        """
+        Returns a database schema containing only the tables most relevant to a question
+        :param question: natural language question
+        :param table_count: maximal number of tables, dynamic_table_count if None
+        :param normalized_names: if true normalizes schema names to adhere to naming standards
+        :return: create schema and create table statements of the relevant tables
+        """
+        if self.embedding_model is None:
+            raise ValueError("Dynamic prompts need an embedding model, call apply_embedding_model() first")
+        db = self.db
+        allowed = None
+        if db.filter_active or any(schema.filter_active for schema in db.schemas):
+            allowed = {id(table) for schema in db.get_schemas() for table in schema.get_tables()}
+        question_embedding = self.embedding_model([question])[0]
+        relevant = self.schema_index.search(question_embedding, table_count or self.dynamic_table_count,
+                                            allowed=allowed)
+        relevant_schemas = {id(schema) for schema, _, _ in relevant}
+        create_schemas = "\n".join(schema.code_representation_str(normalized_names) for schema in db.schemas
+                                   if id(schema) in relevant_schemas)
+        return create_schemas + "\n\n" + "\n\n".join(
+            [table.render_ddl(schema.name, schema.proper_name)[1 if normalized_names else 0]
+             for schema, table, _ in relevant])
+
+    def return_budgeted_db_prompt(self, question: str, token_budget: int,
+                                  normalized_names: bool = True) -> TableSelection:
+        """
+        Returns a database schema of the tables most relevant to a question that fits into a token budget, tables
+        joinable with relevant tables by foreign keys are kept next. Tables are scored by their embeddings if an
+        embedding model is set and by the words their names share with the question otherwise
+        :param question: natural language question
+        :param token_budget: maximal number of estimated tokens of the schema
+        :param normalized_names: if true normalizes schema names to adhere to naming standards
+        :return: selected statements with the names of the selected and dropped tables
+        """
+        tables = [(schema, table) for schema in self.db.get_schemas() for table in schema.get_tables()]
+        if self.embedding_model is None:
+            scores = lexical_table_scores(question, tables)
+        else:
+            index = self.schema_index
+            positions = {id(table): i for i, (_, table) in enumerate(index.tables)}
+            table_scores = index.table_scores(self.embedding_model([question])[0])
+            # cosine similarities are shifted to [0, 1], priorities passed along foreign keys must not be negative
+            scores = (table_scores[[positions[id(table)] for _, table in tables]] + 1) / 2
+        return select_tables(tables, scores, max(token_budget, 0), normalized_names)
+
+    def translations(self) -> tuple[dict, str]:
+        """
+        Returns the translations map of the database together with its version, both are kept by the translation
+        index of the database and updated when filters change
+        @return: tuple of translations map and version
+        """
+        translation_index = self.db.translation_index
+        return translation_index.translations_map, translation_index.version
+
+    def normalize_query(self, sql_command: str, optimize_query: bool = True) -> str:
         """
         Takes in a sql command for a normalized schema and translates it to the unnormalized schema
         :param sql_command: sql command as a string
+        :param optimize_query: run the sqlglot optimizer before translating, without it the query keeps its structure
         :return: sql query with unnormalized names
         """
-        layout_translation_map = self.db.translations_map
-        return translate_sql_args(sql_command, layout_translation_map, self.connection.type)
+        layout_translation_map, version = self.translations()
+        return translation_cache.translate(sql_command, layout_translation_map, self.connection.type, version,
+                                           optimize_query)
 
     def execute_sql_statement(self, sql_command: str, number_rows: int, autocommit=False) -> list:
         """
@@ -146,27 +318,86 @@ class PipelineSqlGen:
         :param autocommit: whether to commit changes after execution
         :return: rows as a list of objects
         """
-        return self.connection.execute_sql_statement(sql_command, number_rows, autocommit)
+        connection = self._sync_connection("aexecute_sql_statement")
+        return connection.execute_sql_statement(sql_command, number_rows, autocommit)
 
-    def generate_prompt(self, question: str, prompting_mode: Prompt_Type):
-        prompt = ""
-        prompt += Intro_Prompt
+    def stream_sql_statement(self, sql_command: str, number_rows: int, autocommit=False, chunk_size: int = 1000,
+                             convert_values: bool = True):
+        """
+        Executes a sql statement against the database and yields the column names followed by chunks of rows
+        :param sql_command: sql command as a string
+        :param number_rows: maximum number of rows to return
+        :param autocommit: whether to commit changes after execution
+        :param chunk_size: maximum number of rows per chunk
+        :param convert_values: whether to convert the values to primitive types
+        :return: generator of the column names and chunks of rows
+        """
+        if self.connection.is_async:
+            return self.connection.astream_sql_statement(sql_command, number_rows, autocommit, chunk_size,
+                                                         convert_values)
+        return self.connection.stream_sql_statement(sql_command, number_rows, autocommit, chunk_size, convert_values)
+
+    async def aexecute_sql_statement(self, sql_command: str, number_rows: int, autocommit=False) -> list:
+        """
+        Executes a sql statement without blocking the event loop, see execute_sql_statement
+        :param sql_command: sql command as a string
+        :param number_rows: maximum number of rows to return
+        :param autocommit: whether to commit changes after execution
+        :return: rows as a list of objects
+        """
+        if self.connection.is_async:
+            return await self.connection.aexecute_sql_statement(sql_command, number_rows, autocommit)
+        return await asyncio.to_thread(self.connection.execute_sql_statement, sql_command, number_rows, autocommit)
+
+    def _prompt_intro(self, prompting_mode: Prompt_Type) -> str:
+        prompt = Intro_Prompt
         if prompting_mode == Prompt_Type.CUSTOM:
             if self.custom_prompt is None:
                 raise ValueError(f'If you want to use custom examples you need to set a custom prompt first with'
                                  f'set_examples()')
             prompt += self.custom_prompt
-        elif prompting_mode == Prompt_Type.DYNAMIC:
-            raise NotImplementedError("Not yet implemented")
-
         elif prompting_mode == Prompt_Type.FEW_SHOT:
             raise NotImplementedError("Not yet implemented")
+        return prompt
 
-        elif prompting_mode == Prompt_Type.ZERO_SHOT:
-            pass
-
-        prompt += f'Database:\n{self.return_db_prompt()}\n'
+    @staticmethod
+    def _complete_prompt(intro: str, database_prompt: str, question: str) -> str:
+        prompt = intro
+        prompt += f'Database:\n{database_prompt}\n'
         prompt += f'Question: {question} \n'
         prompt += f'Answer: SELECT '
-
         return prompt
+
+    def generate_prompt(self, question: str, prompting_mode: Prompt_Type, token_budget: int | None = None) -> str:
+        """
+        Generates the prompt for a question
+        @param question: natural language question
+        @param prompting_mode: kind of prompt
+        @param token_budget: maximal number of estimated tokens of the prompt, the database schema is reduced to the
+        most relevant tables if set, see generate_budgeted_prompt
+        @return: prompt
+        """
+        if token_budget is not None:
+            return self.generate_budgeted_prompt(question, prompting_mode, token_budget)[0]
+        intro = self._prompt_intro(prompting_mode)
+        if prompting_mode == Prompt_Type.DYNAMIC:
+            database_prompt = self.return_dynamic_db_prompt(question)
+        else:
+            database_prompt = self.return_db_prompt()
+        return self._complete_prompt(intro, database_prompt, question)
+
+    def generate_budgeted_prompt(self, question: str, prompting_mode: Prompt_Type,
+                                 token_budget: int) -> tuple[str, TableSelection]:
+        """
+        Generates a prompt within a token budget, the database schema fills the budget left by the rest of the prompt
+        @param question: natural language question
+        @param prompting_mode: kind of prompt
+        @param token_budget: maximal number of estimated tokens of the prompt
+        @return: tuple of prompt and the selection of tables, which reports the dropped tables
+        """
+        if prompting_mode == Prompt_Type.DYNAMIC and self.embedding_model is None:
+            raise ValueError("Dynamic prompts need an embedding model, call apply_embedding_model() first")
+        intro = self._prompt_intro(prompting_mode)
+        frame_tokens = estimate_tokens(self._complete_prompt(intro, "", question))
+        selection = self.return_budgeted_db_prompt(question, token_budget - frame_tokens)
+        return self._complete_prompt(intro, selection.prompt, question), selection
@@ -0,0 +1,147 @@
+import heapq
+import re
+from typing import Callable, NamedTuple, Sequence
+
+import numpy as np
+
+from ...db_schema import Schema, Table
+
+# subword tokenizers split identifiers into pieces of about four characters and emit punctuation on its own, so
+# counting these pieces slightly overestimates the tokens of DDL and keeps prompts within budget
+TOKEN_PATTERN = re.compile(r"[^\W_]{1,4}|[^\w\s]|_")
+WORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# no table statement is shorter than this, filling stops once less budget is left
+MIN_TABLE_TOKENS = 8
+
+
+class TableSelection(NamedTuple):
+    prompt: str  # create schema and create table statements of the selected tables
+    tables: list[str]  # schema qualified names of the selected tables in prompt order
+    dropped: list[str]  # schema qualified names of the tables left out, most relevant first
+    tokens: int  # estimated tokens of the prompt
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text without a model specific tokenizer
+    :param text: text, e.g. a create table statement
+    :return: estimated number of tokens
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def name_words(name: str) -> set[str]:
+    """
+    Splits a name into lower case words at separators and camel case boundaries, plural endings are removed
+    :param name: question, table or column name
+    :return: set of words
+    """
+    words = set()
+    for word in WORD_PATTERN.findall(name):
+        word = word.lower()
+        words.add(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word)
+    return words
+
+
+def lexical_table_scores(question: str, tables: Sequence[tuple[Schema, Table]]) -> np.ndarray:
+    """
+    Scores tables by the words their names and column names share with a question, used if no embedding model is set
+    :param question: natural language question
+    :param tables: list of schema and table
+    :return: score of every table in [0, 1]
+    """
+    question_words = name_words(question)
+    scores = np.zeros(len(tables), dtype=np.float32)
+    if not question_words:
+        return scores
+    for i, (_, table) in enumerate(tables):
+        table_hits = question_words & name_words(table.name)
+        column_hits = set()
+        for column in table.get_cols():
+            column_hits |= question_words & name_words(column.name)
+        # a word naming the table counts twice as much as a word naming one of its columns
+        scores[i] = (2 * len(table_hits) + len(column_hits - table_hits)) / (2 * len(question_words))
+    return np.minimum(scores, 1)
+
+
+def foreign_key_graph(tables: Sequence[tuple[Schema, Table]]) -> list[list[int]]:
+    """
+    Returns the tables joinable with each table by a foreign key, in either direction
+    :param tables: list of schema and table
+    :return: list of neighbour positions per table, references to tables outside of tables are ignored
+    """
+    positions = {(schema.name, table.name): i for i, (schema, table) in enumerate(tables)}
+    neighbours = [set() for _ in tables]
+    for i, (schema, table) in enumerate(tables):
+        for relation in table.fk_relations:
+            j = positions.get((relation.referred_schema or schema.name, relation.referred_table))
+            if j is not None and j != i:
+                neighbours[i].add(j)
+                neighbours[j].add(i)
+    return [sorted(x) for x in neighbours]
+
+
+def select_tables(tables: Sequence[tuple[Schema, Table]],
+                  scores: Sequence[float],
+                  token_budget: int,
+                  normalized_names: bool = True,
+                  neighbour_weight: float = 0.8,
+                  max_misses: int = 32,
+                  estimate: Callable[[str], int] = estimate_tokens) -> TableSelection:
+    """
+    Fills a token budget with the create table statements of the most relevant tables. Tables are taken by
+    descending priority, which starts at their score. Whenever a table is taken its foreign key neighbours are raised
+    to neighbour_weight times its priority, so tables needed to join a relevant table follow it before less relevant
+    tables. Tables that do not fit into the remaining budget are skipped and smaller ones are tried, until max_misses
+    tables in a row did not fit, so a nearly full budget does not render every table of a large database
+    :param tables: list of schema and table
+    :param scores: non-negative relevance of every table
+    :param token_budget: maximal number of estimated tokens of the returned statements
+    :param normalized_names: if true normalizes schema names to adhere to naming standards
+    :param neighbour_weight: share of the priority of a table passed to its neighbours
+    :param max_misses: number of tables in a row that may not fit before filling stops
+    :param estimate: token estimate of a text
+    :return: selected statements with the names of the selected and dropped tables
+    """
+    priority = [float(x) for x in scores]
+    graph = foreign_key_graph(tables)
+    heap = [(-p, i) for i, p in enumerate(priority)]
+    heapq.heapify(heap)
+    selected, taken = [], set()
+    schema_statements = {}
+    used = misses = 0
+    while heap and token_budget - used >= MIN_TABLE_TOKENS and misses < max_misses:
+        negative_priority, i = heapq.heappop(heap)
+        if i in taken or -negative_priority < priority[i]:
+            continue  # stale entry of a table whose priority was raised
+        taken.add(i)
+        schema, table = tables[i]
+        statement = table.render_ddl(schema.name, schema.proper_name)[1 if normalized_names else 0]
+        cost = estimate(statement)
+        if id(schema) not in schema_statements:
+            schema_statement = schema.code_representation_str(normalized_names)
+            cost += estimate(schema_statement)
+        else:
+            schema_statement = None
+        if used + cost > token_budget:
+            misses += 1
+            continue
+        used += cost
+        misses = 0
+        selected.append((i, statement))
+        if schema_statement is not None:
+            schema_statements[id(schema)] = schema_statement
+        for j in graph[i]:
+            if j not in taken and neighbour_weight * priority[i] > priority[j]:
+                priority[j] = neighbour_weight * priority[i]
+                heapq.heappush(heap, (-priority[j], j))
+
+    selected_positions = {i for i, _ in selected}
+    dropped = sorted((i for i in range(len(tables)) if i not in selected_positions), key=lambda x: -priority[x])
+    create_schemas = "\n".join(statement for statement in dict.fromkeys(
+        schema_statements[id(tables[i][0])] for i, _ in selected))
+    prompt = create_schemas + "\n\n" + "\n\n".join(statement for _, statement in selected) if selected else ""
+    return TableSelection(prompt=prompt,
+                          tables=[f"{tables[i][0].name}.{tables[i][1].name}" for i, _ in selected],
+                          dropped=[f"{tables[i][0].name}.{tables[i][1].name}" for i in dropped],
+                          tokens=used)
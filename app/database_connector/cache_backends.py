@@ -0,0 +1,248 @@
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC
+from pathlib import Path
+
+from app.globals import SHARED_CACHE_BACKEND, SHARED_CACHE_SQLITE_PATH, SHARED_CACHE_REDIS_HOST, \
+    SHARED_CACHE_REDIS_PORT, SHARED_CACHE_REDIS_DB, SHARED_CACHE_REDIS_PASSWORD, SHARED_CACHE_NAMESPACE
+
+
+class SharedCacheBackend(ABC):
+    """
+    Key value store shared by all workers of a deployment. Values are raw bytes, serialization is up to the caller.
+    """
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Returns the value stored for key or None if it does not exist or expired
+        """
+        pass
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """
+        Stores value under key for ttl seconds
+        """
+        pass
+
+    def delete(self, key: str) -> bool:
+        """
+        Removes key, returns whether it existed
+        """
+        pass
+
+    def clear(self) -> int:
+        """
+        Removes all keys of this cache, returns number of removed keys
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Releases all resources held by the backend
+        """
+        pass
+
+
+class SqliteCacheBackend(SharedCacheBackend):
+    """
+    Shared cache stored in a local sqlite file. Works across all worker processes on the same host and survives
+    restarts of the server.
+    """
+
+    def __init__(self, path: str | Path = SHARED_CACHE_SQLITE_PATH, cleanup_interval: int = 100):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cleanup_interval = cleanup_interval
+        self._writes = 0
+        self._local = threading.local()
+        # connections of all threads, so close can release the ones opened by worker threads
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries "
+                         "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the sqlite connection of the current thread
+        @return: sqlite connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            # close runs on another thread than the workers that opened the connections
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.append(conn)
+                self._local.generation = self._generation
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        row = self._connection().execute("SELECT value, expires_at FROM cache_entries WHERE key = ?",
+                                         (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, time.time() + ttl))
+            self._writes += 1
+            if self._writes % self.cleanup_interval == 0:
+                conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str) -> bool:
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+
+    def clear(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM cache_entries").rowcount
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # connections of other threads are closed, so every thread opens a new one on its next use
+            self._generation += 1
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    """
+    Shared cache stored in any server speaking the redis protocol (RESP), e.g. Redis, Valkey or KeyDB.
+    Keys are prefixed with a namespace so clear only removes entries of this application.
+    """
+
+    def __init__(self,
+                 host: str = SHARED_CACHE_REDIS_HOST,
+                 port: int = SHARED_CACHE_REDIS_PORT,
+                 db: int = SHARED_CACHE_REDIS_DB,
+                 password: str | None = SHARED_CACHE_REDIS_PASSWORD,
+                 namespace: str = SHARED_CACHE_NAMESPACE,
+                 timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.namespace = namespace
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._send_command("AUTH", self.password)
+        if self.db:
+            self._send_command("SELECT", str(self.db))
+
+    def _send_command(self, *args: str | bytes):
+        """
+        Sends a single command and returns the parsed reply. Caller must hold the lock
+        """
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            arg = arg.encode() if isinstance(arg, str) else arg
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection to cache server closed")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode()
+        if prefix == b"-":
+            raise Exception(f"Cache server error: {payload.decode()}")
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise Exception(f"Unknown reply from cache server: {line!r}")
+
+    def _execute(self, *args: str | bytes):
+        """
+        Executes a command, reconnecting once if the connection was lost
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send_command(*args)
+                except (ConnectionError, OSError):
+                    self._close_socket()
+                    if attempt == 1:
+                        raise
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> bytes | None:
+        return self._execute("GET", self._key(key))
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._execute("SET", self._key(key), value, "PX", str(max(1, int(ttl * 1000))))
+
+    def delete(self, key: str) -> bool:
+        return self._execute("DEL", self._key(key)) > 0
+
+    def clear(self) -> int:
+        removed = 0
+        cursor = "0"
+        while True:
+            cursor, keys = self._execute("SCAN", cursor, "MATCH", f"{self.namespace}:*", "COUNT", "500")
+            cursor = cursor.decode()
+            if keys:
+                removed += self._execute("DEL", *keys)
+            if cursor == "0":
+                return removed
+
+    def _close_socket(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_socket()
+
+
+def create_shared_cache_backend(backend_type: str = SHARED_CACHE_BACKEND) -> SharedCacheBackend | None:
+    """
+    Creates the shared cache backend configured for this deployment
+    @backend_type: one of sqlite, redis or none
+    Return: backend or None if the shared cache is disabled
+    """
+    if backend_type == "sqlite":
+        return SqliteCacheBackend()
+    elif backend_type == "redis":
+        return RedisCacheBackend()
+    elif backend_type == "none":
+        return None
+    raise ValueError(f"Unknown shared cache backend {backend_type}")
@@ -1,9 +1,19 @@
+import asyncio
+from typing import AsyncIterator
+
 from fastapi import HTTPException
 
 from app.data_oracle import RedshiftConnector, RedshiftConnection, ConnectionDetails, \
-    SqlAlchemyConnector, BigQueryConnection, BigQueryConnector,FileConnection
+    SqlAlchemyConnector, BigQueryConnection, BigQueryConnector,FileConnection, Database, AsyncSqlAlchemyConnector, \
+    supports_async_engine
 from app.data_oracle.query_generation import PipelineSqlGen
+from app.database_connector.engine_registry import engine_registry
+from app.database_connector.executors import executor_pool
+from app.database_connector.fingerprint import connection_fingerprint
+from app.database_connector.result_cache import result_cache
+from app.database_connector.schema_cache import schema_cache
 from app.fastapitypes.sql_connection import Db_Connection_Args
+from app.globals import ASYNC_SQLALCHEMY, REFLECTION_WORKERS, REFLECTION_BATCH_SIZE, STREAM_CHUNK_SIZE
 
 
 def get_sqlalchemy_connection(sql_args: ConnectionDetails) -> SqlAlchemyConnector:
@@ -13,8 +23,9 @@ def get_sqlalchemy_connection(sql_args: ConnectionDetails) -> SqlAlchemyConnecto
     Return: connection object for sqlalchemy db
     """
     if sql_args.ssl:
-        sql_args.ssl_credentials = '/etc/ssl/certs/ca-certificates.crt'
-    return SqlAlchemyConnector(sql_args)
+        # copy instead of mutating so the connection fingerprint of the request args stays stable
+        sql_args = sql_args.model_copy(update={"ssl_credentials": '/etc/ssl/certs/ca-certificates.crt'})
+    return SqlAlchemyConnector(sql_args, engine_registry.get_engine(sql_args))
 
 
 def get_redshift_connection(redshift_args: RedshiftConnection) -> RedshiftConnector:
@@ -39,12 +50,16 @@ def get_file_connection(file_args: FileConnection) -> SqlAlchemyConnector:
     @file_args: holds all necessary args for connection
     Return: connection object for file db
     """
-    return SqlAlchemyConnector(file_args)
+    return SqlAlchemyConnector(file_args, engine_registry.get_engine(file_args))
 
-async def get_db_pipeline(db_con_args: Db_Connection_Args, cached_schema: str | None = None) -> PipelineSqlGen:
+def build_db_pipeline(db_con_args: Db_Connection_Args,
+                      cached_schema: str | None = None,
+                      lazy: bool = False) -> PipelineSqlGen:
     """
-    Returns a PipelineSqlGen object.
+    Returns a PipelineSqlGen object. Blocks while connecting to and scanning the db.
     @db_con_args: holds all necessary args for connection
+    @cached_schema: cached layout of the db, skips scanning the db if provided
+    @lazy: only load the db layout once it is accessed, e.g. by normalize_query or return_db_prompt
     Return: connection object for db
     """
     if isinstance(db_con_args, ConnectionDetails):
@@ -59,4 +74,167 @@ async def get_db_pipeline(db_con_args: Db_Connection_Args, cached_schema: str |
         # This should theoretically never happen if types are correctly defined
         raise HTTPException(status_code=400, detail="Unexpected connection type")
 
-    return PipelineSqlGen(db_connection, False, cached_schema)
+    db_connection.set_reflection_parallelism(REFLECTION_WORKERS, REFLECTION_BATCH_SIZE)
+    return PipelineSqlGen(db_connection, False, cached_schema, lazy=lazy)
+
+
+def get_async_sqlalchemy_connection(sql_args: ConnectionDetails | FileConnection) -> AsyncSqlAlchemyConnector:
+    """
+    Returns an AsyncSqlAlchemyConnector object.
+    @sql_args: holds all necessary args for connection
+    Return: async connection object for sqlalchemy db
+    """
+    if isinstance(sql_args, ConnectionDetails) and sql_args.ssl:
+        sql_args = sql_args.model_copy(update={"ssl_credentials": '/etc/ssl/certs/ca-certificates.crt'})
+    return AsyncSqlAlchemyConnector(sql_args, engine_registry.get_async_engine(sql_args))
+
+
+def use_async_connector(db_con_args: Db_Connection_Args) -> bool:
+    """
+    Returns whether requests against the db are served by an async connector
+    @db_con_args: holds all necessary args for connection
+    Return: Boolean
+    """
+    return ASYNC_SQLALCHEMY and supports_async_engine(db_con_args)
+
+
+async def get_db_pipeline(db_con_args: Db_Connection_Args,
+                          cached_schema: str | None = None,
+                          lazy: bool = False) -> PipelineSqlGen:
+    """
+    Returns a PipelineSqlGen object. Async connectors are awaited on the event loop, for all other connectors
+    connecting and scanning runs in the executor of the db.
+    @db_con_args: holds all necessary args for connection
+    @cached_schema: cached layout of the db, skips scanning the db if provided
+    @lazy: only load the db layout once it is accessed, e.g. by normalize_query or return_db_prompt
+    Return: connection object for db
+    """
+    if use_async_connector(db_con_args):
+        db_pipeline = PipelineSqlGen(get_async_sqlalchemy_connection(db_con_args), False, cached_schema, lazy=True)
+        if not lazy:
+            await db_pipeline.aload_database()
+        return db_pipeline
+    return await executor_pool.run(db_con_args, build_db_pipeline, db_con_args, cached_schema, lazy)
+
+
+async def run_on_db(db_con_args: Db_Connection_Args, fn, *args, **kwargs):
+    """
+    Runs a blocking call against a db, e.g. a query translation, in the executor of the db.
+    @db_con_args: holds all necessary args for connection
+    @fn: blocking callable
+    Return: result of fn
+    """
+    return await executor_pool.run(db_con_args, fn, *args, **kwargs)
+
+
+async def execute_on_db(db_con_args: Db_Connection_Args, db_pipeline: PipelineSqlGen, sql_command: str,
+                        number_rows: int, autocommit: bool = False) -> list:
+    """
+    Executes a sql statement, awaited directly for async connectors and in the executor of the db otherwise.
+    @db_con_args: holds all necessary args for connection
+    @db_pipeline: pipeline of the db
+    Return: rows as a list of objects
+    """
+    if db_pipeline.connection.is_async:
+        return await db_pipeline.aexecute_sql_statement(sql_command, number_rows, autocommit)
+    return await run_on_db(db_con_args, db_pipeline.execute_sql_statement, sql_command, number_rows, autocommit)
+
+
+async def execute_cached(db_con_args: Db_Connection_Args, db_pipeline: PipelineSqlGen | None, sql_command: str,
+                         number_rows: int, autocommit: bool = False) -> tuple[list, bool]:
+    """
+    Executes a sql statement like execute_on_db. If the result cache is enabled, results of read statements are
+    served from the cache and any other statement invalidates the cached results of the db.
+    @db_con_args: holds all necessary args for connection
+    @db_pipeline: pipeline of the db, created lazily if None and the result is not cached
+    Return: tuple of rows as a list of objects and whether they came from the cache
+    """
+    fingerprint = connection_fingerprint(db_con_args)
+    key = result_cache.key(db_con_args, sql_command, number_rows, autocommit)
+    if key is not None:
+        cached = result_cache.get(fingerprint, key)
+        if cached is not None:
+            return cached[0], True
+    generation = result_cache.generation(fingerprint)
+
+    if db_pipeline is None:
+        db_pipeline = await get_db_pipeline(db_con_args, lazy=True)
+    try:
+        result = await execute_on_db(db_con_args, db_pipeline, sql_command, number_rows, autocommit)
+    finally:
+        if key is None and result_cache.enabled:
+            result_cache.invalidate(fingerprint)
+    if key is not None:
+        result_cache.set(fingerprint, key, result, generation)
+    return result, False
+
+
+async def stream_on_db(db_con_args: Db_Connection_Args, db_pipeline: PipelineSqlGen, sql_command: str,
+                       number_rows: int, autocommit: bool = False,
+                       chunk_size: int = STREAM_CHUNK_SIZE, convert_values: bool = True) -> AsyncIterator[list]:
+    """
+    Executes a sql statement and yields the column names followed by chunks of rows as they are read from the cursor.
+    Every chunk of a blocking connector is fetched by its own call in the executor of the db, so no thread is held
+    while the response is sent.
+    @db_con_args: holds all necessary args for connection
+    @db_pipeline: pipeline of the db
+    @chunk_size: maximum number of rows per chunk
+    @convert_values: whether to convert the values to primitive types or keep the values of the database driver
+    Return: async generator of the column names and chunks of rows
+    """
+    chunks = db_pipeline.stream_sql_statement(sql_command, number_rows, autocommit, chunk_size, convert_values)
+    try:
+        if db_pipeline.connection.is_async:
+            async for chunk in chunks:
+                yield chunk
+            return
+
+        end = object()
+        try:
+            while (chunk := await run_on_db(db_con_args, next, chunks, end)) is not end:
+                yield chunk
+        finally:
+            # releases the cursor and connection if the client disconnects before the end of the result
+            await run_on_db(db_con_args, chunks.close)
+    finally:
+        # streamed results are not cached, but writes still invalidate the cached results of the db
+        if result_cache.enabled and result_cache.key(db_con_args, sql_command, number_rows, autocommit) is None:
+            result_cache.invalidate(connection_fingerprint(db_con_args))
+
+
+async def get_db_layout(db_con_args: Db_Connection_Args) -> tuple[Database, bool, float]:
+    """
+    Returns the layout of a db, served from the schema cache if a valid entry exists.
+    @db_con_args: holds all necessary args for connection
+    Return: tuple of db layout, whether it came from the cache and its age in seconds
+    """
+    fingerprint = connection_fingerprint(db_con_args)
+    cached = await asyncio.to_thread(schema_cache.get, fingerprint)
+    if cached is not None:
+        db_layout, age = cached
+        return db_layout, True, age
+
+    db_pipeline = await get_db_pipeline(db_con_args)
+    await asyncio.to_thread(schema_cache.set, fingerprint, db_pipeline.db)
+    return db_pipeline.db, False, 0.0
+
+
+async def get_db_prompt(db_con_args: Db_Connection_Args, normalized: bool) -> tuple[str, bool, float]:
+    """
+    Returns the rendered schema of a db, served from the schema cache if a valid entry exists.
+    @db_con_args: holds all necessary args for connection
+    @normalized: whether to render the normalized form of the schema
+    Return: tuple of rendered schema, whether it came from the cache and its age in seconds
+    """
+    fingerprint = connection_fingerprint(db_con_args)
+    variant = "normalized" if normalized else "raw"
+    cached = await asyncio.to_thread(schema_cache.get_prompt, fingerprint, variant)
+    if cached is not None:
+        prompt, age = cached
+        return prompt, True, age
+
+    db_layout, cache_hit, cache_age = await get_db_layout(db_con_args)
+    prompt = await asyncio.to_thread(
+        db_layout.return_code_repr_schema_normalized if normalized else db_layout.return_code_repr_schema)
+    await asyncio.to_thread(schema_cache.set_prompt, fingerprint, variant, prompt)
+    return prompt, cache_hit, cache_age
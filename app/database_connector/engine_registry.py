@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.data_oracle import ConnectionDetails, FileConnection, create_sqlalchemy_engine, \
+    create_async_sqlalchemy_engine
+from app.database_connector.fingerprint import connection_fingerprint
+from app.globals import ENGINE_POOL_SIZE, ENGINE_MAX_OVERFLOW, ENGINE_POOL_PRE_PING, ENGINE_POOL_RECYCLE, \
+    ENGINE_REGISTRY_MAX_ENGINES, ENGINE_REGISTRY_IDLE_TIMEOUT
+
+
+class EngineRegistry:
+    """
+    Process wide registry of sqlalchemy engines. Engines are keyed by the fingerprint of their connection arguments
+    so repeated requests against the same database reuse one connection pool instead of creating a new one each time.
+    Engines that were not used for a while or that fall out of the LRU window are disposed.
+    """
+
+    def __init__(self,
+                 max_engines: int = ENGINE_REGISTRY_MAX_ENGINES,
+                 idle_timeout: float = ENGINE_REGISTRY_IDLE_TIMEOUT,
+                 pool_size: int = ENGINE_POOL_SIZE,
+                 max_overflow: int = ENGINE_MAX_OVERFLOW,
+                 pool_pre_ping: bool = ENGINE_POOL_PRE_PING,
+                 pool_recycle: int = ENGINE_POOL_RECYCLE):
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self.engine_kwargs = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_pre_ping": pool_pre_ping,
+            "pool_recycle": pool_recycle,
+        }
+        self._engines: OrderedDict[str, tuple[Engine | AsyncEngine, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get_engine(self, connection_data: ConnectionDetails | FileConnection) -> Engine:
+        """
+        Returns the engine registered for the connection, creating it if necessary
+        @connection_data: holds all necessary args for connection
+        Return: sqlalchemy engine
+        """
+        return self._get_or_create(connection_fingerprint(connection_data), connection_data,
+                                   create_sqlalchemy_engine)
+
+    def get_async_engine(self, connection_data: ConnectionDetails | FileConnection) -> AsyncEngine:
+        """
+        Returns the async engine registered for the connection, creating it if necessary. Must be called from the
+        event loop the engine is used on
+        @connection_data: holds all necessary args for connection
+        Return: async sqlalchemy engine
+        """
+        self._loop = asyncio.get_running_loop()
+        return self._get_or_create("async:" + connection_fingerprint(connection_data), connection_data,
+                                   create_async_sqlalchemy_engine)
+
+    def _get_or_create(self, key: str, connection_data: ConnectionDetails | FileConnection, engine_factory):
+        evicted = []
+        with self._lock:
+            now = time.monotonic()
+            evicted += self._pop_idle(now)
+            if key in self._engines:
+                engine = self._engines.pop(key)[0]
+            else:
+                engine = engine_factory(connection_data, **self.engine_kwargs)
+            self._engines[key] = (engine, now)
+            while len(self._engines) > self.max_engines:
+                evicted.append(self._engines.popitem(last=False)[1][0])
+        for engine_to_dispose in evicted:
+            self._dispose(engine_to_dispose)
+        return engine
+
+    def _dispose(self, engine: Engine | AsyncEngine) -> None:
+        """
+        Disposes an engine. Async engines need to close their connections on the event loop they were used on, so
+        their disposal is scheduled on that loop if it is still running
+        @engine: engine to dispose
+        @return: None
+        """
+        if not isinstance(engine, AsyncEngine):
+            engine.dispose()
+            return
+        try:
+            asyncio.get_running_loop().create_task(engine.dispose())
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(engine.dispose(), self._loop)
+            else:
+                asyncio.run(engine.dispose())
+
+    def _pop_idle(self, now: float) -> list[Engine]:
+        """
+        Removes all engines that have not been used within the idle timeout. Caller must hold the lock
+        @now: current monotonic time
+        Return: list of removed engines
+        """
+        idle_keys = [key for key, (_, last_used) in self._engines.items() if now - last_used > self.idle_timeout]
+        return [self._engines.pop(key)[0] for key in idle_keys]
+
+    def evict_idle(self) -> int:
+        """
+        Disposes all engines that exceeded the idle timeout
+        Return: number of disposed engines
+        """
+        with self._lock:
+            evicted = self._pop_idle(time.monotonic())
+        for engine in evicted:
+            self._dispose(engine)
+        return len(evicted)
+
+    def dispose_all(self) -> None:
+        """
+        Disposes every registered engine, used on application shutdown
+        @return: None
+        """
+        for engine in self._pop_all():
+            self._dispose(engine)
+
+    async def adispose_all(self) -> None:
+        """
+        Disposes every registered engine and awaits the disposal of async engines, used on application shutdown
+        @return: None
+        """
+        for engine in self._pop_all():
+            if isinstance(engine, AsyncEngine):
+                await engine.dispose()
+            else:
+                engine.dispose()
+
+    def _pop_all(self) -> list[Engine | AsyncEngine]:
+        with self._lock:
+            evicted = [engine for engine, _ in self._engines.values()]
+            self._engines.clear()
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+engine_registry = EngineRegistry()
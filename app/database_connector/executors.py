@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database_connector.fingerprint import connection_fingerprint
+from app.fastapitypes.sql_connection import Db_Connection_Args
+from app.globals import EXECUTOR_MAX_WORKERS_PER_DB, EXECUTOR_MAX_DATABASES
+
+
+class DatabaseExecutor:
+    """
+    Bounded thread pool running the blocking connector calls of a single database
+    """
+
+    def __init__(self, label: str, max_workers: int):
+        self.label = label
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"db-{label}")
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _run(self, fn, *args, **kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs fn in the thread pool of this database without blocking the event loop
+        """
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self._run, fn, *args, **kwargs))
+
+    @property
+    def is_idle(self) -> bool:
+        return self.queued == 0 and self.running == 0
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "database": self.label,
+            "max_workers": self.max_workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class DatabaseExecutorPool:
+    """
+    Hands out one bounded executor per database so a slow database can only exhaust its own threads and never
+    stalls requests against other databases or the event loop of the worker.
+    """
+
+    def __init__(self, max_workers_per_db: int = EXECUTOR_MAX_WORKERS_PER_DB,
+                 max_databases: int = EXECUTOR_MAX_DATABASES):
+        self.max_workers_per_db = max_workers_per_db
+        self.max_databases = max_databases
+        self._executors: OrderedDict[str, DatabaseExecutor] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_executor(self, key: str, label: str) -> DatabaseExecutor:
+        """
+        Returns the executor of a database, creating it if necessary. Idle executors of the least recently used
+        databases are shut down once more than max_databases executors exist
+        @key: connection fingerprint
+        @label: human readable name of the database used in metrics
+        Return: executor
+        """
+        with self._lock:
+            executor = self._executors.pop(key, None)
+            if executor is None:
+                executor = DatabaseExecutor(label, self.max_workers_per_db)
+            self._executors[key] = executor
+            if len(self._executors) > self.max_databases:
+                for old_key in [k for k, v in self._executors.items() if k != key and v.is_idle]:
+                    self._executors.pop(old_key).executor.shutdown(wait=False)
+                    if len(self._executors) <= self.max_databases:
+                        break
+        return executor
+
+    async def run(self, db_con_args: Db_Connection_Args, fn, *args, **kwargs):
+        """
+        Runs a blocking call against a database in the executor of that database
+        @db_con_args: connection args identifying the database
+        @fn: blocking callable
+        Return: result of fn
+        """
+        label = f"{type(db_con_args).__name__}:{db_con_args.database_name}"
+        executor = self.get_executor(connection_fingerprint(db_con_args), label)
+        return await executor.run(fn, *args, **kwargs)
+
+    def metrics(self) -> dict:
+        """
+        Returns queue depth and utilisation of all executors keyed by a short connection fingerprint
+        """
+        with self._lock:
+            return {key[:12]: executor.metrics for key, executor in self._executors.items()}
+
+    def shutdown(self) -> None:
+        """
+        Shuts down all executors, used on application shutdown
+        @return: None
+        """
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.executor.shutdown(wait=False, cancel_futures=True)
+
+
+executor_pool = DatabaseExecutorPool()
@@ -0,0 +1,49 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from pathlib import Path
+
+from app.data_oracle import ConnectionInfo
+from app.globals import FINGERPRINT_SECRET, FINGERPRINT_SECRET_PATH
+
+
+def load_fingerprint_secret(path: str | Path = FINGERPRINT_SECRET_PATH) -> str:
+    """
+    Returns the secret persisted at path and creates a random one if there is none yet. The file is only readable by
+    its owner and published atomically, so workers starting at the same time all end up with the same secret.
+    @path: path of the secret file, parent directories are created
+    Return: secret
+    """
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        candidate = path.with_name(f"{path.name}.{os.getpid()}.{secrets.token_hex(4)}")
+        fd = os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(candidate, path)  # fails if another worker published its secret first
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(candidate)
+    return path.read_text().strip()
+
+
+fingerprint_secret = FINGERPRINT_SECRET or load_fingerprint_secret()
+
+
+def connection_fingerprint(connection_data: ConnectionInfo, secret: str = fingerprint_secret) -> str:
+    """
+    Returns a stable fingerprint for a set of connection arguments. The fingerprint is a keyed hash over all fields
+    of the connection object so two requests targeting the same database with the same credentials share a key,
+    while the key itself reveals nothing about the credentials.
+    @connection_data: connection object of any supported type
+    @secret: key used for the hmac
+    Return: hex digest identifying the connection
+    """
+    payload = json.dumps({"type": type(connection_data).__name__, "args": connection_data.model_dump()},
+                         sort_keys=True, default=str)
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
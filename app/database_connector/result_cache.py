@@ -0,0 +1,167 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from app.data_oracle import ConnectionInfo, FileConnection, RedshiftConnection, RedshiftConnectionSSO
+from app.data_oracle.db_schema import canonicalize_read_query
+from app.globals import RESULT_CACHE_ENABLED, RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES
+
+
+class ResultEntry(NamedTuple):
+    fingerprint: str
+    result: list
+    created_at: float
+    expires_at: float
+    size: int
+
+
+def database_type(connection_data: ConnectionInfo) -> str:
+    """
+    Returns the type of database a set of connection arguments targets
+    @connection_data: connection object of any supported type
+    Return: database type, e.g. PostgreSQL
+    """
+    if isinstance(connection_data, FileConnection):
+        return connection_data.type
+    if isinstance(connection_data, (RedshiftConnection, RedshiftConnectionSSO)):
+        return "Redshift"
+    return connection_data.database_type
+
+
+class ResultCache:
+    """
+    In process cache of query results keyed by connection fingerprint and the canonical form of the query, so
+    requests that only differ in formatting or alias names share an entry. Only single read statements are cached,
+    entries expire after their ttl and the least recently used entries are evicted once the estimated size of all
+    results exceeds the byte budget. Any write through a connection invalidates all results of that connection.
+    """
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 enabled: bool = RESULT_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, ResultEntry] = OrderedDict()
+        self._connection_keys: dict[str, set[str]] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def key(self, connection_data: ConnectionInfo, query: str, max_rows: int | None,
+            autocommit: bool = False) -> str | None:
+        """
+        Returns the cache key of a query or None if its result must not be cached
+        @connection_data: connection args of the db the query runs on
+        @query: sql query as it is executed
+        @max_rows: row limit of the result
+        @autocommit: whether the query commits, committing queries are never cached
+        Return: cache key or None
+        """
+        if not self.enabled or autocommit:
+            return None
+        canonical_query = canonicalize_read_query(query, database_type(connection_data))
+        if canonical_query is None:
+            return None
+        return hashlib.sha256(f"{max_rows}:{canonical_query}".encode()).hexdigest()
+
+    def get(self, fingerprint: str, key: str) -> tuple[list, float] | None:
+        """
+        Returns a cached result and its age in seconds or None if there is no valid entry
+        @fingerprint: connection fingerprint
+        @key: cache key of the query
+        Return: tuple of result and age or None
+        """
+        now = time.time()
+        entry_key = f"{fingerprint}:{key}"
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None or entry.expires_at <= now:
+                if entry is not None:
+                    self._remove(entry_key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry.result, now - entry.created_at
+
+    def generation(self, fingerprint: str) -> int:
+        """
+        Returns the number of invalidations of a connection, read it before executing a query and pass it to set
+        @fingerprint: connection fingerprint
+        Return: generation counter
+        """
+        return self._generations.get(fingerprint, 0)
+
+    def set(self, fingerprint: str, key: str, result: list, generation: int | None = None) -> bool:
+        """
+        Stores a result and evicts least recently used entries until the byte budget is met
+        @fingerprint: connection fingerprint
+        @key: cache key of the query
+        @result: result of the query, must not be modified afterwards
+        @generation: generation of the connection when the query started, results of queries that ran while the
+        connection was invalidated are skipped
+        Return: whether the result was cached, results larger than the whole budget are skipped
+        """
+        size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return False
+        now = time.time()
+        entry_key = f"{fingerprint}:{key}"
+        with self._lock:
+            if generation is not None and generation != self.generation(fingerprint):
+                return False
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            self._entries[entry_key] = ResultEntry(fingerprint, result, now, now + self.ttl, size)
+            self._connection_keys.setdefault(fingerprint, set()).add(entry_key)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def _remove(self, entry_key: str) -> None:
+        """
+        Removes an entry, caller must hold the lock
+        """
+        entry = self._entries.pop(entry_key)
+        self.total_bytes -= entry.size
+        connection_keys = self._connection_keys[entry.fingerprint]
+        connection_keys.discard(entry_key)
+        if not connection_keys:
+            del self._connection_keys[entry.fingerprint]
+
+    def invalidate(self, fingerprint: str) -> int:
+        """
+        Removes all cached results of a connection, e.g. after a write
+        @fingerprint: connection fingerprint
+        Return: number of removed entries
+        """
+        with self._lock:
+            self._generations[fingerprint] = self.generation(fingerprint) + 1
+            entry_keys = list(self._connection_keys.get(fingerprint, ()))
+            for entry_key in entry_keys:
+                self._remove(entry_key)
+            return len(entry_keys)
+
+    def clear(self) -> int:
+        """
+        Removes all cached results
+        Return: number of removed entries
+        """
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._connection_keys.clear()
+            self.total_bytes = 0
+            return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+result_cache = ResultCache()
@@ -0,0 +1,189 @@
+import io
+import json
+import time
+from importlib.util import find_spec
+from typing import AsyncIterator, Callable, NamedTuple
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str)
+
+
+async def encode_ndjson(columns: list, chunks: AsyncIterator[list], executed_query: str,
+                        start_time: float) -> AsyncIterator[bytes]:
+    """
+    Encodes a streamed result as newline delimited json. The first line holds the column names, every row follows as
+    a json array and the last line holds the number of rows and the execution time. An error while streaming is
+    reported as a final line with an error key.
+    @columns: column names of the result
+    @chunks: chunks of rows
+    @executed_query: query that produced the result
+    @start_time: time the request was received
+    Return: async generator of encoded lines
+    """
+    yield (_dumps({"columns": columns}) + "\n").encode()
+    row_count = 0
+    try:
+        async for chunk in chunks:
+            row_count += len(chunk)
+            yield "".join(_dumps(row) + "\n" for row in chunk).encode()
+    except Exception as e:
+        yield (_dumps({"error": str(e), "row_count": row_count}) + "\n").encode()
+        return
+    yield (_dumps({"row_count": row_count, "execution_time": time.time() - start_time,
+                   "executed_query": executed_query}) + "\n").encode()
+
+
+async def encode_json(columns: list, chunks: AsyncIterator[list], executed_query: str,
+                      start_time: float) -> AsyncIterator[bytes]:
+    """
+    Encodes a streamed result as a single json document which is sent in chunks. An error while streaming closes the
+    rows and is reported under the error key.
+    @columns: column names of the result
+    @chunks: chunks of rows
+    @executed_query: query that produced the result
+    @start_time: time the request was received
+    Return: async generator of encoded parts of the document
+    """
+    yield ('{"columns": ' + _dumps(columns) + ', "rows": [').encode()
+    row_count = 0
+    try:
+        async for chunk in chunks:
+            separator = ", " if row_count > 0 and chunk else ""
+            row_count += len(chunk)
+            yield (separator + ", ".join(_dumps(row) for row in chunk)).encode()
+    except Exception as e:
+        yield ('], "row_count": ' + _dumps(row_count) + ', "error": ' + _dumps(str(e)) + '}').encode()
+        return
+    yield ('], "row_count": ' + _dumps(row_count) + ', "execution_time": ' + _dumps(time.time() - start_time) +
+           ', "executed_query": ' + _dumps(executed_query) + '}').encode()
+
+
+def dictionary_encode(values: list) -> list | dict:
+    """
+    Replaces the values of a string column by indices into a list of its distinct values if strings repeat often
+    enough for the encoding to be smaller
+    @values: values of a column, None for null
+    Return: the values or a dictionary with the distinct values and the index of every value, null stays None
+    """
+    dictionary = {}
+    for value in values:
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return values
+        dictionary.setdefault(value, len(dictionary))
+    if not dictionary or len(dictionary) * 2 > len(values):
+        return values
+    return {"dictionary": list(dictionary), "indices": [None if value is None else dictionary[value]
+                                                        for value in values]}
+
+
+async def encode_columnar_json(columns: list, chunks: AsyncIterator[list], executed_query: str,
+                               start_time: float) -> AsyncIterator[bytes]:
+    """
+    Encodes a streamed result as newline delimited json with one line per chunk of rows. Every chunk holds the values
+    per column, string columns with repeated values are dictionary encoded. The first and the last line are the same
+    as for newline delimited json.
+    @columns: column names of the result
+    @chunks: chunks of rows
+    @executed_query: query that produced the result
+    @start_time: time the request was received
+    Return: async generator of encoded lines
+    """
+    yield (_dumps({"columns": columns}) + "\n").encode()
+    row_count = 0
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            row_count += len(chunk)
+            yield (_dumps({"row_count": len(chunk), "data": [dictionary_encode(list(values))
+                                                              for values in zip(*chunk)]}) + "\n").encode()
+    except Exception as e:
+        yield (_dumps({"error": str(e), "row_count": row_count}) + "\n").encode()
+        return
+    yield (_dumps({"row_count": row_count, "execution_time": time.time() - start_time,
+                   "executed_query": executed_query}) + "\n").encode()
+
+
+def arrow_available() -> bool:
+    """
+    Returns whether pyarrow is installed, the arrow format is only available with it
+    """
+    return find_spec("pyarrow") is not None
+
+
+def _arrow_type(pa, array):
+    """
+    Returns the type a column is streamed with, derived from the values of the first chunk. Columns without values
+    are streamed as strings and decimals get the maximum precision so later chunks with larger values fit
+    """
+    if pa.types.is_null(array.type):
+        return pa.string()
+    if pa.types.is_decimal(array.type):
+        return pa.decimal128(38, array.type.scale)
+    return array.type
+
+
+def _arrow_array(pa, values, field_type):
+    try:
+        return pa.array(values, type=field_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if not pa.types.is_string(field_type):
+            raise
+        # databases with dynamic typing can mix types in a column
+        return pa.array([None if value is None else str(value) for value in values], type=field_type)
+
+
+async def encode_arrow(columns: list, chunks: AsyncIterator[list], executed_query: str,
+                       start_time: float) -> AsyncIterator[bytes]:
+    """
+    Encodes a streamed result as an arrow ipc stream with one record batch per chunk of rows. The values are taken
+    from the database driver without converting them to json types. An error while streaming aborts the response
+    before the end of stream marker is written.
+    @columns: column names of the result
+    @chunks: chunks of rows with unconverted values
+    @executed_query: query that produced the result, stored in the schema metadata
+    @start_time: time the request was received
+    Return: async generator of encoded ipc messages
+    """
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    schema = None
+    writer = None
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        values = list(zip(*chunk))
+        if writer is None:
+            schema = pa.schema([pa.field(name, _arrow_type(pa, pa.array(column_values)))
+                                for name, column_values in zip(columns, values)],
+                               metadata={"executed_query": executed_query})
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_batch(pa.record_batch([_arrow_array(pa, column_values, field.type)
+                                            for column_values, field in zip(values, schema)], schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    if writer is None:
+        # empty result, the schema only holds the column names
+        writer = pa.ipc.new_stream(sink, pa.schema([pa.field(name, pa.string()) for name in columns],
+                                                   metadata={"executed_query": executed_query}))
+    writer.close()
+    yield sink.getvalue()
+
+
+class ResultEncoder(NamedTuple):
+    encode: Callable
+    media_type: str
+    convert_values: bool  # whether the encoder expects values converted to json types
+
+
+result_encoders = {
+    "ndjson": ResultEncoder(encode_ndjson, "application/x-ndjson", True),
+    "json": ResultEncoder(encode_json, "application/json", True),
+    "columnar": ResultEncoder(encode_columnar_json, "application/x-ndjson", True),
+    "arrow": ResultEncoder(encode_arrow, "application/vnd.apache.arrow.stream", False),
+}
@@ -0,0 +1,289 @@
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from app.data_oracle import Database
+from app.data_oracle.db_schema.snapshot import dumps_json, loads_json
+from app.database_connector.cache_backends import SharedCacheBackend, create_shared_cache_backend
+from app.database_connector.fingerprint import fingerprint_secret
+from app.globals import SCHEMA_CACHE_TTL, SCHEMA_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+PROMPT_VARIANTS = ("raw", "normalized")
+# creation and expiry time in front of the json snapshot of a shared entry
+SHARED_ENTRY_HEADER = struct.Struct(">dd")
+# generations are replaced on every invalidation and must outlive the in process entries that recorded them
+GENERATION_TTL = 24 * 60 * 60
+GLOBAL_GENERATION_KEY = "generation:*"
+
+
+class CacheEntry(NamedTuple):
+    db: Database
+    created_at: float
+    expires_at: float
+    size: int
+    prompts: dict[str, str]
+    generation: tuple  # shared generations of the cache and of the key when the entry was stored
+
+
+class SchemaCache:
+    """
+    Two level cache of reflected database layouts and their rendered prompts keyed by connection fingerprint.
+    The first level lives in process, entries expire after their ttl and the least recently used entries are evicted
+    once the estimated size of all entries exceeds the byte budget. The optional second level is a backend shared by
+    all workers which keeps the cache warm across workers and restarts. Invalidations replace a generation token in
+    the shared backend, in process entries are only served while the tokens they were stored with are current, so an
+    invalidation by one worker is seen by all workers on their next access.
+    Cached layouts are shared between requests and must be treated as read only.
+    """
+
+    def __init__(self,
+                 ttl: float = SCHEMA_CACHE_TTL,
+                 max_bytes: int = SCHEMA_CACHE_MAX_BYTES,
+                 backend: SharedCacheBackend | None = None,
+                 secret: str = fingerprint_secret):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.secret = secret.encode()
+        self.total_bytes = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_size(db: Database) -> int:
+        """
+        Estimates the memory footprint of a database layout by the size of its snapshot
+        @param db: database layout
+        @return: size in bytes
+        """
+        return SHARED_ENTRY_HEADER.size + len(dumps_json(db).encode())
+
+    @staticmethod
+    def _dump_entry(created_at: float, expires_at: float, db: Database) -> bytes:
+        return SHARED_ENTRY_HEADER.pack(created_at, expires_at) + dumps_json(db).encode()
+
+    @staticmethod
+    def _load_entry(payload: bytes) -> tuple[float, float, Database]:
+        created_at, expires_at = SHARED_ENTRY_HEADER.unpack_from(payload)
+        return created_at, expires_at, loads_json(payload[SHARED_ENTRY_HEADER.size:])
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self.secret, payload, hashlib.sha256).digest() + payload
+
+    def _verify(self, signed_payload: bytes) -> bytes | None:
+        signature, payload = signed_payload[:32], signed_payload[32:]
+        if not hmac.compare_digest(signature, hmac.new(self.secret, payload, hashlib.sha256).digest()):
+            return None
+        return payload
+
+    def _shared_get(self, key: str) -> bytes | None:
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Shared schema cache unavailable: {e}")
+            return None
+
+    def _shared_generation(self, key: str) -> tuple:
+        """
+        Returns the current generation tokens of the whole cache and of a key, both None without a shared backend
+        """
+        if self.backend is None:
+            return None, None
+        return self._shared_get(GLOBAL_GENERATION_KEY), self._shared_get(f"generation:{key}")
+
+    def _shared_call(self, method: str, *args) -> None:
+        if self.backend is None:
+            return
+        try:
+            getattr(self.backend, method)(*args)
+        except Exception as e:
+            logger.warning(f"Shared schema cache unavailable: {e}")
+
+    def get(self, key: str) -> tuple[Database, float] | None:
+        """
+        Returns the cached layout and its age in seconds or None if there is no valid entry
+        @param key: connection fingerprint
+        @return: tuple of database layout and age or None
+        """
+        now = time.time()
+        generation = self._shared_generation(key)
+        with self._lock:
+            entry = self._get_local(key, now, generation)
+            if entry is not None:
+                self.hits += 1
+                return entry.db, now - entry.created_at
+
+        signed_payload = self._shared_get(f"schema:{key}")
+        payload = self._verify(signed_payload) if signed_payload is not None else None
+        if payload is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            created_at, expires_at, db = self._load_entry(payload)
+        except (ValueError, struct.error) as e:
+            # entries written in an older or newer snapshot format are treated as missing
+            logger.warning(f"Ignoring unreadable shared schema cache entry: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.shared_hits += 1
+            self._set_local(key, CacheEntry(db, created_at, expires_at, len(payload), {}, generation))
+        return db, now - created_at
+
+    def _get_local(self, key: str, now: float, generation: tuple) -> CacheEntry | None:
+        """
+        Returns a valid in process entry, caller must hold the lock
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now or entry.generation != generation:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, db: Database, ttl: float | None = None) -> bool:
+        """
+        Stores a layout in the cache and evicts least recently used entries until the byte budget is met
+        @param key: connection fingerprint
+        @param db: database layout
+        @param ttl: time to live of the entry in seconds, defaults to the ttl of the cache
+        @return: whether the layout was cached in process, layouts larger than the whole budget are skipped
+        """
+        ttl = self.ttl if ttl is None else ttl
+        generation = self._shared_generation(key)
+        now = time.time()
+        payload = self._dump_entry(now, now + ttl, db)
+        self._shared_call("set", f"schema:{key}", self._sign(payload), ttl)
+        if len(payload) > self.max_bytes:
+            return False
+        with self._lock:
+            self._set_local(key, CacheEntry(db, now, now + ttl, len(payload), {}, generation))
+        return True
+
+    def _set_local(self, key: str, entry: CacheEntry) -> None:
+        """
+        Stores an entry in process and enforces the byte budget, caller must hold the lock
+        """
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def get_prompt(self, key: str, variant: str) -> tuple[str, float] | None:
+        """
+        Returns a rendered prompt of a cached layout and its age in seconds
+        @param key: connection fingerprint
+        @param variant: name of the rendered form, e.g. raw or normalized
+        @return: tuple of prompt and age or None
+        """
+        now = time.time()
+        generation = self._shared_generation(key)
+        with self._lock:
+            entry = self._get_local(key, now, generation)
+            if entry is not None and variant in entry.prompts:
+                self.hits += 1
+                return entry.prompts[variant], now - entry.created_at
+
+        signed_prompt = self._shared_get(f"prompt:{key}:{variant}")
+        payload = self._verify(signed_prompt) if signed_prompt is not None else None
+        if payload is None:
+            return None
+        cached_prompt = json.loads(payload)
+        with self._lock:
+            self.shared_hits += 1
+        return cached_prompt["prompt"], now - cached_prompt["created_at"]
+
+    def set_prompt(self, key: str, variant: str, prompt: str) -> None:
+        """
+        Stores a rendered prompt alongside the cached layout it was rendered from. Prompts are only cached while
+        their layout is cached so both expire together
+        @param key: connection fingerprint
+        @param variant: name of the rendered form, e.g. raw or normalized
+        @param prompt: rendered prompt
+        @return: None
+        """
+        now = time.time()
+        generation = self._shared_generation(key)
+        with self._lock:
+            entry = self._get_local(key, now, generation)
+            if entry is None:
+                return
+            entry.prompts[variant] = prompt
+        self._shared_call("set", f"prompt:{key}:{variant}",
+                          self._sign(json.dumps({"created_at": entry.created_at, "prompt": prompt}).encode()),
+                          entry.expires_at - now)
+
+    def _remove(self, key: str) -> None:
+        """
+        Removes an entry, caller must hold the lock
+        @param key: connection fingerprint
+        @return: None
+        """
+        self.total_bytes -= self._entries.pop(key).size
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Removes the layout of a single connection and all prompts rendered from it, in this and all other workers
+        @param key: connection fingerprint
+        @return: whether an entry was removed
+        """
+        removed = False
+        if self.backend is not None:
+            try:
+                self.backend.set(f"generation:{key}", secrets.token_bytes(16), GENERATION_TTL)
+                removed = self.backend.delete(f"schema:{key}")
+                for variant in PROMPT_VARIANTS:
+                    self.backend.delete(f"prompt:{key}:{variant}")
+            except Exception as e:
+                logger.warning(f"Shared schema cache unavailable: {e}")
+        with self._lock:
+            if key not in self._entries:
+                return removed
+            self._remove(key)
+            return True
+
+    def clear(self) -> int:
+        """
+        Removes all cached layouts, in this and all other workers
+        @return: number of removed in process entries
+        """
+        self._shared_call("clear")
+        self._shared_call("set", GLOBAL_GENERATION_KEY, secrets.token_bytes(16), GENERATION_TTL)
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self.total_bytes = 0
+            return removed
+
+    def close(self) -> None:
+        """
+        Closes the shared backend
+        @return: None
+        """
+        self._shared_call("close")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+schema_cache = SchemaCache(backend=create_shared_cache_backend())
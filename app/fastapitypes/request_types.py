@@ -1,4 +1,6 @@
 
+from enum import Enum
+
 from pydantic import BaseModel
 from typing import Optional
 from app.fastapitypes.sql_connection import Db_Connection_Args
@@ -10,4 +12,12 @@ class ExecuteQueryRequest(BaseModel):
     normalized_query: bool
     max_rows: int
     autocommit: bool = False
-    unormalized_schema: Optional[str] = None
\ No newline at end of file
+    unormalized_schema: Optional[str] = None
+    optimize_query: bool = True
+
+
+class ResultFormat(str, Enum):
+    ndjson = "ndjson"
+    json = "json"
+    columnar = "columnar"
+    arrow = "arrow"
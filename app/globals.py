@@ -9,4 +9,51 @@ SQL_DBS = {
 }
 
 
-key_file_path = os.path.join(os.path.dirname(__file__), "files/")
\ No newline at end of file
+key_file_path = os.path.join(os.path.dirname(__file__), "files/")
+
+# Secret mixed into connection fingerprints so that cache keys do not leak credentials. If unset a random secret is
+# generated once and persisted at FINGERPRINT_SECRET_PATH, so all workers on the host share it
+FINGERPRINT_SECRET = os.environ.get("TURBULAR_FINGERPRINT_SECRET")
+FINGERPRINT_SECRET_PATH = os.environ.get("TURBULAR_FINGERPRINT_SECRET_PATH",
+                                         os.path.join(key_file_path, "cache", "fingerprint_secret"))
+
+# Engine registry / connection pool settings
+ENGINE_POOL_SIZE = int(os.environ.get("TURBULAR_ENGINE_POOL_SIZE", "5"))
+ENGINE_MAX_OVERFLOW = int(os.environ.get("TURBULAR_ENGINE_MAX_OVERFLOW", "10"))
+ENGINE_POOL_PRE_PING = os.environ.get("TURBULAR_ENGINE_POOL_PRE_PING", "true").lower() == "true"
+ENGINE_POOL_RECYCLE = int(os.environ.get("TURBULAR_ENGINE_POOL_RECYCLE", "1800"))
+ENGINE_REGISTRY_MAX_ENGINES = int(os.environ.get("TURBULAR_ENGINE_REGISTRY_MAX_ENGINES", "32"))
+ENGINE_REGISTRY_IDLE_TIMEOUT = float(os.environ.get("TURBULAR_ENGINE_REGISTRY_IDLE_TIMEOUT", "600"))
+
+# In process schema cache settings
+SCHEMA_CACHE_TTL = float(os.environ.get("TURBULAR_SCHEMA_CACHE_TTL", "300"))
+SCHEMA_CACHE_MAX_BYTES = int(os.environ.get("TURBULAR_SCHEMA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Shared schema cache settings, the backend can be sqlite, redis or none
+SHARED_CACHE_BACKEND = os.environ.get("TURBULAR_SHARED_CACHE_BACKEND", "sqlite")
+SHARED_CACHE_SQLITE_PATH = os.environ.get("TURBULAR_SHARED_CACHE_SQLITE_PATH",
+                                          os.path.join(key_file_path, "cache", "shared_cache.db"))
+SHARED_CACHE_REDIS_HOST = os.environ.get("TURBULAR_SHARED_CACHE_REDIS_HOST", "localhost")
+SHARED_CACHE_REDIS_PORT = int(os.environ.get("TURBULAR_SHARED_CACHE_REDIS_PORT", "6379"))
+SHARED_CACHE_REDIS_DB = int(os.environ.get("TURBULAR_SHARED_CACHE_REDIS_DB", "0"))
+SHARED_CACHE_REDIS_PASSWORD = os.environ.get("TURBULAR_SHARED_CACHE_REDIS_PASSWORD")
+SHARED_CACHE_NAMESPACE = os.environ.get("TURBULAR_SHARED_CACHE_NAMESPACE", "turbular")
+
+# Thread pools running blocking connector calls, one pool per database
+EXECUTOR_MAX_WORKERS_PER_DB = int(os.environ.get("TURBULAR_EXECUTOR_MAX_WORKERS_PER_DB", "4"))
+EXECUTOR_MAX_DATABASES = int(os.environ.get("TURBULAR_EXECUTOR_MAX_DATABASES", "64"))
+
+# Use async drivers (psycopg, aiomysql, aiosqlite) for supported sql databases instead of executor threads
+ASYNC_SQLALCHEMY = os.environ.get("TURBULAR_ASYNC_SQLALCHEMY", "false").lower() == "true"
+
+# Concurrent reflection of schemas and table batches, capped per connector by the connections it can use
+REFLECTION_WORKERS = int(os.environ.get("TURBULAR_REFLECTION_WORKERS", "4"))
+REFLECTION_BATCH_SIZE = int(os.environ.get("TURBULAR_REFLECTION_BATCH_SIZE", "50"))
+
+# Number of rows fetched from the cursor per chunk by the streaming query endpoint
+STREAM_CHUNK_SIZE = int(os.environ.get("TURBULAR_STREAM_CHUNK_SIZE", "1000"))
+
+# Opt-in in process cache of read query results, invalidated per connection by writes
+RESULT_CACHE_ENABLED = os.environ.get("TURBULAR_RESULT_CACHE_ENABLED", "false").lower() == "true"
+RESULT_CACHE_TTL = float(os.environ.get("TURBULAR_RESULT_CACHE_TTL", "30"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("TURBULAR_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
@@ -1,24 +1,44 @@
 import time
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List
 import shutil
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database_connector.connections import get_db_pipeline
+from app.database_connector.connections import get_db_pipeline, get_db_prompt, get_db_layout, run_on_db, \
+    execute_cached, stream_on_db
+from app.database_connector.engine_registry import engine_registry
+from app.database_connector.executors import executor_pool
+from app.database_connector.fingerprint import connection_fingerprint
+from app.database_connector.result_encoding import result_encoders, arrow_available
+from app.database_connector.schema_cache import schema_cache
+from app.data_oracle.db_schema import translation_cache
+from app.data_oracle.db_schema.snapshot import dumps_json
 from app.fastapitypes.sql_connection import Db_Connection_Args, SupportedDb
-from app.fastapitypes.request_types import ExecuteQueryRequest
+from app.fastapitypes.request_types import ExecuteQueryRequest, ResultFormat
 # Constants
 BIGQUERY_KEYS_DIR = Path("app/files/bqkeys")
 SQLITE_FILES_DIR = Path("app/files/sqlite")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # dispose all pooled connections so the worker shuts down cleanly
+    executor_pool.shutdown()
+    await engine_registry.adispose_all()
+    schema_cache.close()
+
+
 app = FastAPI(
     title="Turbular Database API",
     description="A Multi-Cloud Platform (MCP) server that can connect to various database types and execute queries.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -41,6 +61,20 @@ async def health_check():
     """
     return {"status": "healthy"}
 
+@app.get("/metrics/executors")
+async def executor_metrics():
+    """
+    Returns queue depth and utilisation of the per database executors running blocking connector calls.
+    """
+    return {"executors": executor_pool.metrics()}
+
+@app.get("/metrics/translations")
+async def translation_metrics():
+    """
+    Returns size and hit rate of the cache of translated normalized queries.
+    """
+    return {"translations": translation_cache.metrics()}
+
 @app.get("/supported-databases", response_model=List[str])
 async def get_supported_databases():
     """
@@ -49,27 +83,52 @@ async def get_supported_databases():
     return [db.value for db in SupportedDb]
 
 @app.post("/get_schema")
-async def get_schema(db_info: Db_Connection_Args, return_normalize_schema: bool = False):
+async def get_schema(db_info: Db_Connection_Args, return_normalize_schema: bool = False,
+                     return_snapshot: bool = False):
     """
     Get the schema of a database. If return_normalize_schema is True, the schema will be returned in its normalized form.
     Normalized form refers to the schema of the database in a format that is easier to work with for an LLM. Aka all names 
-    are in lowercase and separated by underscores.
+    are in lowercase and separated by underscores. If return_snapshot is True, a json snapshot of the layout is returned
+    as well, pass it as unormalized_schema to translate normalized queries without parsing ddl.
     """
     start_time = time.time()
-    db_pipeline = await get_db_pipeline(db_info)
+    database_schema, cache_hit, cache_age = await get_db_prompt(db_info, False)
+    normalized_schema = (await get_db_prompt(db_info, True))[0] if return_normalize_schema else None
+    schema_snapshot = None
+    if return_snapshot:
+        db_layout = (await get_db_layout(db_info))[0]
+        schema_snapshot = await run_on_db(db_info, dumps_json, db_layout)
 
-    return {"database_schema": db_pipeline.return_db_prompt(False),
+    return {"database_schema": database_schema,
             "extraction_time": time.time() - start_time,
-            "normalized_schema": db_pipeline.return_db_prompt(True) if return_normalize_schema else None}
+            "normalized_schema": normalized_schema,
+            "schema_snapshot": schema_snapshot,
+            "cache_hit": cache_hit,
+            "cache_age": cache_age}
+
+
+@app.post("/invalidate_schema_cache")
+async def invalidate_schema_cache(db_info: Db_Connection_Args | None = None):
+    """
+    Removes cached schemas. If db_info is provided only the schema of that connection is removed, otherwise the whole
+    cache is cleared.
+    """
+    if db_info is None:
+        invalidated = schema_cache.clear()
+    else:
+        invalidated = int(schema_cache.invalidate(connection_fingerprint(db_info)))
+    return {"invalidated": invalidated}
 
 
 @app.post("/execute_query")
-async def execute_query(req: ExecuteQueryRequest):
+async def execute_query(req: ExecuteQueryRequest, format: ResultFormat | None = None):
     """
     Execute a query on a database. If normalized_query is True, the query will be transformed from its normalized form 
-    to its unormalized form.
+    to its unormalized form. If a format is given, the result is streamed in that format, see execute_query_stream.
     """
-    
+    if format is not None:
+        return await execute_query_stream(req, format)
+
     if req.normalized_query and req.unormalized_schema is None:
         # technically we could also save a schema and reuse it here
         raise HTTPException(status_code=400, detail=("If a normalized query is provided, a unormalized "
@@ -77,20 +136,55 @@ async def execute_query(req: ExecuteQueryRequest):
                                                      "its unormalized form."))
 
     start_time = time.time()
+    # the layout is only needed to translate normalized queries, plain execution goes straight to the connector
+    db_pipeline = None
     if req.normalized_query:
-        db_pipeline = await get_db_pipeline(req.db_info, cached_schema=req.unormalized_schema)
-        query = db_pipeline.normalize_query(req.query)
+        db_pipeline = await get_db_pipeline(req.db_info, cached_schema=req.unormalized_schema, lazy=True)
+        query = await run_on_db(req.db_info, db_pipeline.normalize_query, req.query,
+                                req.optimize_query)
     else:
-        db_pipeline = await get_db_pipeline(req.db_info)
+        query = req.query
 
-    query_res = db_pipeline.execute_sql_statement(sql_command=req.query, number_rows=req.max_rows, autocommit=req.autocommit)
+    query_res, cache_hit = await execute_cached(req.db_info, db_pipeline, sql_command=query,
+                                                number_rows=req.max_rows, autocommit=req.autocommit)
 
     return {
         "execution_time": time.time() - start_time,
         "query_result": query_res,
-        "executed_query": req.query,
+        "executed_query": query,
+        "cache_hit": cache_hit,
     }
 
+@app.post("/execute_query/stream")
+async def execute_query_stream(req: ExecuteQueryRequest, format: ResultFormat = ResultFormat.ndjson):
+    """
+    Execute a query on a database and stream the rows as they are read from the cursor, as newline delimited json, a
+    single json document, columnar json or an arrow ipc stream. Memory use does not depend on the number of returned
+    rows.
+    """
+    if format == ResultFormat.arrow and not arrow_available():
+        raise HTTPException(status_code=400, detail="The arrow format requires pyarrow to be installed")
+    if req.normalized_query and req.unormalized_schema is None:
+        raise HTTPException(status_code=400, detail=("If a normalized query is provided, a unormalized "
+                                                     "schema must be provided to transform the query to "
+                                                     "its unormalized form."))
+
+    start_time = time.time()
+    if req.normalized_query:
+        db_pipeline = await get_db_pipeline(req.db_info, cached_schema=req.unormalized_schema, lazy=True)
+        query = await run_on_db(req.db_info, db_pipeline.normalize_query, req.query,
+                                req.optimize_query)
+    else:
+        db_pipeline = await get_db_pipeline(req.db_info, lazy=True)
+        query = req.query
+
+    encoder = result_encoders[format.value]
+    chunks = stream_on_db(req.db_info, db_pipeline, sql_command=query, number_rows=req.max_rows,
+                          autocommit=req.autocommit, convert_values=encoder.convert_values)
+    # execute the query before the response starts so errors are still returned with a status code
+    columns = await anext(chunks)
+    return StreamingResponse(encoder.encode(columns, chunks, query, start_time), media_type=encoder.media_type)
+
 @app.post("/upload-bigquery-key")
 async def upload_bigquery_key(
     project_id: str,
@@ -0,0 +1,54 @@
+"""
+Measures building and querying the nearest neighbour index of Prompt_Type.DYNAMIC on the synthetic database of
+scripts.benchmark_schema_memory. Names are embedded by a stand-in model that maps every name to a noisy topic vector,
+recall is the share of the exact 10 most relevant tables that the index returns.
+Run from the repository root: python -m scripts.benchmark_schema_index
+"""
+import time
+import zlib
+
+import numpy as np
+
+from app.data_oracle.query_generation import CachedEmbedder, SchemaIndex
+from scripts.benchmark_schema_memory import build_database
+
+DIMENSIONS = 384
+TOPICS = np.random.default_rng(0).standard_normal((64, DIMENSIONS))
+
+
+def topic_model(texts: list[str]) -> list[np.ndarray]:
+    vectors = []
+    for text in texts:
+        rng = np.random.default_rng(zlib.crc32(text.encode()))
+        vectors.append(TOPICS[rng.integers(len(TOPICS))] + 0.5 * rng.standard_normal(DIMENSIONS))
+    return vectors
+
+
+def main():
+    db = build_database()
+    db.apply_batch_embedding_model(CachedEmbedder(topic_model, "topics"))
+    db.embedding_matrix
+    start = time.perf_counter()
+    index = SchemaIndex(db)
+    print(f"build: {time.perf_counter() - start:.2f} s for {len(index.embedding_matrix):,} elements, "
+          f"{len(index.index):,} distinct vectors, index {index.index.nbytes / 2 ** 10:,.0f} KiB "
+          f"(float32 {index.embedding_matrix.matrix[index.vector_rows].nbytes / 2 ** 10:,.0f} KiB)")
+
+    questions = topic_model([f"question {i}" for i in range(200)])
+    table_ids = {id(table): i for i, (_, table) in enumerate(index.tables)}
+    exact_scores = [index.table_scores(question) for question in questions]
+    for n_probe in (2, 4, 8, 16):
+        timings, recall = [], []
+        for question, scores in zip(questions, exact_scores):
+            start = time.perf_counter()
+            found = index.search(question, 10, n_probe=n_probe)
+            timings.append(time.perf_counter() - start)
+            # many tables tie, so a returned table counts if it scores at least like the exact 10th table
+            tenth = np.sort(scores)[-10]
+            recall.append(np.mean([scores[table_ids[id(table)]] >= tenth - 1e-6 for _, table, _ in found]))
+        print(f"n_probe {n_probe}: median {np.median(timings) * 1000:.3f} ms, "
+              f"p95 {np.percentile(timings, 95) * 1000:.3f} ms, recall@10 {np.mean(recall):.2f}")
+
+
+if __name__ == "__main__":
+    main()
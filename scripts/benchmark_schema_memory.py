@@ -0,0 +1,62 @@
+"""
+Measures the memory footprint and construction time of a synthetic database layout with 10k tables of 20 columns.
+Names and types are created per column like they are by reflection, so equal strings are separate objects.
+Run from the repository root: python -m scripts.benchmark_schema_memory
+"""
+import gc
+import time
+import tracemalloc
+
+from app.data_oracle.db_schema import Column, Table, Schema, Database, Foreign_Key_Relation
+from app.data_oracle.enums import Data_Table_Type
+
+SHARED_COLUMNS = ["id", "created_at", "updated_at", "Created By", "tenant_id", "status"]
+TYPES = ["INTEGER", "VARCHAR(255)", "TIMESTAMP", "BOOLEAN", "NUMERIC(10, 2)"]
+
+
+def fresh(value: str) -> str:
+    # a new string object with the same value, drivers return new objects for every row
+    return "".join(list(value))
+
+
+def build_database(table_count: int = 10_000, column_count: int = 20, schema_count: int = 10) -> Database:
+    db = Database("synthetic")
+    tables_per_schema = table_count // schema_count
+    for s in range(schema_count):
+        tables = []
+        for t in range(tables_per_schema):
+            columns = [Column(fresh("id"), fresh("INTEGER"), True)]
+            for c in range(1, column_count):
+                if c < len(SHARED_COLUMNS):
+                    name = fresh(SHARED_COLUMNS[c])
+                else:
+                    name = f"Attribute {t % 50}-{c}"
+                columns.append(Column(name, fresh(TYPES[c % len(TYPES)]), _is_fk=c == 4))
+            fk_relations = [Foreign_Key_Relation([fresh("tenant_id")], fresh("Tenants"), fresh(f"Schema_{s}"),
+                                                 [fresh("id")])]
+            tables.append(Table(f"Table_{t}", fresh("pk"), columns, Data_Table_Type.TABLE, fk_relations))
+        db.register_schema(Schema(f"Schema_{s}", tables))
+    return db
+
+
+def main():
+    start = time.perf_counter()
+    db = build_database()
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    db.return_code_repr_schema_normalized()
+    render_seconds = time.perf_counter() - start
+    del db
+    gc.collect()
+    tracemalloc.start()
+    db = build_database()
+    built_bytes = tracemalloc.get_traced_memory()[0]
+    db.return_code_repr_schema_normalized()
+    rendered_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"build: {build_seconds:.2f} s, {built_bytes / 2 ** 20:,.1f} MiB")
+    print(f"normalized ddl: {render_seconds:.2f} s, {rendered_bytes / 2 ** 20:,.1f} MiB retained afterwards")
+
+
+if __name__ == "__main__":
+    main()
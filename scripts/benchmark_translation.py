@@ -0,0 +1,102 @@
+"""
+Compares the translation of large cte heavy normalized queries by the former optimize, re-parse and string replace
+implementation with the single parse translation on the syntax tree, with and without the optimizer.
+Run from the repository root: python -m scripts.benchmark_translation
+"""
+import time
+
+from sqlglot import parse_one, exp
+from sqlglot.optimizer import optimize
+
+from app.data_oracle.db_schema.utils import DatabaseType_mapper, get_default_schema, translate_sql_args
+
+
+def former_translate_sql_args(query: str, translations: dict, db_type: str) -> str:
+    # translation before the single parse engine: optimize, parse the optimized sql and every cte body again and
+    # replace every translated identifier in the whole query string
+    dialect = DatabaseType_mapper[db_type]
+    default_schema_name = get_default_schema(translations, db_type)
+    query = optimize(query, dialect=dialect).sql(dialect)
+    ast = parse_one(query, dialect=dialect)
+    dependencies = {}
+    for cte in ast.find_all(exp.CTE):
+        parsed_query = parse_one(cte.this.sql(dialect), dialect=dialect)
+        dependencies[cte.alias_or_name] = {
+            "Tables": {table.name if table.db == "" else table.db + "." + table.name
+                       for table in parsed_query.find_all(exp.Table)},
+            "ColumnsAlias": {alias.alias for alias in parsed_query.find_all(exp.Alias)},
+        }
+    tables = {table.alias: table.name if table.db == "" else table.db + "." + table.name
+              for table in ast.find_all(exp.Table)}
+
+    def find_column(table_name, column_name):
+        split_table = table_name.split(".")
+        if len(split_table) == 1 and split_table[0] in dependencies:
+            for new_table in dependencies[split_table[0]]["Tables"]:
+                return find_column(new_table, column_name)
+        schema, table = split_table if len(split_table) == 2 else (default_schema_name, split_table[0])
+        return translations[schema]["Tables"][table]["Columns"].get(column_name)
+
+    for column in [str(column) for column in ast.find_all(exp.Column)]:
+        split_col = column.replace('"', '').split(".")
+        if len(split_col) == 1:
+            continue
+        table_alias, column_name = split_col
+        new_col_name = column_name
+        table = tables[table_alias]
+        if table.split(".")[0] not in dependencies:
+            new_col_name = find_column(table, column_name) or column_name
+        elif column_name not in dependencies[table]["ColumnsAlias"]:
+            new_col_name = find_column(table, column_name) or column_name
+        query = query.replace(f'"{table_alias}"."{column_name}"', f'"{table_alias}"."{new_col_name}"')
+    for table_alias, table in tables.items():
+        split_table = table.split(".")
+        if len(split_table) == 2 or split_table[0] not in dependencies:
+            schema, table_name = split_table if len(split_table) == 2 else (default_schema_name, split_table[0])
+            if table_name in translations[schema]["Tables"]:
+                query = query.replace(f'"{table_name}"', f'"{translations[schema]["Tables"][table_name]["name"]}"')
+    return query
+
+
+def make_translations(table_count: int, column_count: int) -> dict:
+    return {"public": {"name": "public", "Tables": {
+        f"table_{t}": {"name": f"Table_{t}", "Columns": {f"column_{c}": f"Column_{c}" for c in range(column_count)}}
+        for t in range(table_count)}}}
+
+
+def make_query(cte_count: int, column_count: int) -> str:
+    ctes = []
+    for i in range(cte_count):
+        columns = ", ".join(f"t.column_{c}" for c in range(column_count))
+        ctes.append(f"cte_{i} AS (SELECT {columns}, o.column_1 AS other_{i} FROM public.table_{i} t "
+                    f"JOIN public.table_{i + 1} o ON t.column_0 = o.column_0 WHERE t.column_2 > {i})")
+    joins = " ".join(f"JOIN cte_{i} ON cte_0.column_0 = cte_{i}.column_0" for i in range(1, cte_count))
+    return f"WITH {', '.join(ctes)} SELECT cte_0.column_0, cte_0.column_3 FROM cte_0 {joins}"
+
+
+def seconds_per_call(fn, query: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for i in range(repeat):
+        # a different comment per call keeps recently parsed queries from being reused
+        run_query = f"{query} -- run {i}"
+        start = time.perf_counter()
+        fn(run_query)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    translations = make_translations(100, 30)
+    for cte_count, column_count in [(5, 10), (20, 10), (20, 30), (50, 20)]:
+        query = make_query(cte_count, column_count)
+        before = seconds_per_call(lambda q: former_translate_sql_args(q, translations, "PostgreSQL"), query)
+        optimized = seconds_per_call(lambda q: translate_sql_args(q, translations, "PostgreSQL"), query)
+        plain = seconds_per_call(lambda q: translate_sql_args(q, translations, "PostgreSQL", optimize_query=False),
+                                 query)
+        print(f"{cte_count} ctes, {column_count} columns ({len(query):,} chars): {before * 1000:,.1f} ms before, "
+              f"{optimized * 1000:,.1f} ms with optimizer ({before / optimized:.1f}x), "
+              f"{plain * 1000:,.1f} ms without ({before / plain:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
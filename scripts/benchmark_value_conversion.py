@@ -0,0 +1,73 @@
+"""
+Compares the rows per second of the per value isinstance conversion of query results with the per column converters.
+Run from the repository root: python -m scripts.benchmark_value_conversion
+"""
+import datetime
+import decimal
+import json
+import random
+import time
+
+from app.data_oracle.connectors.value_converters import sqlalchemy_value_converter
+
+
+def convert_value(_input):
+    # conversion applied to every value before the per column converters
+    if isinstance(_input, decimal.Decimal):
+        return float(_input)
+    elif isinstance(_input, datetime.datetime):
+        try:
+            return _input.strftime("%d/%m/%Y %H:%M")
+        except Exception:
+            return str(_input)
+    elif isinstance(_input, datetime.date):
+        return str(_input)
+    else:
+        return _input
+
+
+def make_rows(row_count: int, text_columns: int, numeric_columns: int, temporal_columns: bool) -> list[tuple]:
+    rng = random.Random(0)
+    rows = []
+    for i in range(row_count):
+        row = [i] + [f"value {rng.randint(0, 50)}" for _ in range(text_columns)]
+        row += [rng.random() for _ in range(numeric_columns)]
+        if temporal_columns:
+            row += [decimal.Decimal(rng.randint(0, 10 ** 6)) / 100 if i % 7 else None,
+                    datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i),
+                    datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365)]
+        rows.append(tuple(row))
+    return rows
+
+
+def rows_per_second(fn, rows: list[tuple], batch_size: int = 1000, repeat: int = 3) -> tuple[float, list]:
+    best = float("inf")
+    output = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = []
+        for i in range(0, len(rows), batch_size):
+            output.extend(fn(rows[i:i + batch_size]))
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best, output
+
+
+def per_value(batch: list[tuple]) -> list[list]:
+    return [[convert_value(x) for x in _row] for _row in batch]
+
+
+def main():
+    cases = {
+        "wide, no conversion (40 columns)": make_rows(100_000, 20, 19, False),
+        "wide, decimal/datetime/date (43 columns)": make_rows(100_000, 20, 19, True),
+        "narrow, decimal/datetime/date (6 columns)": make_rows(200_000, 1, 1, True),
+    }
+    for name, rows in cases.items():
+        before, expected = rows_per_second(per_value, rows)
+        after, output = rows_per_second(sqlalchemy_value_converter.convert_rows, rows)
+        assert json.dumps(output) == json.dumps(expected)
+        print(f"{name}: {before:,.0f} rows/s before, {after:,.0f} rows/s after ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.data_oracle import FileConnection
+
+CHINOOK_DB = Path(__file__).parents[1] / "app" / "files" / "sqlite" / "chinook.db"
+
+
+@pytest.fixture
+def sqlite_connection(tmp_path) -> FileConnection:
+    """
+    Connection to a copy of the chinook sample database, tests may change it
+    """
+    db_path = tmp_path / "chinook.db"
+    shutil.copy(CHINOOK_DB, db_path)
+    return FileConnection(path=str(db_path), database_name="chinook")
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.data_oracle import SqlAlchemyConnector, AsyncSqlAlchemyConnector
+from app.data_oracle.query_generation import PipelineSqlGen
+
+
+
+def run_async(connection_data, coroutine_factory):
+    async def scenario():
+        connector = AsyncSqlAlchemyConnector(connection_data)
+        try:
+            return await coroutine_factory(connector)
+        finally:
+            await connector.connection.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_async_scan_matches_sync(sqlite_connection):
+    sync_db = SqlAlchemyConnector(sqlite_connection).scan_db()
+    async_db = run_async(sqlite_connection, lambda connector: connector.ascan_db())
+    assert async_db.return_code_repr_schema() == sync_db.return_code_repr_schema()
+    assert async_db.return_code_repr_schema_normalized() == sync_db.return_code_repr_schema_normalized()
+
+
+def test_async_scan_enums_matches_sync(sqlite_connection):
+    sync_db = SqlAlchemyConnector(sqlite_connection).scan_db(True)
+    async_db = run_async(sqlite_connection, lambda connector: connector.ascan_db(True))
+    assert async_db.return_code_repr_schema() == sync_db.return_code_repr_schema()
+
+
+@pytest.mark.parametrize("query,max_rows", [
+    ("SELECT * FROM invoices", 5),
+    ("SELECT InvoiceDate, Total FROM invoices ORDER BY Total DESC", 3),
+    ("SELECT * FROM albums", None),
+])
+def test_async_execute_matches_sync(sqlite_connection, query, max_rows):
+    sync_res = SqlAlchemyConnector(sqlite_connection).execute_sql_statement(query, max_rows)
+    async_res = run_async(sqlite_connection, lambda connector: connector.aexecute_sql_statement(query, max_rows))
+    assert async_res == sync_res
+
+
+def test_async_execute_autocommit(sqlite_connection):
+    res = run_async(sqlite_connection, lambda connector: connector.aexecute_sql_statement(
+        "UPDATE genres SET Name = 'Async Rock' WHERE GenreId = 1 RETURNING Name", None, True))
+    assert res == [["Name"], ["Async Rock"]]
+    res = SqlAlchemyConnector(sqlite_connection).execute_sql_statement(
+        "SELECT Name FROM genres WHERE GenreId = 1", None)
+    assert res == [["Name"], ["Async Rock"]]
+
+
+def test_async_closing_autocommit_stream_keeps_the_write(sqlite_connection):
+    async def stream_columns(connector):
+        chunks = connector.astream_sql_statement("UPDATE genres SET Name = 'Streamed' RETURNING GenreId", None,
+                                                 True, chunk_size=2)
+        columns = await chunks.__anext__()
+        await chunks.aclose()
+        return columns
+
+    assert run_async(sqlite_connection, stream_columns) == ["GenreId"]
+    res = SqlAlchemyConnector(sqlite_connection).execute_sql_statement(
+        "SELECT COUNT(*) FROM genres WHERE Name <> 'Streamed'", None)
+    assert res == [["COUNT(*)"], [0]]
+
+
+def test_async_pipeline(sqlite_connection):
+    async def scenario(connector):
+        pipeline = PipelineSqlGen(connector, lazy=True)
+        await pipeline.aload_database()
+        return pipeline.return_db_prompt(False), await pipeline.aexecute_sql_statement("SELECT 1 AS one", 10)
+
+    prompt, res = run_async(sqlite_connection, scenario)
+    assert "CREATE TABLE main.albums(" in prompt
+    assert res == [["one"], [1]]
+
+
+def test_async_refresh_reuses_unchanged_layout(sqlite_connection):
+    async def scenario(connector):
+        db = await connector.ascan_db()
+        return db, await connector.arefresh_db(db)
+
+    db, refreshed = run_async(sqlite_connection, scenario)
+    assert refreshed is db
+
+
+def test_async_pipeline_reloads_without_sync_calls(sqlite_connection):
+    async def scenario(connector):
+        pipeline = PipelineSqlGen(connector, lazy=True)
+        with pytest.raises(TypeError):
+            pipeline.db
+        with pytest.raises(TypeError):
+            pipeline.execute_sql_statement("SELECT 1", 10)
+        await pipeline.areload_database()
+        db = pipeline.db
+        await pipeline.aexecute_sql_statement("CREATE TABLE reviews (ReviewId INTEGER PRIMARY KEY)", None, True)
+        await pipeline.areload_database()
+        assert pipeline.db is not db and pipeline.db.schemas[0].tables[0] is db.schemas[0].tables[0]
+        with pytest.raises(TypeError):
+            pipeline.reload_database()
+        await pipeline.areload_database(incremental=False)
+        return pipeline.return_db_prompt(False)
+
+    prompt = run_async(sqlite_connection, scenario)
+    assert "CREATE TABLE main.reviews(" in prompt
@@ -0,0 +1,106 @@
+import datetime
+from types import SimpleNamespace
+
+from app.data_oracle import BigQueryConnection, BigQueryConnector
+
+
+class FakeRow:
+    def __init__(self, keys, values):
+        self._keys = keys
+        self._values = values
+
+    def keys(self):
+        return iter(self._keys)
+
+    def values(self):
+        return tuple(self._values)
+
+
+class FakeRowIterator:
+    """
+    Result of a fake query that honours max_results and page_size like the client library and records which pages
+    were requested
+    """
+
+    def __init__(self, client, rows, page_size, max_results):
+        self.client = client
+        self.rows = rows if max_results is None else rows[:max_results]
+        self.page_size = page_size or len(self.rows) or 1
+        self.schema = [SimpleNamespace(name=name) for name in client.columns]
+
+    @property
+    def pages(self):
+        for start in range(0, len(self.rows), self.page_size):
+            self.client.requested_pages += 1
+            yield iter(FakeRow(self.client.columns, row) for row in self.rows[start:start + self.page_size])
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+
+class FakeClient:
+    columns = ["id", "created"]
+
+    def __init__(self, row_count):
+        self.row_count = row_count
+        self.calls = []
+        self.requested_pages = 0
+
+    def query_and_wait(self, query, page_size=None, max_results=None):
+        self.calls.append({"query": query, "page_size": page_size, "max_results": max_results})
+        if "INFORMATION_SCHEMA" in query:
+            return FakeRowIterator(self, [], page_size, max_results)
+        rows = [[i, datetime.date(2024, 1, 1) + datetime.timedelta(days=i)] for i in range(self.row_count)]
+        return FakeRowIterator(self, rows, page_size, max_results)
+
+
+class FakeBigQueryConnector(BigQueryConnector):
+    def __init__(self, row_count):
+        self.row_count = row_count
+        super().__init__(BigQueryConnection(path_cred="unused.json", project_id="project", dataset_id="dataset"))
+
+    def connect(self, big_query_connection_data):
+        return FakeClient(self.row_count)
+
+
+def test_row_limit_and_page_size_are_passed_to_the_api():
+    connector = FakeBigQueryConnector(100_000)
+    result = connector.execute_sql_statement("SELECT * FROM t", 10)
+    assert connector.connection.calls[-1] == {"query": "SELECT * FROM t", "page_size": 11, "max_results": 11}
+    assert result[0] == ["id", "created"]
+    assert result[1:3] == [[0, "01/01/2024"], [1, "02/01/2024"]]
+    assert len(result) == 12
+    assert connector.connection.requested_pages == 1
+
+
+def test_unlimited_results_are_read_in_pages():
+    connector = FakeBigQueryConnector(25_000)
+    assert len(connector.execute_sql_statement("SELECT * FROM t")) == 25_001
+    assert connector.connection.calls[-1]["max_results"] is None
+    assert connector.connection.requested_pages == 3
+
+
+def test_result_pages_are_lazy():
+    connector = FakeBigQueryConnector(5_000)
+    pages = connector.result_pages("SELECT * FROM t", None, 1_000)
+    assert next(pages) == ["id", "created"]
+    assert len(next(pages)) == 1_000
+    assert connector.connection.requested_pages == 1
+    assert sum(len(page) for page in pages) == 4_000
+    assert connector.connection.requested_pages == 5
+
+
+def test_stream_uses_chunk_size_as_page_size():
+    connector = FakeBigQueryConnector(250)
+    chunks = list(connector.stream_sql_statement("SELECT * FROM t", 199, chunk_size=50))
+    assert connector.connection.calls[-1]["page_size"] == 50
+    assert chunks[0] == ["id", "created"]
+    assert [len(chunk) for chunk in chunks[1:]] == [50, 50, 50, 50]
+    assert chunks[1][0] == [0, "01/01/2024"]
+
+
+def test_empty_result():
+    connector = FakeBigQueryConnector(0)
+    assert connector.execute_sql_statement("SELECT * FROM t", 10) == []
+    assert list(connector.stream_sql_statement("SELECT * FROM t", 10)) == [["id", "created"]]
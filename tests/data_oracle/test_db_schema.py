@@ -372,3 +372,40 @@ def test_proper_translations_map():
                                                                                     'test2': 'Test2'}}}}}
 
     assert real_translation_map == scanned_db.translations_map
+
+
+def test_compact_layout():
+    table_name, column_name, type_name = "".join(["User", "Model"]), "".join(["created", "At"]), "".join(["INT"])
+    first = Table(table_name, None, [Column(column_name, type_name, True)], "Table", [])
+    second = Table("".join(["User", "Model"]), None, [Column("".join(["created", "At"]), "".join(["INT"]))], "Table", [])
+    assert first.name is second.name
+    assert first.columns[0].name is second.columns[0].name and first.columns[0].type is second.columns[0].type
+    assert not hasattr(first.columns[0], "__dict__") and not hasattr(first, "__dict__")
+    assert first.columns[0]._proper_name is None
+    assert first.columns[0].proper_name == "createdat" and first.columns[0].proper_name is second.columns[0].proper_name
+    assert first.filter_list == () and first.filtered_content == ()
+    first.apply_column_name_filter(["createdAt"])
+    assert [column.name for column in first.get_cols()] == ["createdAt"]  # primary keys are never filtered
+    assert second.filter_list == ()
+
+
+def test_rendered_ddl_is_kept_per_table():
+    tables = [Table(f"T{i}", None, [Column("Id", "INTEGER", True), Column("Some Value", "TEXT")], "Table", [])
+              for i in range(3)]
+    scanned_db = Database("test")
+    scanned_db.register_schemas([Schema("Pub", tables)])
+    raw, normalized = scanned_db.render_ddl()
+    assert raw == scanned_db.return_code_repr_schema() and normalized == scanned_db.return_code_repr_schema_normalized()
+    assert "CREATE TABLE pub.t0(\nid INTEGER,\nsome_value TEXT,\nPRIMARY KEY (id)\n)" in normalized
+    rendered = scanned_db.schemas[0].render_table_ddl(True)
+    assert all(a is b for a, b in zip(rendered, scanned_db.schemas[0].render_table_ddl(True)))
+
+    scanned_db.apply_column_name_filter({"Pub": {"T1": ["Some Value"]}})
+    filtered = scanned_db.schemas[0].render_table_ddl(True)
+    assert filtered[0] is rendered[0] and filtered[2] is rendered[2] and filtered[1] is not rendered[1]
+    assert "Some Value" not in filtered[1][0] and "Some Value" in filtered[0][0]
+
+    scanned_db.apply_table_name_filter({"Pub": ["T2"]})
+    assert "T2" not in scanned_db.return_code_repr_schema()
+    scanned_db.release_filters()
+    assert scanned_db.render_ddl() == (raw, normalized)
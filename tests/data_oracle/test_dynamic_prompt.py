@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.data_oracle import Prompt_Type
+from app.data_oracle.db_schema import Column, Table, Schema, Database
+from app.data_oracle.enums import Data_Table_Type
+from app.data_oracle.query_generation import PipelineSqlGen, QuantizedIVFIndex, CachedEmbedder
+
+VOCABULARY = ["album", "artist", "invoice", "customer", "employee", "track", "genre", "playlist"]
+
+
+def keyword_model(texts: list[str]) -> list[np.ndarray]:
+    # one dimension per known word plus a small constant so unknown names are not zero
+    return [np.array([float(word in text.lower()) for word in VOCABULARY] + [0.1]) for text in texts]
+
+
+class MockConnection:
+    def scan_db(self, scan_enums: bool):
+        tables = [Table(name, None, [Column(f"{name}Id", "INTEGER", True), Column("Name", "TEXT")],
+                        Data_Table_Type.TABLE, []) for name in ["Album", "Artist", "Invoice", "Customer", "Employee"]]
+        db = Database("music")
+        db.register_schemas([Schema("main", tables)])
+        return db
+
+
+def test_index_finds_nearest_neighbours():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((2000, 32))
+    index = QuantizedIVFIndex(vectors, n_lists=20)
+    assert index.codes.dtype == np.int8 and sorted(index.ids.tolist()) == list(range(2000))
+    query = vectors[7] + 0.01 * rng.standard_normal(32)
+    ids, scores = index.search(query, 5, n_probe=20)
+    exact = np.argsort(-(vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ (query / np.linalg.norm(query)))
+    assert ids[0] == 7 and set(ids.tolist()) == set(exact[:5].tolist())
+    assert np.all(np.diff(scores) <= 0)
+    assert len(QuantizedIVFIndex(np.zeros((0, 4))).search(np.ones(4), 3)[0]) == 0
+
+
+def test_dynamic_prompt_renders_relevant_tables():
+    pipeline = PipelineSqlGen(MockConnection())
+    with pytest.raises(ValueError):
+        pipeline.generate_prompt("Which artist sold the most albums?", Prompt_Type.DYNAMIC)
+    pipeline.apply_embedding_model(CachedEmbedder(keyword_model, "keywords"))
+    pipeline.dynamic_table_count = 2
+    prompt = pipeline.generate_prompt("Which artist released the most albums?", Prompt_Type.DYNAMIC)
+    database = prompt.split("Database:\n")[1].split("\nQuestion:")[0]
+    assert database.startswith("CREATE SCHEMA main;\n\nCREATE TABLE main.a")
+    assert "CREATE TABLE main.album(" in database and "CREATE TABLE main.artist(" in database
+    assert "invoice" not in database and "customer" not in database
+
+    pipeline.apply_table_name_filter({"main": ["Artist"]})
+    assert "CREATE TABLE main.Artist(" not in pipeline.return_dynamic_db_prompt("artist albums", normalized_names=False)
+    prompt, selection = pipeline.generate_budgeted_prompt("Which albums were sold?", Prompt_Type.DYNAMIC, 10_000)
+    assert selection.tables[0] == "main.Album" and "main.Artist" not in selection.tables + selection.dropped
+    index = pipeline.schema_index
+    pipeline.apply_embedding_model(CachedEmbedder(keyword_model, "keywords"))
+    assert pipeline.schema_index is not index
@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.data_oracle import SqlAlchemyConnector
+from app.data_oracle.query_generation import CachedEmbedder, EmbeddingCache
+
+
+class CountingModel:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts: list[str]) -> list:
+        self.texts.extend(texts)
+        return [np.array([[len(text), text.count("_"), 1.0]]) for text in texts]
+
+
+def test_names_are_embedded_once_and_persisted(tmp_path, sqlite_connection):
+    connection = sqlite_connection
+    cache = EmbeddingCache(tmp_path / "embeddings.db")
+
+    model = CountingModel()
+    db = SqlAlchemyConnector(connection).scan_db()
+    db.apply_batch_embedding_model(CachedEmbedder(model, "model-a", cache), batch_size=8)
+    names = [element.name for element in db.embedding_matrix_elements()]
+    assert sorted(model.texts) == sorted(set(names)) and len(model.texts) < len(names)
+    tables = {table.name: table for table in db.schemas[0].tables}
+    assert tables["albums"].embedding.shape == (3,)
+    album_ids = [column.embedding for table in tables.values() for column in table.columns if column.name == "AlbumId"]
+    assert len(album_ids) == 2 and album_ids[0] is album_ids[1]
+
+    engine = create_engine(f"sqlite:///{connection.path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE reviews (ReviewId INTEGER PRIMARY KEY, AlbumId INTEGER, Stars INTEGER)"))
+    engine.dispose()
+
+    model = CountingModel()
+    embedder = CachedEmbedder(model, "model-a", EmbeddingCache(tmp_path / "embeddings.db"))
+    rescanned = SqlAlchemyConnector(connection).scan_db()
+    rescanned.apply_batch_embedding_model(embedder)
+    assert sorted(model.texts) == ["ReviewId", "Stars", "reviews"]
+    assert embedder.cache_hits == len(set(names))
+    assert rescanned.embedding_matrix.present.all()
+
+    other_model = CountingModel()
+    CachedEmbedder(other_model, "model-b", cache)(["albums", "albums"])
+    assert other_model.texts == ["albums"]
+    assert cache.clear("model-b") == 1
+
+
+def test_embedder_rejects_incomplete_batches(tmp_path):
+    embedder = CachedEmbedder(lambda texts: [np.zeros(2)], "broken")
+    try:
+        embedder(["a", "b"])
+        assert False
+    except ValueError:
+        pass
+    assert embedder.embed("a").dtype == np.float32
+
+
+def test_close_releases_connections_of_all_threads(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.db")
+    worker = threading.Thread(target=cache.set_many, args=("model", {"a": np.ones(2)}))
+    worker.start()
+    worker.join()
+    connections = list(cache._connections)
+    assert len(connections) == 2
+
+    cache.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    assert list(cache.get_many("model", ["a"])) == ["a"]
+    cache.close()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.data_oracle.db_schema import Column, Table, Schema, Database, EmbeddingMatrix
+from app.data_oracle.enums import Data_Table_Type
+
+VECTORS = {"sales": [1, 0, 0], "orders": [1, 0.1, 0], "amount": [0.9, 0.1, 0], "customers": [0, 1, 0],
+           "email": [0, 1, 0.2], "id": [0, 0, 1]}
+
+
+def make_db() -> Database:
+    orders = Table("orders", None, [Column("id", "INT", True), Column("amount", "NUMERIC"), Column("email", "TEXT"),
+                                    Column("note", "TEXT")], Data_Table_Type.TABLE, [])
+    customers = Table("customers", None, [Column("id", "INT", True), Column("email", "TEXT")], Data_Table_Type.TABLE,
+                      [])
+    db = Database("shop")
+    db.register_schemas([Schema("sales", [orders, customers])])
+    db.apply_embedding_model(lambda name: np.array([VECTORS[name]]) if name in VECTORS else None)
+    return db
+
+
+def test_similarities_and_top_k():
+    matrix = EmbeddingMatrix(make_db().schemas[0].tables[0].columns)
+    assert matrix.matrix.flags["C_CONTIGUOUS"] and matrix.matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(matrix.matrix[matrix.present], axis=1), 1)
+    scores = matrix.similarities([2, 0, 0])
+    assert scores.shape == (4,) and scores[3] == 0
+    assert matrix.top_k([0, 2, 0], 10).tolist() == [2, 1, 0]  # the column without embedding is never returned
+    assert matrix.top_k([[1, 0, 0], [0, 0, 1]], 1).tolist() == [[1], [0]]
+    assert matrix.within_distance([[1, 0, 0], [0, 0, 1]], 0.1).tolist() == [[False, True, False, True],
+                                                                             [True, False, False, True]]
+
+
+def test_database_filter_scores_everything_at_once():
+    db = make_db()
+    db.apply_embedding_filter("total sales", np.array([[1, 0, 0]]), 0.2, True)
+    schema = db.schemas[0]
+    assert [table.name for table in schema.get_tables()] == ["orders"]
+    # primary keys and columns without embedding are always kept
+    assert [column.name for column in schema.tables[0].get_cols()] == ["id", "amount", "note"]
+    assert [column.name for column in schema.tables[1].get_cols()] == ["id"]
+    assert db.translations_map["sales"]["Tables"]["orders"]["Columns"] == {"id": "id", "amount": "amount",
+                                                                           "note": "note"}
+
+
+def test_schema_filter_matches_database_filter():
+    db, other = make_db(), make_db()
+    db.apply_embedding_filter("customer mails", np.array([[0, 1, 0]]), 0.3, False)
+    other.schemas[0].apply_embedding_filter("customer mails", np.array([[0, 1, 0]]), 0.3, False)
+    for table, other_table in zip(db.schemas[0].tables, other.schemas[0].tables):
+        assert [column.name for column in table.get_cols()] == [column.name for column in other_table.get_cols()]
+    assert [column.name for column in db.schemas[0].tables[0].get_cols()] == ["id", "email", "note"]
@@ -0,0 +1,83 @@
+import numpy as np
+from sqlalchemy import create_engine, event, text
+
+from app.data_oracle import SqlAlchemyConnector
+from app.data_oracle.query_generation import PipelineSqlGen
+
+
+
+def execute(connection_data, statement):
+    engine = create_engine(f"sqlite:///{connection_data.path}")
+    with engine.begin() as conn:
+        conn.execute(text(statement))
+    engine.dispose()
+
+
+def tables_by_name(db):
+    return {table.name: table for schema in db.schemas for table in schema.tables}
+
+
+def test_scan_records_fingerprints(sqlite_connection):
+    db = SqlAlchemyConnector(sqlite_connection).scan_db()
+    assert db.fingerprint is not None
+    assert all(table.fingerprint is not None for table in tables_by_name(db).values())
+
+
+def test_refresh_without_changes_keeps_layout(sqlite_connection):
+    connector = SqlAlchemyConnector(sqlite_connection)
+    db = connector.scan_db()
+    statements = []
+    event.listen(connector.connection, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert connector.refresh_db(db) is db
+    assert statements == ['PRAGMA database_list', 'PRAGMA "main".schema_version']
+
+
+def test_refresh_only_reflects_changed_tables(sqlite_connection):
+    connector = SqlAlchemyConnector(sqlite_connection)
+    db = connector.scan_db()
+    previous_tables = tables_by_name(db)
+    execute(sqlite_connection, "ALTER TABLE artists ADD COLUMN Country NVARCHAR(40)")
+    execute(sqlite_connection, "CREATE TABLE labels (LabelId INTEGER PRIMARY KEY, Name NVARCHAR(120))")
+    execute(sqlite_connection, "DROP TABLE playlist_track")
+
+    refreshed = SqlAlchemyConnector(sqlite_connection).refresh_db(db)
+    current_tables = tables_by_name(refreshed)
+    assert [column.name for column in current_tables["artists"].columns] == ["ArtistId", "Name", "Country"]
+    assert "labels" in current_tables and "playlist_track" not in current_tables
+    for name, table in current_tables.items():
+        if name not in ("artists", "labels"):
+            assert table is previous_tables[name]
+    assert refreshed.return_code_repr_schema() == SqlAlchemyConnector(sqlite_connection).scan_db() \
+        .return_code_repr_schema()
+
+
+def test_refresh_keeps_filters_and_embeddings(sqlite_connection):
+    connector = SqlAlchemyConnector(sqlite_connection)
+    db = connector.scan_db()
+    db.apply_embedding_model(lambda name: np.full((1, 3), len(name), dtype=float))
+    db.apply_column_name_filter({"main": {"artists": ["Name"], "albums": ["Title"]}})
+    db.apply_table_name_filter({"main": ["genres"]})
+    execute(sqlite_connection, "ALTER TABLE artists ADD COLUMN Country NVARCHAR(40)")
+
+    refreshed = SqlAlchemyConnector(sqlite_connection).refresh_db(db)
+    schema = refreshed.schemas[0]
+    assert "genres" in schema.get_filtered_tables()
+    tables = tables_by_name(refreshed)
+    assert [column.name for column in tables["artists"].get_cols()] == ["ArtistId", "Country"]
+    assert [column.name for column in tables["albums"].get_cols()] == ["AlbumId", "ArtistId"]
+    artist_columns = {column.name: column for column in tables["artists"].columns}
+    assert artist_columns["Name"].embedding is not None
+    assert artist_columns["Country"].embedding is None
+    assert tables["artists"].embedding is not None
+
+
+def test_pipeline_reload_is_incremental(sqlite_connection):
+    pipeline = PipelineSqlGen(SqlAlchemyConnector(sqlite_connection))
+    db = pipeline.db
+    pipeline.reload_database()
+    assert pipeline.db is db
+    execute(sqlite_connection, "ALTER TABLE genres ADD COLUMN Description TEXT")
+    pipeline.reload_database()
+    assert pipeline.db is not db
+    assert "Description" in [column.name for column in tables_by_name(pipeline.db)["genres"].columns]
+    assert tables_by_name(pipeline.db)["tracks"] is tables_by_name(db)["tracks"]
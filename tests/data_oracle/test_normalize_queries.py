@@ -1,3 +1,4 @@
+from app.data_oracle.db_schema import utils
 from app.data_oracle.db_schema.utils import translate_sql_args
 
 big_translation_map = {'public': {'name': 'public', 'Tables': {'usermodel': {'name': 'UserModel',
@@ -255,3 +256,47 @@ def test_with_schemas2():
 
     assert translate_sql_args(sql_query_complex2, big_translation_map,
                               "PostgreSQL") == '''WITH "active_chat_messages" AS (SELECT * FROM "public"."ChatMessage" AS "ChatMessage" WHERE "ChatMessage"."is_error" = FALSE) SELECT * FROM "active_chat_messages" AS "active_chat_messages" JOIN "public"."Chat" AS "Chat" ON "active_chat_messages"."chatId" = "Chat"."id" JOIN "public"."UserModel" AS "UserModel" ON "Chat"."userModelId" = "UserModel"."id"'''
+
+
+def test_without_optimizer_keeps_structure():
+    sql_query = """WITH recent AS (SELECT * FROM public.chatmessage WHERE is_error = FALSE)
+        SELECT c.title, recent.chatid, count(*) AS messages
+        FROM recent JOIN chat c ON recent.chatid = c.id
+        WHERE c.usermodelid IN (SELECT id FROM public.usermodel WHERE createdat > '2024-01-01')
+        GROUP BY c.title, recent.chatid ORDER BY messages DESC"""
+
+    assert translate_sql_args(sql_query, big_translation_map, "PostgreSQL", optimize_query=False) == (
+        'WITH recent AS (SELECT * FROM public."ChatMessage" WHERE is_error = FALSE) '
+        'SELECT c.title, recent."chatId" AS chatid, COUNT(*) AS messages FROM recent JOIN "Chat" AS c ON recent."chatId" = c.id '
+        'WHERE c."userModelId" IN (SELECT id FROM public."UserModel" WHERE "createdAt" > \'2024-01-01\') '
+        'GROUP BY c.title, recent."chatId" ORDER BY messages DESC')
+
+
+def test_without_optimizer_keeps_output_names():
+    sql_query = "SELECT u.createdat, usermodel.usermodelid FROM public.usermodel u, files usermodel"
+
+    assert translate_sql_args(sql_query, big_translation_map, "PostgreSQL", optimize_query=False) == (
+        'SELECT u."createdAt" AS createdat, usermodel."userModelId" AS usermodelid '
+        'FROM public."UserModel" AS u, "Files" AS usermodel')
+
+
+def test_translated_query_is_not_parsed_again(monkeypatch):
+    translated = translate_sql_args("SELECT createdat FROM report", big_translation_map, "PostgreSQL",
+                                    optimize_query=False)
+    assert translated == 'SELECT "createdAt" AS createdat FROM "Report"'
+
+    def parse(*args, **kwargs):
+        raise AssertionError("query parsed again")
+
+    monkeypatch.setattr(utils, "parse", parse)
+    assert utils.is_read_query(translated, "PostgreSQL")
+    assert utils.canonicalize_read_query(translated, "PostgreSQL") == translated
+
+
+def test_writing_and_locking_selects_are_no_read_queries():
+    for query in ["WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d",
+                  "WITH i AS (INSERT INTO t (a) VALUES (1) RETURNING a) SELECT a FROM i",
+                  "SELECT * FROM t FOR UPDATE",
+                  "SELECT * FROM (SELECT * FROM t FOR SHARE) AS s"]:
+        assert not utils.is_read_query(query, "PostgreSQL")
+        assert utils.canonicalize_read_query(query, "PostgreSQL") is None
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+
+from app.data_oracle import BaseDBConnector, FileConnection, SqlAlchemyConnector
+from app.data_oracle.db_schema import Column, Table
+
+
+class SlowCatalogConnector(BaseDBConnector):
+    """
+    Connector with a fake catalog whose calls take a random amount of time and which records how many calls run
+    at the same time
+    """
+    max_reflection_workers = 3
+
+    def __init__(self):
+        super().__init__(FileConnection(path="unused", database_name="slow"))
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def connect(self, connection_data):
+        return None
+
+    def catalog_call(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(random.uniform(0, 0.005))
+        with self.lock:
+            self.active -= 1
+
+    def return_schema_names(self) -> list[str]:
+        return [f"schema_{i}" for i in range(4)] + ["empty"]
+
+    def return_table_names(self, schema_name: str) -> list[str]:
+        self.catalog_call()
+        return [] if schema_name == "empty" else [f"table_{i}" for i in range(7)]
+
+    def return_view_names(self, schema_name: str) -> list[str]:
+        self.catalog_call()
+        return [] if schema_name == "empty" else [f"view_{i}" for i in range(2)]
+
+    def return_table_columns(self, schema_name, table_name, _table_type, scan_enums) -> Table:
+        self.catalog_call()
+        return Table(table_name, None, [Column(f"{schema_name}_{table_name}_id", "INTEGER", True)], _table_type, [])
+
+
+def test_parallel_reflection_matches_sequential():
+    sequential = SlowCatalogConnector().scan_db()
+    connector = SlowCatalogConnector()
+    connector.set_reflection_parallelism(8, 2)
+    parallel = connector.scan_db()
+    assert [schema.name for schema in parallel.schemas] == [f"schema_{i}" for i in range(4)]
+    assert parallel.return_code_repr_schema() == sequential.return_code_repr_schema()
+
+
+def test_parallel_reflection_respects_connector_limit():
+    connector = SlowCatalogConnector()
+    connector.set_reflection_parallelism(16, 1)
+    connector.scan_db()
+    assert 1 < connector.max_active <= SlowCatalogConnector.max_reflection_workers
+
+
+def test_sequential_reflection_by_default():
+    connector = SlowCatalogConnector()
+    connector.scan_db()
+    assert connector.max_active == 1
+
+
+def test_parallel_sqlalchemy_scan_matches_sequential(sqlite_connection):
+    sequential = SqlAlchemyConnector(sqlite_connection).scan_db(True)
+    connector = SqlAlchemyConnector(sqlite_connection)
+    connector.set_reflection_parallelism(4, 3)
+    assert connector.max_reflection_workers == 5
+    parallel = connector.scan_db(True)
+    assert parallel.return_code_repr_schema() == sequential.return_code_repr_schema()
+
+
+def test_parallel_scan_keeps_keys_of_same_named_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, _):
+        dbapi_connection.execute(f"ATTACH DATABASE '{tmp_path / 'other.db'}' AS other")
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, uid INTEGER)"))
+        conn.execute(text("CREATE TABLE other.groups (gid INTEGER PRIMARY KEY)"))
+        conn.execute(text("CREATE TABLE other.users (id INTEGER, uid INTEGER PRIMARY KEY, "
+                          "gid INTEGER REFERENCES groups(gid))"))
+    connection_data = FileConnection(path=str(tmp_path / "main.db"), database_name="main")
+    for workers in (1, 4):
+        connector = SqlAlchemyConnector(connection_data, engine)
+        connector.set_reflection_parallelism(workers)
+        db = connector.scan_db()
+        keys = {(schema.name, column.name): (column.is_pk, column.is_fk) for schema in db.schemas
+                for table in schema.tables if table.name == "users" for column in table.columns}
+        assert keys == {("main", "id"): (True, False), ("main", "uid"): (False, False),
+                        ("other", "id"): (False, False), ("other", "uid"): (True, False),
+                        ("other", "gid"): (False, True)}
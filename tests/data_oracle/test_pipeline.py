@@ -70,3 +70,36 @@ def test_pipeline_table_apply_filter():
     assert {"pubmore": {"Test2", "T1", "T2", "T3"}} == {schema.name: {x.name for x in schema.get_tables()}
                                                         for schema in
                                                         pipeline.db.get_schemas()}
+
+
+class CountingMockConnection():
+    def __init__(self):
+        self.scan_count = 0
+        self.executed = []
+
+    def scan_db(self, boolean: bool):
+        self.scan_count += 1
+        scanned_db = Database("test")
+        scanned_db.register_schemas([Schema("pub", [Table("T1", None, [Column("Col1", "INTEGER")], "Table", [])])])
+        return scanned_db
+
+    def execute_sql_statement(self, _sql, _max_rows, autocommit=False):
+        self.executed.append(_sql)
+        return [["Col1"], [1]]
+
+
+def test_lazy_pipeline_skips_scan_for_execution():
+    mock_conn = CountingMockConnection()
+    pipeline = PipelineSqlGen(mock_conn, lazy=True)
+    assert pipeline.execute_sql_statement("SELECT 1", 10) == [["Col1"], [1]]
+    assert mock_conn.scan_count == 0
+    assert not pipeline.is_loaded
+
+
+def test_lazy_pipeline_loads_on_first_access():
+    mock_conn = CountingMockConnection()
+    pipeline = PipelineSqlGen(mock_conn, lazy=True)
+    assert "CREATE TABLE pub.T1" in pipeline.return_db_prompt(False)
+    pipeline.return_db_prompt(True)
+    assert mock_conn.scan_count == 1
+    assert pipeline.is_loaded
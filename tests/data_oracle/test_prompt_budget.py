@@ -0,0 +1,47 @@
+from app.data_oracle import SqlAlchemyConnector, Prompt_Type
+from app.data_oracle.db_schema import Column, Table, Schema, Foreign_Key_Relation
+from app.data_oracle.enums import Data_Table_Type
+from app.data_oracle.query_generation import PipelineSqlGen, estimate_tokens, select_tables
+
+
+def make_table(name: str, references: list[str] = ()) -> Table:
+    columns = [Column(f"{name}_id", "INTEGER", True)] + [Column(f"{x}_id", "INTEGER", _is_fk=True) for x in references]
+    return Table(name, None, columns, Data_Table_Type.TABLE,
+                 [Foreign_Key_Relation([f"{x}_id"], x, "main", [f"{x}_id"]) for x in references])
+
+
+def test_token_estimate():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("CREATE TABLE main.album(") == 9
+    assert estimate_tokens("a  b\n\nc") == 3
+
+
+def test_joinable_tables_are_kept_first():
+    orders, customers, logs = make_table("orders", ["customers"]), make_table("customers"), make_table("logs")
+    schema = Schema("main", [logs, customers, orders])
+    tables = [(schema, table) for table in schema.tables]
+    selection = select_tables(tables, [0.3, 0.0, 0.9], 10_000)
+    assert selection.tables == ["main.orders", "main.customers", "main.logs"] and selection.dropped == []
+    assert selection.tokens == estimate_tokens(selection.prompt)
+
+    budget = estimate_tokens("CREATE SCHEMA main;") + sum(estimate_tokens(x.code_representation_str("main", True))
+                                                        for x in [orders, customers])
+    selection = select_tables(tables, [0.3, 0.0, 0.9], budget)
+    assert selection.tables == ["main.orders", "main.customers"] and selection.dropped == ["main.logs"]
+    assert selection.prompt.startswith("CREATE SCHEMA main;\n\nCREATE TABLE main.orders(")
+    assert select_tables(tables, [0.3, 0.0, 0.9], 3) == ("", [], ["main.orders", "main.logs", "main.customers"], 0)
+
+
+def test_budgeted_prompt(sqlite_connection):
+    pipeline = PipelineSqlGen(SqlAlchemyConnector(sqlite_connection))
+    question = "Which genre has the most tracks?"
+    full_prompt = pipeline.generate_prompt(question, Prompt_Type.ZERO_SHOT)
+    prompt, selection = pipeline.generate_budgeted_prompt(question, Prompt_Type.ZERO_SHOT, 10_000)
+    assert selection.dropped == [] and estimate_tokens(prompt) == estimate_tokens(full_prompt)
+
+    prompt, selection = pipeline.generate_budgeted_prompt(question, Prompt_Type.ZERO_SHOT, 300)
+    assert estimate_tokens(prompt) <= 300
+    assert selection.tables == ["main.tracks", "main.genres"]
+    assert len(selection.dropped) == 9 and selection.dropped[0] == "main.albums"
+    assert prompt == pipeline.generate_prompt(question, Prompt_Type.ZERO_SHOT, token_budget=300)
+    assert "CREATE TABLE main.albums(" not in prompt and prompt.endswith("Answer: SELECT ")
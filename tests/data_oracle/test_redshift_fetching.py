@@ -0,0 +1,137 @@
+import re
+
+import pytest
+
+from app.data_oracle import RedshiftConnection, RedshiftConnector
+
+
+class FakeCursor:
+    """
+    Cursor of a fake cluster with a single table. Like the driver it buffers the complete result of a statement,
+    FETCH statements on a declared cursor only produce the requested rows
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql):
+        self.connection.statements.append(sql)
+        if declare := re.match(r"DECLARE (\w+) CURSOR FOR (.*)", sql, re.S):
+            self.connection.cursors[declare.group(1)] = self.connection.query(declare.group(2))
+            self.description, self._rows = None, []
+        elif fetch := re.match(r"FETCH FORWARD (\d+) FROM (\w+)", sql):
+            count, rows = int(fetch.group(1)), self.connection.cursors[fetch.group(2)]
+            assert count <= RedshiftConnector.max_cursor_fetch_size
+            self._rows = [row for _, row in zip(range(count), rows)]
+            self.description = self.connection.description
+        elif close := re.match(r"CLOSE (\w+)", sql):
+            del self.connection.cursors[close.group(1)]
+        elif sql.startswith("INSERT"):
+            self.description, self._rows = None, []
+        else:
+            self._rows = list(self.connection.query(sql))
+            self.description = self.connection.description
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return tuple(rows)
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+
+class FakeConnection:
+    description = [("id", 23), ("name", 1043)]
+
+    def __init__(self, row_count):
+        self.row_count = row_count
+        self.produced = 0
+        self.autocommit = False
+        self.commits = 0
+        self.statements = []
+        self.cursors = {}
+
+    def query(self, sql):
+        for i in range(self.row_count):
+            self.produced += 1
+            yield [i, f"name {i}"]
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class FakeRedshiftConnector(RedshiftConnector):
+    def __init__(self, row_count):
+        self.row_count = row_count
+        super().__init__(RedshiftConnection(host="localhost", database="dev", user="user", password="password"))
+
+    def connect(self, redshift_connection_data):
+        return FakeConnection(self.row_count)
+
+
+def test_execute_stops_fetching_at_max_rows():
+    connector = FakeRedshiftConnector(50_000)
+    result = connector.execute_sql_statement("SELECT id, name FROM big_table;", 10)
+    assert result[0] == ["id", "name"]
+    assert result[1:] == [[i, f"name {i}"] for i in range(11)]
+    assert connector.connection.produced == 11
+    assert connector.connection.statements[-1].startswith("CLOSE ")
+    assert connector.connection.cursors == {}
+
+
+def test_execute_without_limit_reads_all_rows_in_batches():
+    connector = FakeRedshiftConnector(2_500)
+    result = connector.execute_sql_statement("SELECT id, name FROM big_table", None, autocommit=True)
+    assert len(result) == 2_501
+    fetches = [x for x in connector.connection.statements if x.startswith("FETCH")]
+    assert len(fetches) == 4
+    assert connector.connection.commits == 1
+
+
+def test_stream_yields_chunks():
+    connector = FakeRedshiftConnector(1_000)
+    chunks = list(connector.stream_sql_statement("WITH t AS (SELECT * FROM big_table) SELECT * FROM t", 249,
+                                                 chunk_size=100))
+    assert chunks[0] == ["id", "name"]
+    assert [len(chunk) for chunk in chunks[1:]] == [100, 100, 50]
+    assert connector.connection.produced == 250
+
+
+def test_closing_stream_closes_cursor():
+    connector = FakeRedshiftConnector(1_000)
+    chunks = connector.stream_sql_statement("SELECT id, name FROM big_table", None, chunk_size=10)
+    next(chunks)
+    next(chunks)
+    chunks.close()
+    assert connector.connection.produced == 10
+    assert connector.connection.cursors == {}
+
+
+def test_empty_result_keeps_column_names():
+    connector = FakeRedshiftConnector(0)
+    assert connector.execute_sql_statement("SELECT id, name FROM big_table", 10) == [["id", "name"]]
+
+
+@pytest.mark.parametrize("sql", ["SELECT 1; SELECT 2", "INSERT INTO big_table VALUES (1, 'a')"])
+def test_other_statements_are_executed_directly(sql):
+    connector = FakeRedshiftConnector(5)
+    connector.execute_sql_statement(sql, 2)
+    assert connector.connection.statements == [sql]
+
+
+def test_autocommit_connection_is_executed_directly():
+    connector = FakeRedshiftConnector(5)
+    connector.connection.autocommit = True
+    assert len(connector.execute_sql_statement("SELECT id, name FROM big_table", 2)) == 4
+    assert connector.connection.statements == ["SELECT id, name FROM big_table"]
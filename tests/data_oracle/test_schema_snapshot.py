@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from app.data_oracle.db_schema import Column, Table, Schema, Database, Foreign_Key_Relation
+from app.data_oracle.db_schema.snapshot import dumps_json, loads_json, dumps_binary, loads_binary, snapshot_dict, \
+    write_snapshot, open_snapshot, SnapshotReader, SnapshotFormatError, SNAPSHOT_VERSION
+from app.data_oracle.enums import Data_Table_Type
+
+
+def build_db() -> Database:
+    artists = Table("Artists", "pk_artists", [Column("ArtistId", "INTEGER", True),
+                                              Column("Genre", "Enum", _enums=["rock, pop", "jazz", 'say "hi"']),
+                                              Column("Name " * 20, "NVARCHAR(120)")], Data_Table_Type.TABLE, [])
+    artists.fingerprint = "abc"
+    albums = Table("Albums", None, [Column("AlbumId", "INTEGER", True), Column("ArtistId", "INTEGER", _is_fk=True)],
+                   Data_Table_Type.TABLE, [Foreign_Key_Relation({"ArtistId"}, "Artists", "Music", ["ArtistId"])])
+    view = Table("Artist Albums", None, [Column(f"col_{i}", "TEXT") for i in range(40)], Data_Table_Type.VIEW, [])
+    db = Database("chinook")
+    db.register_schemas([Schema("Music", [artists, albums, view]), Schema("empty", [])])
+    db.fingerprint = "db-fingerprint"
+    return db
+
+
+def test_json_roundtrip_keeps_layout():
+    db = build_db()
+    restored = loads_json(dumps_json(db))
+    assert snapshot_dict(restored) == snapshot_dict(db)
+    tables = {table.name: table for table in restored.schemas[0].tables}
+    assert tables["Artist Albums"].type == Data_Table_Type.VIEW
+    assert tables["Artists"].columns[1].enums == ["rock, pop", "jazz", 'say "hi"']
+    assert tables["Albums"].fk_relations[0].referred_schema == "Music"
+    assert restored.fingerprint == "db-fingerprint" and tables["Artists"].fingerprint == "abc"
+    assert restored.return_code_repr_schema() == db.return_code_repr_schema()
+
+
+def test_binary_roundtrip_keeps_layout():
+    db = build_db()
+    data = dumps_binary(db)
+    assert len(data) < len(dumps_json(db))
+    assert snapshot_dict(loads_binary(data)) == snapshot_dict(db)
+
+
+def test_reload_from_json_snapshot():
+    db = Database("chinook")
+    db.reload_from_cache(dumps_json(build_db()))
+    assert snapshot_dict(db) == snapshot_dict(build_db())
+    assert db.translations_map["music"]["Tables"]["artist_albums"]["name"] == "Artist Albums"
+
+
+def test_memory_mapped_snapshot_is_read_lazily(tmp_path):
+    path = tmp_path / "chinook.snapshot"
+    write_snapshot(build_db(), str(path))
+    with open_snapshot(str(path)) as reader:
+        assert reader.schema_names == ["Music", "empty"]
+        assert reader.table_names("Music") == ["Artists", "Albums", "Artist Albums"]
+        assert [column.name for column in reader.table("Music", "Albums").columns] == ["AlbumId", "ArtistId"]
+        db = reader.database(["Music"])
+        assert [schema.name for schema in db.schemas] == ["Music"]
+        assert snapshot_dict(db)["schemas"] == snapshot_dict(build_db())["schemas"][:1]
+
+
+def test_unsupported_versions_are_rejected():
+    snapshot = json.loads(dumps_json(build_db()))
+    snapshot["version"] = SNAPSHOT_VERSION + 1
+    with pytest.raises(SnapshotFormatError):
+        loads_json(json.dumps(snapshot))
+    with pytest.raises(SnapshotFormatError):
+        SnapshotReader(b"CREATE SCHEMA main;")
@@ -0,0 +1,110 @@
+from sqlalchemy import create_engine, event, inspect, text
+
+from app.data_oracle import FileConnection, SqlAlchemyConnector
+from app.data_oracle.connectors import sqlalchemy_reflection
+from app.data_oracle.connectors.sqlalchemy_reflection import reflect_schema, supports_multi_reflection, \
+    supports_bulk_reflection
+
+
+
+def per_table_reflection(inspection, schema_name, table_name):
+    columns = [(c["name"], str(c["type"]), c["nullable"]) for c in inspection.get_columns(table_name, schema_name)]
+    fks = [(x["constrained_columns"], x["referred_table"], x["referred_schema"], x["referred_columns"])
+           for x in inspection.get_foreign_keys(table_name, schema_name)]
+    return columns, inspection.get_pk_constraint(table_name, schema_name), fks
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_sqlite_uses_bulk_queries():
+    assert not supports_multi_reflection(create_engine("sqlite://").dialect)
+
+
+def test_bulk_reflection_matches_per_table(sqlite_connection):
+    engine = create_engine(f"sqlite:///{sqlite_connection.path}")
+    inspection = inspect(engine)
+    with engine.connect() as conn:
+        reflection = reflect_schema(inspect(engine), conn, "main")
+    assert reflection.tables == inspection.get_table_names("main")
+    assert reflection.views == inspection.get_view_names("main")
+    for table_name in reflection.tables + reflection.views:
+        columns, pk, fks = per_table_reflection(inspection, "main", table_name)
+        assert [(c["name"], str(c["type"]), c["nullable"]) for c in reflection.columns[table_name]] == columns
+        assert reflection.pk_constraint(table_name) == pk
+        assert [(x["constrained_columns"], x["referred_table"], x["referred_schema"], x["referred_columns"])
+                for x in reflection.foreign_keys.get(table_name, [])] == fks
+
+
+def test_bulk_reflection_fk_without_referred_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fk.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE parent (a INTEGER, b INTEGER, CONSTRAINT pk_parent PRIMARY KEY (a, b))"))
+        conn.execute(text("CREATE TABLE child (id INTEGER PRIMARY KEY, x INTEGER, y INTEGER, "
+                          "FOREIGN KEY (x, y) REFERENCES parent)"))
+    with engine.connect() as conn:
+        reflection = reflect_schema(inspect(engine), conn, "main")
+    assert reflection.pk_constraint("parent") == {"constrained_columns": ["a", "b"], "name": "pk_parent"}
+    assert reflection.foreign_keys["child"][0]["referred_columns"] == ["a", "b"]
+    assert reflection.pk_constraint("child")["constrained_columns"] == ["id"]
+
+
+def test_catalog_queries_do_not_grow_with_tables(tmp_path):
+    def scan_statements(table_count):
+        engine = create_engine(f"sqlite:///{tmp_path / f'db_{table_count}.db'}")
+        with engine.begin() as conn:
+            for i in range(table_count):
+                conn.execute(text(f"CREATE TABLE t{i} (id INTEGER PRIMARY KEY, name TEXT, "
+                                  f"parent_id INTEGER REFERENCES t0 (id))"))
+        statements = count_statements(engine)
+        connector = SqlAlchemyConnector(FileConnection(path=str(tmp_path / f"db_{table_count}.db"),
+                                                       database_name="db"), engine)
+        db = connector.scan_db()
+        assert len(db.schemas[0].tables) == table_count
+        return len(statements)
+
+    assert scan_statements(3) == scan_statements(40)
+
+
+def test_scan_db_uses_bulk_reflection(sqlite_connection):
+    connector = SqlAlchemyConnector(sqlite_connection)
+    statements = count_statements(connector.connection)
+    db = connector.scan_db()
+    assert len(statements) < 10
+    tracks = next(table for table in db.schemas[0].tables if table.name == "tracks")
+    assert {fk.referred_table for fk in tracks.fk_relations} == {"albums", "genres", "media_types"}
+
+
+def summarize(reflection):
+    columns = {table: [(c["name"], str(c["type"]), c["nullable"]) for c in cols]
+               for table, cols in reflection.columns.items()}
+    fks = {table: [(x["constrained_columns"], x["referred_table"], x["referred_columns"]) for x in table_fks]
+           for table, table_fks in reflection.foreign_keys.items() if table_fks}
+    return reflection.tables, reflection.views, columns, reflection.pk_constraints, fks
+
+
+def test_bulk_reflection_falls_back_to_inspector(sqlite_connection, monkeypatch):
+    engine = create_engine(f"sqlite:///{sqlite_connection.path}")
+    statements = count_statements(engine)
+    with engine.connect() as conn:
+        expected = summarize(reflect_schema(inspect(engine), conn, "main"))
+    bulk_statements = len(statements)
+
+    # a dialect member used by the bulk reflector was removed
+    monkeypatch.setitem(sqlalchemy_reflection.private_dialect_members, "sqlite", ("_removed_member",))
+    assert not supports_bulk_reflection(engine.dialect)
+    with engine.connect() as conn:
+        assert summarize(reflect_schema(inspect(engine), conn, "main")) == expected
+    assert len(statements) - bulk_statements > bulk_statements
+
+    # a dialect member changed its signature
+    def changed_signature(*args):
+        raise TypeError("_get_column_info() takes 8 positional arguments but 9 were given")
+
+    monkeypatch.undo()
+    monkeypatch.setitem(sqlalchemy_reflection.bulk_reflectors, "sqlite", changed_signature)
+    with engine.connect() as conn:
+        assert summarize(reflect_schema(inspect(engine), conn, "main")) == expected
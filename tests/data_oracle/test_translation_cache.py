@@ -0,0 +1,56 @@
+from app.data_oracle import SqlAlchemyConnector
+from app.data_oracle.db_schema import TranslationCache, translate_sql_args, translations_version
+from app.data_oracle.query_generation import PipelineSqlGen
+
+
+translations = {'public': {'name': 'public', 'Tables': {
+    'usermodel': {'name': 'UserModel', 'Columns': {'id': 'id', 'createdat': 'createdAt'}},
+    'chat': {'name': 'Chat', 'Columns': {'id': 'id', 'usermodelid': 'userModelId'}}}}}
+
+
+def test_hit_returns_translation():
+    cache = TranslationCache()
+    query = "SELECT c.id FROM public.chat c JOIN public.usermodel u ON c.usermodelid = u.id"
+    expected = translate_sql_args(query, translations, "PostgreSQL")
+    assert cache.translate(query, translations, "PostgreSQL") == expected
+    assert cache.translate(f"  {query}\n", translations, "PostgreSQL") == expected
+    assert cache.metrics() == {"entries": 1, "max_entries": 1024, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_key_includes_dialect_and_version():
+    cache = TranslationCache()
+    query = "SELECT createdat FROM public.usermodel"
+    cache.translate(query, translations, "PostgreSQL")
+    cache.translate(query, translations, "MySQL")
+    renamed = {'public': {'name': 'public', 'Tables': {
+        'usermodel': {'name': 'Users', 'Columns': {'createdat': 'created_at'}}}}}
+    assert translations_version(renamed) != translations_version(translations)
+    assert '"Users"."created_at"' in cache.translate(query, renamed, "PostgreSQL")
+    assert cache.hits == 0 and len(cache) == 3
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TranslationCache(max_entries=2)
+    queries = [f"SELECT id FROM public.chat WHERE id = {i}" for i in range(3)]
+    cache.translate(queries[0], translations, "PostgreSQL")
+    cache.translate(queries[1], translations, "PostgreSQL")
+    cache.translate(queries[0], translations, "PostgreSQL")
+    cache.translate(queries[2], translations, "PostgreSQL")
+    assert len(cache) == 2
+    cache.translate(queries[0], translations, "PostgreSQL")
+    cache.translate(queries[1], translations, "PostgreSQL")
+    assert cache.hits == 2 and cache.misses == 4
+
+
+def test_pipeline_translation_follows_filters(sqlite_connection):
+    pipeline = PipelineSqlGen(SqlAlchemyConnector(sqlite_connection))
+    translations_before, version_before = pipeline.translations()
+    assert pipeline.translations()[1] == version_before
+    query = "SELECT name FROM main.genres"
+    translated = pipeline.normalize_query(query)
+    assert pipeline.normalize_query(query) == translated
+
+    pipeline.apply_column_name_filter({"main": {"genres": ["Name"]}})
+    translations_after, version_after = pipeline.translations()
+    assert version_after != version_before
+    assert "name" not in translations_after["main"]["Tables"]["genres"]["Columns"]
@@ -0,0 +1,59 @@
+import pickle
+
+from app.data_oracle.db_schema import Column, Table, Schema, Database, TranslationIndex
+from app.data_oracle.enums import Data_Table_Type
+
+
+def make_db() -> Database:
+    users = Table("UserModel", None, [Column("id", "INT", True), Column("createdAt", "TIMESTAMP"),
+                                      Column("First Name", "TEXT")], Data_Table_Type.TABLE, [])
+    chats = Table("Chat", None, [Column("id", "INT", True), Column("userModelId", "INT"), Column("Title", "TEXT"),
+                                 Column("title", "TEXT")], Data_Table_Type.TABLE, [])
+    db = Database("app")
+    db.register_schemas([Schema("Public", [users, chats])])
+    return db
+
+
+def test_lookups_in_both_directions():
+    index = make_db().translation_index
+    assert index.raw_name("public") == "Public"
+    assert index.raw_name("public", "usermodel") == "UserModel"
+    assert index.resolve("public.usermodel.first_name") == "First Name"
+    assert index.proper_name("Public", "UserModel", "createdAt") == "createdat"
+    assert index.resolve("public.usermodel.unknown") is None
+
+
+def test_translations_map_matches_layout():
+    db = make_db()
+    assert db.translations_map == {schema.proper_name: schema.translations_map for schema in db.schemas}
+
+
+def test_collisions_are_detected():
+    index = make_db().translation_index
+    assert index.collisions == {("public", "chat", "title"): ("Title", "title")}
+    assert index.resolve("public.chat.title") == "title"
+
+
+def test_column_filters_update_index():
+    db = make_db()
+    version = db.translation_index.version
+    db.apply_column_name_filter({"Public": {"UserModel": ["createdAt"], "Chat": ["title"]}})
+    index = db.translation_index
+    assert index.version != version
+    assert index.resolve("public.usermodel.createdat") is None
+    assert index.proper_name("Public", "UserModel", "createdAt") is None
+    assert index.collisions == {}
+    rebuilt = TranslationIndex(db.schemas)
+    assert (index.to_raw, index.to_proper, index.translations_map, index.version) == \
+           (rebuilt.to_raw, rebuilt.to_proper, rebuilt.translations_map, rebuilt.version)
+
+    db.release_filters()
+    assert db.translation_index.version == version
+
+
+def test_index_is_not_pickled():
+    db = make_db()
+    db.translation_index
+    restored = pickle.loads(pickle.dumps(db))
+    assert restored._translation_index is None
+    assert restored.translations_map == db.translations_map
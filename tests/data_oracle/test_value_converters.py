@@ -0,0 +1,60 @@
+import datetime
+import decimal
+import json
+
+from sqlalchemy import create_engine, text
+
+from app.data_oracle import SqlAlchemyConnector
+from app.data_oracle.connectors.value_converters import sqlalchemy_value_converter, bigquery_value_converter
+
+
+def legacy_convert_value(_input, date_format=None):
+    if isinstance(_input, decimal.Decimal):
+        return float(_input)
+    elif isinstance(_input, datetime.datetime):
+        try:
+            return _input.strftime("%d/%m/%Y %H:%M")
+        except Exception:
+            return str(_input)
+    elif isinstance(_input, datetime.date):
+        return _input.strftime(date_format) if date_format else str(_input)
+    return _input
+
+
+class Timestamp(datetime.datetime):
+    pass
+
+
+ROWS = [
+    (1, "a", decimal.Decimal("1.50"), datetime.datetime(2024, 5, 1, 13, 7), datetime.date(2024, 5, 1), None),
+    (2, "b", None, Timestamp(1999, 1, 2, 3, 4), None, 3.5),
+    (3, None, decimal.Decimal("7"), None, datetime.date(2001, 2, 3), decimal.Decimal("0.1")),
+    (True, b"x", decimal.Decimal("-2.25"), datetime.datetime(2020, 1, 1), datetime.date(1990, 12, 31), "text"),
+]
+
+
+def test_convert_rows_matches_per_value_conversion():
+    assert sqlalchemy_value_converter.convert_rows(ROWS) == [[legacy_convert_value(x) for x in row] for row in ROWS]
+    assert bigquery_value_converter.convert_rows(ROWS) == [[legacy_convert_value(x, "%d/%m/%Y") for x in row]
+                                                           for row in ROWS]
+
+
+def test_columns_without_conversion_are_passed_through():
+    values = (1, None, 3)
+    assert sqlalchemy_value_converter.convert_column(values) is values
+    assert sqlalchemy_value_converter.convert_rows([(1, "a"), (2, "b")]) == [[1, "a"], [2, "b"]]
+    assert sqlalchemy_value_converter.convert_rows([(), ()]) == [[], []]
+
+
+def test_execute_sql_statement_output_is_unchanged(sqlite_connection):
+    query = ("SELECT t.*, CAST(t.UnitPrice AS NUMERIC) AS Price, i.InvoiceDate FROM tracks t "
+             "LEFT JOIN invoice_items ii ON ii.TrackId = t.TrackId LEFT JOIN invoices i ON i.InvoiceId = ii.InvoiceId")
+    engine = create_engine(f"sqlite:///{sqlite_connection.path}")
+    with engine.connect() as conn:
+        result = conn.execute(text(query))
+        expected = [list(result.keys())] + [[legacy_convert_value(x) for x in row] for row in result]
+    connector = SqlAlchemyConnector(sqlite_connection)
+    for max_rows in (None, 0, 5, 2500):
+        output = connector.execute_sql_statement(query, max_rows)
+        limit = len(expected) if max_rows is None else max_rows + 2
+        assert json.dumps(output) == json.dumps(expected[:limit])
@@ -0,0 +1,157 @@
+import fnmatch
+import socketserver
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.database_connector.cache_backends import SqliteCacheBackend, RedisCacheBackend
+from app.database_connector.schema_cache import SchemaCache
+from tests.database_connector.test_schema_cache import build_db
+
+
+class RespStandInHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal server speaking the redis protocol for the commands used by RedisCacheBackend
+    """
+
+    def read_command(self) -> list[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def write_bulk(self, value: bytes | None) -> None:
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        else:
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            if command in (b"PING", b"AUTH", b"SELECT"):
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"GET":
+                value, expires_at = store.get(args[1], (None, None))
+                if expires_at is not None and expires_at <= time.time():
+                    store.pop(args[1])
+                    value = None
+                self.write_bulk(value)
+            elif command == b"SET":
+                store[args[1]] = (args[2], time.time() + int(args[4]) / 1000 if len(args) > 4 else None)
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"DEL":
+                removed = sum(store.pop(key, None) is not None for key in args[1:])
+                self.wfile.write(b":%d\r\n" % removed)
+            elif command == b"SCAN":
+                pattern = args[3].decode()
+                keys = [key for key in store if fnmatch.fnmatch(key.decode(), pattern)]
+                self.wfile.write(b"*2\r\n")
+                self.write_bulk(b"0")
+                self.wfile.write(b"*%d\r\n" % len(keys))
+                for key in keys:
+                    self.write_bulk(key)
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RespStandInHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        cache_backend = SqliteCacheBackend(tmp_path / "cache.db")
+    else:
+        server = request.getfixturevalue("resp_server")
+        cache_backend = RedisCacheBackend("127.0.0.1", server.server_address[1], namespace="test")
+    yield cache_backend
+    cache_backend.close()
+
+
+def test_backend_roundtrip(backend):
+    assert backend.get("a") is None
+    backend.set("a", b"\x00binary\xff", 60)
+    assert backend.get("a") == b"\x00binary\xff"
+    assert backend.delete("a")
+    assert not backend.delete("a")
+
+
+def test_backend_expiry_and_clear(backend):
+    backend.set("a", b"1", 0.01)
+    backend.set("b", b"2", 60)
+    backend.set("c", b"3", 60)
+    time.sleep(0.02)
+    assert backend.get("a") is None
+    assert backend.clear() >= 2
+    assert backend.get("b") is None
+
+
+def test_sqlite_close_releases_connections_of_all_threads(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.db")
+    workers = [threading.Thread(target=backend.set, args=(f"k{i}", b"v", 60)) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    connections = list(backend._connections)
+    assert len(connections) == 4
+
+    backend.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    assert backend.get("k0") == b"v"
+    backend.close()
+
+
+def test_schema_cache_shared_between_workers(backend):
+    worker_a = SchemaCache(ttl=60, max_bytes=10 ** 7, backend=backend)
+    worker_b = SchemaCache(ttl=60, max_bytes=10 ** 7, backend=backend)
+    scanned_db = build_db("test")
+    worker_a.set("fp", scanned_db)
+    worker_a.set_prompt("fp", "raw", scanned_db.return_code_repr_schema())
+
+    assert worker_b.get_prompt("fp", "raw")[0] == scanned_db.return_code_repr_schema()
+    cached_db, age = worker_b.get("fp")
+    assert cached_db.return_code_repr_schema() == scanned_db.return_code_repr_schema()
+    assert worker_b.shared_hits == 2
+
+    worker_b.invalidate("fp")
+    # the invalidation of worker b also applies to the in process entries of worker a
+    assert worker_a.get_prompt("fp", "raw") is None and worker_a.get("fp") is None
+    assert SchemaCache(backend=backend).get("fp") is None
+
+    worker_a.set("fp", scanned_db)
+    assert worker_a.get("fp")[0] is scanned_db
+    worker_b.clear()
+    assert worker_a.get("fp") is None
+
+
+def test_schema_cache_rejects_tampered_entries(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.db")
+    worker = SchemaCache(backend=backend, secret="a")
+    worker.set("fp", build_db("test"))
+    worker.set_prompt("fp", "raw", "CREATE TABLE t(a INTEGER)")
+    assert SchemaCache(backend=backend, secret="b").get("fp") is None
+    assert SchemaCache(backend=backend, secret="b").get_prompt("fp", "raw") is None
+    assert SchemaCache(backend=backend, secret="a").get_prompt("fp", "raw")[0] == "CREATE TABLE t(a INTEGER)"
@@ -0,0 +1,50 @@
+from app.data_oracle import FileConnection, ConnectionDetails
+from app.database_connector.engine_registry import EngineRegistry
+from app.database_connector.fingerprint import connection_fingerprint
+
+
+def test_fingerprint_stable_and_hides_credentials():
+    con_a = ConnectionDetails(database_type="PostgreSQL", username="user", password="secret_pw", host="localhost",
+                              port=5432, database_name="db")
+    con_b = ConnectionDetails(database_type="PostgreSQL", username="user", password="secret_pw", host="localhost",
+                              port=5432, database_name="db")
+    con_c = ConnectionDetails(database_type="PostgreSQL", username="user", password="other_pw", host="localhost",
+                              port=5432, database_name="db")
+    assert connection_fingerprint(con_a) == connection_fingerprint(con_b)
+    assert connection_fingerprint(con_a) != connection_fingerprint(con_c)
+    assert "secret_pw" not in connection_fingerprint(con_a)
+
+
+def test_registry_reuses_engine(tmp_path):
+    registry = EngineRegistry(max_engines=4, idle_timeout=60)
+    con = FileConnection(path=str(tmp_path / "a.db"), database_name="a")
+    engine = registry.get_engine(con)
+    assert registry.get_engine(FileConnection(path=str(tmp_path / "a.db"), database_name="a")) is engine
+    assert len(registry) == 1
+    assert engine.pool.size() == registry.engine_kwargs["pool_size"]
+
+
+def test_registry_lru_eviction(tmp_path):
+    registry = EngineRegistry(max_engines=2, idle_timeout=60)
+    con_a = FileConnection(path=str(tmp_path / "a.db"), database_name="a")
+    con_b = FileConnection(path=str(tmp_path / "b.db"), database_name="b")
+    con_c = FileConnection(path=str(tmp_path / "c.db"), database_name="c")
+    engine_a = registry.get_engine(con_a)
+    engine_b = registry.get_engine(con_b)
+    registry.get_engine(con_a)  # a is now most recently used
+    registry.get_engine(con_c)
+    assert len(registry) == 2
+    assert registry.get_engine(con_a) is engine_a
+    assert registry.get_engine(con_b) is not engine_b
+
+
+def test_registry_idle_eviction_and_shutdown(tmp_path):
+    registry = EngineRegistry(max_engines=4, idle_timeout=0)
+    registry.get_engine(FileConnection(path=str(tmp_path / "a.db"), database_name="a"))
+    assert registry.evict_idle() == 1
+    assert len(registry) == 0
+
+    registry = EngineRegistry(max_engines=4, idle_timeout=60)
+    registry.get_engine(FileConnection(path=str(tmp_path / "a.db"), database_name="a"))
+    registry.dispose_all()
+    assert len(registry) == 0
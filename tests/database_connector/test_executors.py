@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+from app.data_oracle import FileConnection
+from app.database_connector.executors import DatabaseExecutorPool
+
+
+def test_slow_database_does_not_block_other_databases():
+    pool = DatabaseExecutorPool(max_workers_per_db=1, max_databases=4)
+    slow_db = FileConnection(path="slow.db", database_name="slow")
+    fast_db = FileConnection(path="fast.db", database_name="fast")
+    release = threading.Event()
+
+    async def scenario():
+        slow_tasks = [asyncio.create_task(pool.run(slow_db, release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        assert await pool.run(fast_db, lambda: "fast") == "fast"
+        fast_duration = time.monotonic() - start
+
+        metrics = pool.metrics()
+        slow_metrics = [x for x in metrics.values() if x["database"] == "FileConnection:slow"][0]
+        assert (slow_metrics["running"], slow_metrics["queued"]) == (1, 2)
+        release.set()
+        await asyncio.gather(*slow_tasks)
+        return fast_duration
+
+    assert asyncio.run(scenario()) < 1
+    pool.shutdown()
+
+
+def test_per_database_concurrency_limit():
+    pool = DatabaseExecutorPool(max_workers_per_db=2, max_databases=4)
+    db = FileConnection(path="a.db", database_name="a")
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+
+    async def scenario():
+        await asyncio.gather(*[pool.run(db, work) for _ in range(8)])
+
+    asyncio.run(scenario())
+    assert max(peak) == 2
+    assert list(pool.metrics().values())[0]["completed"] == 8
+    pool.shutdown()
+
+
+def test_idle_executors_are_evicted():
+    pool = DatabaseExecutorPool(max_workers_per_db=1, max_databases=2)
+
+    async def scenario():
+        for name in ["a", "b", "c"]:
+            await pool.run(FileConnection(path=f"{name}.db", database_name=name), lambda: None)
+
+    asyncio.run(scenario())
+    assert [x["database"] for x in pool.metrics().values()] == ["FileConnection:b", "FileConnection:c"]
+    pool.shutdown()
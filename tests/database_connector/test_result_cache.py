@@ -0,0 +1,102 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data_oracle import FileConnection
+from app.database_connector.fingerprint import connection_fingerprint
+from app.database_connector.result_cache import ResultCache, result_cache
+from app.main import app
+
+CONNECTION = FileConnection(path="chinook.db", database_name="chinook")
+
+
+def test_equivalent_queries_share_a_key():
+    cache = ResultCache(ttl=60, max_bytes=10 ** 6, enabled=True)
+    key = cache.key(CONNECTION, "SELECT a.Name AS n FROM artists a WHERE a.ArtistId = 1", 10)
+    assert key == cache.key(CONNECTION, "select x.Name n\n  from artists as x -- comment\n where x.ArtistId=1", 10)
+    assert key != cache.key(CONNECTION, "SELECT a.Name AS n FROM artists a WHERE a.ArtistId = 2", 10)
+    assert key != cache.key(CONNECTION, "SELECT a.Name AS n FROM artists a WHERE a.ArtistId = 1", 20)
+
+
+@pytest.mark.parametrize("query, autocommit", [
+    ("INSERT INTO artists (Name) VALUES ('x')", False),
+    ("SELECT 1; DELETE FROM artists", False),
+    ("SELECT * INTO backup FROM artists", False),
+    ("WITH d AS (DELETE FROM artists RETURNING *) SELECT * FROM d", False),
+    ("SELECT * FROM artists", True),
+])
+def test_writes_and_autocommit_bypass_the_cache(query, autocommit):
+    assert ResultCache(enabled=True).key(CONNECTION, query, 10, autocommit) is None
+
+
+def test_disabled_cache_has_no_keys():
+    assert ResultCache(enabled=False).key(CONNECTION, "SELECT * FROM artists", 10) is None
+
+
+def test_ttl_and_lru_byte_budget():
+    result = [["id"], [1], [2]]
+    entry_size = len(__import__("pickle").dumps(result, protocol=5))
+    cache = ResultCache(ttl=60, max_bytes=int(entry_size * 2.5), enabled=True)
+    cache.set("db", "a", result)
+    cache.set("db", "b", result)
+    assert cache.get("db", "a") is not None
+    cache.set("db", "c", result)
+    assert cache.get("db", "b") is None
+    assert len(cache) == 2 and cache.total_bytes == entry_size * 2
+
+    cache.ttl = 0.01
+    cache.set("db", "d", result)
+    time.sleep(0.02)
+    assert cache.get("db", "d") is None
+
+
+def test_invalidate_only_removes_entries_of_the_connection():
+    cache = ResultCache(ttl=60, max_bytes=10 ** 6, enabled=True)
+    generation = cache.generation("db")
+    cache.set("db", "a", [["id"]])
+    cache.set("other", "a", [["id"]])
+    assert cache.invalidate("db") == 1
+    assert cache.get("db", "a") is None and cache.get("other", "a") is not None
+    # results of queries that started before the invalidation are not stored
+    assert not cache.set("db", "a", [["id"]], generation)
+    assert cache.set("db", "a", [["id"]], cache.generation("db"))
+
+
+@pytest.fixture
+def cached_sqlite(sqlite_connection, monkeypatch):
+    monkeypatch.setattr(result_cache, "enabled", True)
+    yield {"path": sqlite_connection.path, "database_name": "chinook"}
+    result_cache.invalidate(connection_fingerprint(sqlite_connection))
+
+
+def execute(client, db_info, query, autocommit=False):
+    response = client.post("/execute_query", json={"db_info": db_info, "query": query, "normalized_query": False,
+                                                   "max_rows": 1000, "autocommit": autocommit})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_execute_query_serves_repeated_reads_from_cache(cached_sqlite):
+    query = "SELECT COUNT(*) FROM artists"
+    with TestClient(app) as client:
+        first = execute(client, cached_sqlite, query)
+        second = execute(client, cached_sqlite, "select count(*)\n from artists")
+        assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+        assert first["query_result"] == second["query_result"] == [["COUNT(*)"], [275]]
+
+        assert not execute(client, cached_sqlite, "INSERT INTO artists (Name) VALUES ('New')", True)["cache_hit"]
+        third = execute(client, cached_sqlite, query)
+        assert not third["cache_hit"]
+        assert third["query_result"][1] == [276]
+
+
+def test_execute_query_runs_the_translated_query(cached_sqlite):
+    with TestClient(app) as client:
+        schema = client.post("/get_schema?return_snapshot=true", json=cached_sqlite).json()["schema_snapshot"]
+        response = client.post("/execute_query", json={
+            "db_info": cached_sqlite, "query": "SELECT albumid FROM main.albums ORDER BY albumid LIMIT 1",
+            "normalized_query": True, "unormalized_schema": schema, "max_rows": 10})
+    assert response.status_code == 200
+    assert "\"albums\".\"AlbumId\"" in response.json()["executed_query"]
+    assert response.json()["query_result"] == [["albumid"], [1]]
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data_oracle import FileConnection, SqlAlchemyConnector
+from app.main import app
+
+
+@pytest.fixture
+def sqlite_path(sqlite_connection):
+    return sqlite_connection.path
+
+
+def stream_request(sqlite_path, query, max_rows, response_format):
+    with TestClient(app) as client:
+        return client.post(f"/execute_query/stream?format={response_format}",
+                           json={"db_info": {"path": sqlite_path, "database_name": "chinook"}, "query": query,
+                                 "normalized_query": False, "max_rows": max_rows})
+
+
+def test_stream_matches_execute_sql_statement(sqlite_path):
+    connector = SqlAlchemyConnector(FileConnection(path=sqlite_path, database_name="chinook"))
+    query = "SELECT TrackId, Name, UnitPrice FROM tracks ORDER BY TrackId"
+    expected = connector.execute_sql_statement(query, 2500)
+    chunks = list(connector.stream_sql_statement(query, 2500, chunk_size=100))
+    assert chunks[0] == expected[0]
+    assert [len(chunk) for chunk in chunks[1:]] == [100] * 25 + [1]
+    assert [row for chunk in chunks[1:] for row in chunk] == expected[1:]
+
+
+def test_closing_stream_releases_connection(sqlite_path):
+    connector = SqlAlchemyConnector(FileConnection(path=sqlite_path, database_name="chinook"))
+    chunks = connector.stream_sql_statement("SELECT * FROM tracks", 5000, chunk_size=10)
+    next(chunks)
+    next(chunks)
+    assert connector.connection.pool.checkedout() == 1
+    chunks.close()
+    assert connector.connection.pool.checkedout() == 0
+
+
+def test_closing_autocommit_stream_keeps_the_write(sqlite_path):
+    connector = SqlAlchemyConnector(FileConnection(path=sqlite_path, database_name="chinook"))
+    chunks = connector.stream_sql_statement("UPDATE tracks SET Name = 'Streamed' RETURNING TrackId", None,
+                                            autocommit=True, chunk_size=10)
+    assert next(chunks) == ["TrackId"]
+    chunks.close()
+    result = connector.execute_sql_statement("SELECT COUNT(*) FROM tracks WHERE Name <> 'Streamed'", None)
+    assert result[1] == [0]
+
+
+def test_stream_respects_max_rows(sqlite_path):
+    connector = SqlAlchemyConnector(FileConnection(path=sqlite_path, database_name="chinook"))
+    query = "SELECT TrackId FROM tracks ORDER BY TrackId"
+    chunks = list(connector.stream_sql_statement(query, 5, chunk_size=2))
+    assert [row for chunk in chunks[1:] for row in chunk] == connector.execute_sql_statement(query, 5)[1:]
+
+
+def test_ndjson_endpoint(sqlite_path):
+    response = stream_request(sqlite_path, "SELECT ArtistId, Name FROM artists ORDER BY ArtistId", 1000, "ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"columns": ["ArtistId", "Name"]}
+    assert lines[1] == [1, "AC/DC"]
+    assert lines[-1]["row_count"] == len(lines) - 2 == 275
+
+
+def test_json_endpoint(sqlite_path):
+    response = stream_request(sqlite_path, "SELECT GenreId, Name FROM genres ORDER BY GenreId", 3, "json")
+    body = response.json()
+    assert body["columns"] == ["GenreId", "Name"]
+    assert body["rows"] == [[1, "Rock"], [2, "Jazz"], [3, "Metal"], [4, "Alternative & Punk"]]
+    assert body["row_count"] == 4
+
+
+def test_invalid_query_returns_error_status(sqlite_path):
+    with TestClient(app, raise_server_exceptions=False) as client:
+        response = client.post("/execute_query/stream", json={
+            "db_info": {"path": sqlite_path, "database_name": "chinook"}, "query": "SELECT * FROM missing",
+            "normalized_query": False, "max_rows": 10})
+    assert response.status_code == 500
+
+
+def test_columnar_endpoint_dictionary_encodes_repeated_strings(sqlite_path):
+    response = stream_request(sqlite_path, "SELECT TrackId, Composer, MediaTypeId FROM tracks ORDER BY TrackId",
+                              2000, "columnar")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"columns": ["TrackId", "Composer", "MediaTypeId"]}
+    track_ids, composers, _ = lines[1]["data"]
+    assert track_ids[:3] == [1, 2, 3]
+    assert set(composers) == {"dictionary", "indices"}
+    decoded = [None if i is None else composers["dictionary"][i] for i in composers["indices"]]
+    rows = SqlAlchemyConnector(FileConnection(path=sqlite_path, database_name="chinook")).execute_sql_statement(
+        "SELECT Composer FROM tracks ORDER BY TrackId", 2000)[1:lines[1]["row_count"] + 1]
+    assert decoded == [row[0] for row in rows]
+    assert lines[-1]["row_count"] == sum(line["row_count"] for line in lines[1:-1]) == 2001
+
+
+def test_arrow_endpoint(sqlite_path):
+    pa = pytest.importorskip("pyarrow")
+    with TestClient(app) as client:
+        response = client.post("/execute_query?format=arrow", json={
+            "db_info": {"path": sqlite_path, "database_name": "chinook"},
+            "query": "SELECT TrackId, Name, UnitPrice, Composer FROM tracks ORDER BY TrackId",
+            "normalized_query": False, "max_rows": 5000})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 3503
+    assert table.column_names == ["TrackId", "Name", "UnitPrice", "Composer"]
+    assert pa.types.is_int64(table.schema.field("TrackId").type)
+    assert pa.types.is_float64(table.schema.field("UnitPrice").type)
+    assert table.column("Name")[0].as_py() == "For Those About To Rock (We Salute You)"
+    assert table.schema.metadata[b"executed_query"].startswith(b"SELECT TrackId")
+
+
+def test_arrow_endpoint_empty_result(sqlite_path):
+    pa = pytest.importorskip("pyarrow")
+    response = stream_request(sqlite_path, "SELECT ArtistId, Name FROM artists WHERE ArtistId < 0", 10, "arrow")
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 0
+    assert table.column_names == ["ArtistId", "Name"]
@@ -0,0 +1,60 @@
+import time
+
+from app.data_oracle.db_schema import Column, Table, Database, Schema
+from app.database_connector.schema_cache import SchemaCache
+
+
+def build_db(name: str, n_tables: int = 2) -> Database:
+    column_list = [
+        Column("Col1", "INTEGER", True),
+        Column("Col2", "VARCHAR(20)")
+    ]
+    table_list = [Table(f"T{i}", None, column_list, "Table", []) for i in range(n_tables)]
+    scanned_db = Database(name)
+    scanned_db.register_schemas([Schema("pub", table_list)])
+    return scanned_db
+
+
+def test_cache_hit_and_age():
+    cache = SchemaCache(ttl=60, max_bytes=10 ** 7)
+    scanned_db = build_db("test")
+    assert cache.get("a") is None
+    cache.set("a", scanned_db)
+    cached_db, age = cache.get("a")
+    assert cached_db is scanned_db
+    assert 0 <= age < 60
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_ttl_expiry():
+    cache = SchemaCache(ttl=60, max_bytes=10 ** 7)
+    cache.set("a", build_db("test"), ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+
+
+def test_cache_byte_budget_lru_eviction():
+    entry_size = SchemaCache.estimate_size(build_db("test"))
+    cache = SchemaCache(ttl=60, max_bytes=int(entry_size * 2.5))
+    cache.set("a", build_db("test"))
+    cache.set("b", build_db("test"))
+    cache.get("a")  # b is now least recently used
+    cache.set("c", build_db("test"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_bytes <= cache.max_bytes
+
+    assert not cache.set("huge", build_db("test", n_tables=100))
+
+
+def test_cache_invalidation():
+    cache = SchemaCache(ttl=60, max_bytes=10 ** 7)
+    cache.set("a", build_db("test"))
+    cache.set("b", build_db("test"))
+    assert cache.invalidate("a")
+    assert not cache.invalidate("a")
+    assert cache.clear() == 1
+    assert cache.get("b") is None